@@ -0,0 +1,411 @@
+# app/allocation.py
+"""
+Seat allocation: each student gets at most one internship, each internship
+at most ``capacity`` students, and at least ``global_reserved_pct`` of all
+seats go to govt-project students (when that many can be seated).
+
+Two engines:
+
+``allocate_ilp``            the notebook's Cell 12 CBC model, one binary per
+                            eligible pair; exact but slow past a few
+                            thousand students.
+``allocate_min_cost_flow``  the same problem as a transportation problem on
+                            OR-Tools' SimpleMinCostFlow, over each student's
+                            top-N candidate internships only.
+
+Flow network (all costs non-negative)::
+
+    student --1, (offset - score) * SCALE--> internship --capacity, 0--> sink
+    student --1, offset * SCALE--> sink                 (non-govt: stay unassigned)
+    student --1, offset * SCALE--> govt hub --n_govt - R, 0--> sink   (govt)
+
+Every student supplies one unit. Govt students can only stay unassigned
+through the hub, so at most ``n_govt - R`` of them do. ``R`` is capped in a
+first phase at the number of govt students the candidate edges can seat
+(max flow), so the reservation never makes the problem infeasible.
+
+``repair_allocation`` re-solves only the neighbourhood of a capacity change
+or withdrawal, starting from the current assignment.
+
+Compare both engines with ``python -m app.allocation benchmark --sizes 500 1000 2000``;
+repair allocations.csv with ``python -m app.allocation repair --capacity I00012=3 --withdraw S00042``.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+# scores are turned into integer costs with this resolution
+COST_SCALE = 1_000_000
+
+
+def _assignments_frame(s_idx, i_idx, scores, students_df, internships_df):
+    if len(s_idx) == 0:
+        return pd.DataFrame(columns=['student_idx', 'intern_idx', 'student_id', 'internship_id', 'score'])
+    df = pd.DataFrame({
+        'student_idx': s_idx, 'intern_idx': i_idx,
+        'student_id': students_df['student_id'].to_numpy()[s_idx],
+        'internship_id': internships_df['internship_id'].to_numpy()[i_idx],
+        'score': np.asarray(scores, dtype=np.float64),
+    })
+    return df.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def reserved_seats(capacity_array, global_reserved_pct):
+    return int(np.floor(global_reserved_pct * np.asarray(capacity_array).sum()))
+
+
+def allocate_ilp(score_matrix, capacity_array, eligibility_mask, students_df, internships_df, global_reserved_pct=0.0):
+    """Cell 12's CBC model; an empty frame if it finds no feasible allocation."""
+    from ortools.linear_solver import pywraplp
+
+    S, I = score_matrix.shape
+    solver = pywraplp.Solver.CreateSolver('CBC')
+    if not solver:
+        raise RuntimeError("OR-Tools solver not available.")
+    x = {}
+    for s in range(S):
+        for i in range(I):
+            if eligibility_mask[s, i]:
+                x[(s, i)] = solver.IntVar(0, 1, f"x_{s}_{i}")
+    for s in range(S):
+        solver.Add(solver.Sum([x[(s, i)] for i in range(I) if (s, i) in x]) <= 1)
+    for i in range(I):
+        solver.Add(solver.Sum([x[(s, i)] for s in range(S) if (s, i) in x]) <= int(capacity_array[i]))
+    reserved_count = reserved_seats(capacity_array, global_reserved_pct)
+    if reserved_count > 0:
+        priority_vars = []
+        for s in range(S):
+            if students_df['govt_project'].iloc[s] == 1:
+                for i in range(I):
+                    if (s, i) in x:
+                        priority_vars.append(x[(s, i)])
+        if priority_vars:
+            solver.Add(solver.Sum(priority_vars) >= min(reserved_count, len(priority_vars)))
+    obj = solver.Objective()
+    for (s, i), var in x.items():
+        obj.SetCoefficient(var, float(score_matrix[s, i]))
+    obj.SetMaximization()
+    status = solver.Solve()
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        print("No feasible allocation found.")
+        return _assignments_frame([], [], [], students_df, internships_df)
+    pairs = [(s, i) for (s, i), var in x.items() if var.solution_value() > 0.5]
+    s_idx = np.array([p[0] for p in pairs], dtype=np.int64)
+    i_idx = np.array([p[1] for p in pairs], dtype=np.int64)
+    return _assignments_frame(s_idx, i_idx, score_matrix[s_idx, i_idx], students_df, internships_df)
+
+
+def candidate_edges(score_matrix, eligibility_mask, top_n=None):
+    """``(s_idx, i_idx, scores)`` of each student's ``top_n`` best eligible internships (all if None)."""
+    scores = np.where(eligibility_mask, score_matrix, -np.inf)
+    if top_n is not None and top_n < scores.shape[1]:
+        cols = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    else:
+        cols = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    rows = np.broadcast_to(np.arange(scores.shape[0])[:, None], cols.shape)
+    s_idx, i_idx = rows.ravel(), cols.ravel()
+    keep = np.isfinite(scores[s_idx, i_idx])
+    return s_idx[keep], i_idx[keep], scores[s_idx[keep], i_idx[keep]]
+
+
+def edges_from_recs(recs_df):
+    """Candidate edges straight from recommendations.csv (each student's top-K)."""
+    return (recs_df['student_idx'].to_numpy(dtype=np.int64), recs_df['intern_idx'].to_numpy(dtype=np.int64),
+            recs_df['score'].to_numpy(dtype=np.float64))
+
+
+def _seatable(s_idx, i_idx, capacity, n_students):
+    """Most students that can be seated at once over these edges (max flow)."""
+    from ortools.graph.python import max_flow
+
+    if len(s_idx) == 0:
+        return 0
+    n_items = len(capacity)
+    source, sink = n_students + n_items, n_students + n_items + 1
+    students = np.unique(s_idx)
+    flow = max_flow.SimpleMaxFlow()
+    flow.add_arcs_with_capacity(np.full(len(students), source), students, np.ones(len(students), dtype=np.int64))
+    flow.add_arcs_with_capacity(s_idx, n_students + i_idx, np.ones(len(s_idx), dtype=np.int64))
+    flow.add_arcs_with_capacity(n_students + np.arange(n_items), np.full(n_items, sink),
+                                np.asarray(capacity, dtype=np.int64))
+    if flow.solve(source, sink) != flow.OPTIMAL:
+        raise RuntimeError("max flow failed")
+    return int(flow.optimal_flow())
+
+
+def allocate_min_cost_flow(s_idx, i_idx, scores, capacity_array, govt_flags, reserved_count=0, incumbent=None):
+    """Best allocation over the candidate edges; returns ``(s_idx, i_idx, scores)`` of the assigned pairs.
+
+    ``govt_flags`` has one entry per student; students without edges stay
+    unassigned. The reservation is met as far as the edges allow. Edges
+    flagged in ``incumbent`` (the current assignment) are one cost unit
+    cheaper, so among equally good allocations the one moving the fewest
+    students wins.
+    """
+    from ortools.graph.python import min_cost_flow
+
+    s_idx = np.asarray(s_idx, dtype=np.int64)
+    i_idx = np.asarray(i_idx, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    capacity = np.asarray(capacity_array, dtype=np.int64)
+    govt = np.asarray(govt_flags).astype(bool)
+    n_students, n_items = len(govt), len(capacity)
+
+    reserve = 0
+    if reserved_count > 0 and govt.any():
+        g = govt[s_idx]
+        reserve = min(int(reserved_count), _seatable(s_idx[g], i_idx[g], capacity, n_students))
+
+    offset = max(1.0, float(scores.max())) if len(scores) else 1.0
+    stay = int(round(offset * COST_SCALE))
+    sink, hub = n_students + n_items, n_students + n_items + 1
+    students = np.arange(n_students)
+
+    costs = np.rint((offset - scores) * COST_SCALE).astype(np.int64)
+    if incumbent is not None:
+        costs -= np.asarray(incumbent, dtype=np.int64)
+    flow = min_cost_flow.SimpleMinCostFlow()
+    pair_arcs = flow.add_arcs_with_capacity_and_unit_cost(
+        s_idx, n_students + i_idx, np.ones(len(s_idx), dtype=np.int64), costs)
+    flow.add_arcs_with_capacity_and_unit_cost(
+        n_students + np.arange(n_items), np.full(n_items, sink), capacity, np.zeros(n_items, dtype=np.int64))
+    flow.add_arcs_with_capacity_and_unit_cost(
+        students, np.where(govt, hub, sink), np.ones(n_students, dtype=np.int64), np.full(n_students, stay))
+    flow.add_arc_with_capacity_and_unit_cost(hub, sink, int(govt.sum()) - reserve, 0)
+    flow.set_nodes_supplies(np.append(students, sink), np.append(np.ones(n_students, dtype=np.int64), -n_students))
+    status = flow.solve()
+    if status != flow.OPTIMAL:
+        raise RuntimeError(f"min cost flow failed (status {status})")
+    used = flow.flows(pair_arcs) > 0
+    return s_idx[used], i_idx[used], scores[used]
+
+
+def allocate_flow(score_matrix, capacity_array, eligibility_mask, students_df, internships_df,
+                  global_reserved_pct=0.0, top_n=50, edges=None):
+    """Drop-in for ``allocate_ilp`` on the flow engine, over each student's ``top_n`` candidates.
+
+    ``edges`` (e.g. ``edges_from_recs(recs_df)``) replaces the candidates
+    taken from ``score_matrix``, which may then be None.
+    """
+    if edges is None:
+        edges = candidate_edges(score_matrix, eligibility_mask, top_n)
+    s_idx, i_idx, scores = allocate_min_cost_flow(
+        *edges, capacity_array, students_df['govt_project'].to_numpy() == 1,
+        reserved_seats(capacity_array, global_reserved_pct))
+    return _assignments_frame(s_idx, i_idx, scores, students_df, internships_df)
+
+
+def repair_allocation(assigned, s_idx, i_idx, scores, capacity_array, govt_flags, reserved_count=0,
+                      withdrawn=(), changed_internships=(), depth=2, slack=0.0):
+    """Re-optimize an allocation after seats or students changed, touching only the affected region.
+
+    ``assigned[s]`` is the current internship position of every student (-1
+    if none); ``capacity_array`` already holds the new capacities. The
+    region starts at the changed internships (plus those that withdrawn
+    students free or that are now over capacity) and their occupants, then
+    grows ``depth`` times along augmenting moves: students who score higher
+    in a region internship than in their current seat (or at most ``slack``
+    lower) join, and so does the seat they would free. Only the region is
+    re-solved, with everyone else's seat held fixed; among equally good
+    solutions the one moving the fewest students is kept. A larger
+    ``slack``/``depth`` gets closer to a full re-solve at the cost of a
+    bigger region.
+
+    Returns the new ``assigned`` array.
+    """
+    assigned = np.array(assigned, dtype=np.int64)
+    s_idx = np.asarray(s_idx, dtype=np.int64)
+    i_idx = np.asarray(i_idx, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    capacity = np.asarray(capacity_array, dtype=np.int64)
+    govt = np.asarray(govt_flags).astype(bool)
+    n_students, n_items = len(assigned), len(capacity)
+
+    withdrawn = np.asarray(list(withdrawn), dtype=np.int64)
+    touched = np.zeros(n_items, dtype=bool)
+    touched[np.asarray(list(changed_internships), dtype=np.int64)] = True
+    freed = assigned[withdrawn]
+    touched[freed[freed >= 0]] = True
+    assigned[withdrawn] = -1
+    keep = ~np.isin(s_idx, withdrawn)
+    s_idx, i_idx, scores = s_idx[keep], i_idx[keep], scores[keep]
+    seated = assigned >= 0
+    touched |= np.bincount(assigned[seated], minlength=n_items) > capacity
+
+    # score of every student's current seat (-inf without one)
+    incumbent = assigned[s_idx] == i_idx
+    current = np.full(n_students, -np.inf)
+    current[s_idx[incumbent]] = scores[incumbent]
+
+    # occupants of a shrunk internship may have to move anywhere they are a candidate
+    region = seated & touched[np.maximum(assigned, 0)]
+    touched[i_idx[region[s_idx]]] = True
+    for _ in range(max(1, depth)):
+        # students who would rather sit in a touched internship, and the seats they would free
+        region[s_idx[touched[i_idx] & (scores > current[s_idx] - slack)]] = True
+        touched[assigned[region & seated]] = True
+
+    # seats held by students outside the region stay taken
+    outside = seated & ~region
+    free = capacity - np.bincount(assigned[outside], minlength=n_items)
+    edge = region[s_idx] & touched[i_idx]
+    students = np.flatnonzero(region)
+    items = np.flatnonzero(touched)
+    local_s = np.full(n_students, -1, dtype=np.int64)
+    local_s[students] = np.arange(len(students))
+    local_i = np.full(n_items, -1, dtype=np.int64)
+    local_i[items] = np.arange(len(items))
+    reserve = max(0, int(reserved_count) - int((govt & outside).sum()))
+    new_s, new_i, _ = allocate_min_cost_flow(
+        local_s[s_idx[edge]], local_i[i_idx[edge]], scores[edge], np.maximum(free[items], 0),
+        govt[students], reserve, incumbent=incumbent[edge])
+
+    assigned[students] = -1
+    assigned[students[new_s]] = items[new_i]
+    return assigned
+
+
+def allocation_diff(before, after, students_df, internships_df):
+    """Students whose seat changed: ``student_id``, ``old_internship_id``, ``new_internship_id`` (None = no seat)."""
+    before, after = np.asarray(before), np.asarray(after)
+    moved = np.flatnonzero(before != after)
+    ids = internships_df['internship_id'].to_numpy(dtype=object)
+    return pd.DataFrame({
+        'student_idx': moved, 'student_id': students_df['student_id'].to_numpy()[moved],
+        'old_internship_id': [ids[k] if k >= 0 else None for k in before[moved]],
+        'new_internship_id': [ids[k] if k >= 0 else None for k in after[moved]],
+    })
+
+
+def synthetic_cohort(n_students, n_internships, seed=0, govt_share=0.2, elig_rate=0.6):
+    """Random scores, eligibility, capacities and govt flags for benchmarking."""
+    rng = np.random.default_rng(seed)
+    students = pd.DataFrame({'student_id': [f"S{k:06d}" for k in range(n_students)],
+                             'govt_project': (rng.random(n_students) < govt_share).astype(int)})
+    internships = pd.DataFrame({'internship_id': [f"I{k:06d}" for k in range(n_internships)]})
+    capacity = rng.integers(1, 6, n_internships)
+    scores = rng.random((n_students, n_internships))
+    elig = rng.random((n_students, n_internships)) < elig_rate
+    return scores, capacity, elig, students, internships
+
+
+def benchmark(sizes, top_n=50, reserved_pct=0.10, ilp_max=2000, seed=0):
+    """Objective value and wall time of both engines on growing synthetic cohorts."""
+    rows = []
+    for n in sizes:
+        scores, capacity, elig, students, internships = synthetic_cohort(n, max(10, n // 4), seed=seed)
+        govt = students['govt_project'].to_numpy() == 1
+        reserve = reserved_seats(capacity, reserved_pct)
+        engines = [('flow_top%d' % top_n, lambda: allocate_flow(scores, capacity, elig, students, internships,
+                                                                reserved_pct, top_n=top_n)),
+                   ('flow_all', lambda: allocate_flow(scores, capacity, elig, students, internships,
+                                                      reserved_pct, top_n=None))]
+        if n <= ilp_max:
+            engines.append(('ilp', lambda: allocate_ilp(scores, capacity, elig, students, internships, reserved_pct)))
+        for name, run in engines:
+            started = time.perf_counter()
+            df = run()
+            seconds = time.perf_counter() - started
+            rows.append({'students': n, 'internships': len(internships), 'engine': name, 'seconds': seconds,
+                         'objective': float(df['score'].sum()), 'assigned': len(df),
+                         'govt_assigned': int(govt[df['student_idx'].to_numpy(dtype=np.int64)].sum()),
+                         'reserved': reserve})
+    return pd.DataFrame(rows)
+
+
+WITHDRAWN_FILENAME = "allocation_withdrawn.json"
+
+
+def repair_files(out_dir, capacity=None, withdraw=(), reserved_pct=0.10, depth=2, slack=0.0):
+    """Repair ``out_dir/allocations.csv`` in place; returns the diff (also written to allocation_diff.csv).
+
+    ``capacity`` ({internship_id: seats}) is written back to
+    internships_synthetic.csv; withdrawn student ids accumulate in
+    allocation_withdrawn.json so later repairs keep them out. Candidate
+    edges are each student's recommendations plus their current seat.
+    """
+    import json
+    import os
+    from pathlib import Path
+
+    out_dir = Path(out_dir)
+    students = pd.read_csv(out_dir / "students_synthetic.csv")
+    internships = pd.read_csv(out_dir / "internships_synthetic.csv")
+    allocations = pd.read_csv(out_dir / "allocations.csv")
+    recs = pd.read_csv(out_dir / "recommendations.csv")
+
+    intern_pos = {iid: k for k, iid in enumerate(internships['internship_id'].astype(str))}
+    student_pos = {sid: k for k, sid in enumerate(students['student_id'].astype(str))}
+    changed = [intern_pos[str(iid)] for iid in (capacity or {})]
+    if capacity:
+        for iid, seats in capacity.items():
+            internships.loc[intern_pos[str(iid)], 'capacity'] = int(seats)
+        _atomic_csv(internships, out_dir / "internships_synthetic.csv")
+
+    withdrawn_path = out_dir / WITHDRAWN_FILENAME
+    withdrawn_ids = json.loads(withdrawn_path.read_text()) if withdrawn_path.exists() else []
+    new_ids = [str(sid) for sid in withdraw if str(sid) not in withdrawn_ids]
+    withdrawn_ids += new_ids
+
+    before = np.full(len(students), -1, dtype=np.int64)
+    before[allocations['student_idx'].to_numpy(dtype=np.int64)] = allocations['intern_idx'].to_numpy(dtype=np.int64)
+    edges = pd.concat([recs[['student_idx', 'intern_idx', 'score']], allocations[['student_idx', 'intern_idx', 'score']]])
+    edges = edges.groupby(['student_idx', 'intern_idx'], as_index=False)['score'].max()
+    out = np.array([student_pos[sid] for sid in withdrawn_ids if sid in student_pos], dtype=np.int64)
+    edges = edges[~edges['student_idx'].isin(out)]
+
+    started = time.perf_counter()
+    after = repair_allocation(
+        before, *edges_from_recs(edges), internships['capacity'].to_numpy(),
+        students['govt_project'].to_numpy() == 1, reserved_seats(internships['capacity'], reserved_pct),
+        withdrawn=out, changed_internships=changed, depth=depth, slack=slack)
+    seconds = time.perf_counter() - started
+
+    score_of = dict(zip(zip(edges['student_idx'], edges['intern_idx']), edges['score']))
+    seated = np.flatnonzero(after >= 0)
+    result = _assignments_frame(seated, after[seated], [score_of[(s, after[s])] for s in seated],
+                                students, internships)
+    diff = allocation_diff(before, after, students, internships)
+    _atomic_csv(result, out_dir / "allocations.csv")
+    _atomic_csv(diff, out_dir / "allocation_diff.csv")
+    if new_ids:
+        tmp = withdrawn_path.with_name(f".{withdrawn_path.name}-{os.getpid()}")
+        tmp.write_text(json.dumps(withdrawn_ids))
+        os.replace(tmp, withdrawn_path)
+    print(f"repaired in {seconds * 1000:.1f} ms: {len(diff)} students changed, {len(result)} seated")
+    return diff
+
+
+def _atomic_csv(df, path):
+    import os
+    tmp = path.with_name(f".{path.name}-{os.getpid()}")
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Min-cost-flow allocation tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("benchmark", help="compare min-cost flow with the CBC ILP on synthetic cohorts")
+    bench.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    bench.add_argument("--top-n", type=int, default=50)
+    bench.add_argument("--ilp-max", type=int, default=2000, help="skip the ILP above this many students")
+    bench.add_argument("--seed", type=int, default=0)
+    repair = sub.add_parser("repair", help="re-optimize allocations.csv after capacity changes or withdrawals")
+    repair.add_argument("out_dir", nargs="?", default="notebook/outputs_recommender_v2")
+    repair.add_argument("--capacity", nargs="*", default=[], metavar="INTERNSHIP_ID=SEATS")
+    repair.add_argument("--withdraw", nargs="*", default=[], metavar="STUDENT_ID")
+    repair.add_argument("--depth", type=int, default=2, help="hops the repaired region grows from the change")
+    repair.add_argument("--slack", type=float, default=0.0, help="also move students into seats up to this much worse")
+    for p in (bench, repair):
+        p.add_argument("--reserved-pct", type=float, default=0.10)
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        print(benchmark(args.sizes, args.top_n, args.reserved_pct, args.ilp_max, args.seed).to_string(index=False))
+    else:
+        seats = dict(item.split("=", 1) for item in args.capacity)
+        print(repair_files(args.out_dir, {k: int(v) for k, v in seats.items()}, args.withdraw,
+                           args.reserved_pct, args.depth, args.slack).to_string(index=False))
@@ -0,0 +1,147 @@
+# app/artifacts.py
+import hashlib
+import os
+import threading
+import time
+import traceback
+
+
+def fingerprint(paths):
+    """Cheap (name, size, mtime) signature used to notice new pipeline output."""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((str(path), st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            sig.append((str(path), None, None))
+    return tuple(sig)
+
+
+def content_version(paths):
+    """Short content hash over the artifact files; this is the served version."""
+    h = hashlib.blake2b(digest_size=6)
+    for path in paths:
+        h.update(str(os.path.basename(path)).encode())
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        except FileNotFoundError:
+            h.update(b'<missing>')
+    return h.hexdigest()
+
+
+class ArtifactManager:
+    """Holds the active artifact snapshot and swaps in new ones without downtime.
+
+    ``build(version)`` must return a fully built snapshot object. Reloads run
+    in a background thread; the new snapshot replaces ``current`` in a single
+    reference assignment, so requests that already grabbed the old snapshot
+    finish on it. A failed build keeps the old snapshot and records the error.
+    Snapshots may carry a ``base_version`` (the on-disk version they were
+    patched from); a reload only rebuilds when the files moved past it.
+    """
+
+    def __init__(self, build, paths, version_of=content_version):
+        self.build = build
+        self.paths = list(paths)
+        self.version_of = version_of
+        self.current = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.last_error = None
+        # builds that swapped in / failed, for monitoring
+        self.loads = 0
+        self.load_failures = 0
+        self._fingerprint = None
+        self._reload_lock = threading.Lock()
+        self._thread = None
+        self._watcher = None
+
+    @property
+    def version(self):
+        return getattr(self.current, 'version', None)
+
+    @property
+    def reloading(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def load(self):
+        """Build a snapshot now and make it current; returns True on a swap."""
+        with self._reload_lock:
+            sig = fingerprint(self.paths)
+            version = self.version_of(self.paths)
+            base = getattr(self.current, 'base_version', self.version)
+            if self.current is not None and version == base:
+                self._fingerprint = sig
+                return False
+            started = time.perf_counter()
+            try:
+                snapshot = self.build(version)
+            except Exception:
+                self.last_error = traceback.format_exc(limit=3)
+                self.load_failures += 1
+                if self.current is None:
+                    raise
+                return False
+            self.current = snapshot
+            self._fingerprint = sig
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - started
+            self.last_error = None
+            self.loads += 1
+            return True
+
+    def publish(self, snapshot, replaces):
+        """Swap in a snapshot derived from ``replaces``; False if another swap came first."""
+        with self._reload_lock:
+            if self.current is not replaces:
+                return False
+            self.current = snapshot
+            return True
+
+    def reload_async(self):
+        """Start a background reload unless one is already running."""
+        if self.reloading:
+            return False
+        self._thread = threading.Thread(target=self._reload_quietly, name="artifact-reload", daemon=True)
+        self._thread.start()
+        return True
+
+    def _reload_quietly(self):
+        try:
+            self.load()
+        except Exception:
+            self.last_error = traceback.format_exc(limit=3)
+
+    def start_watcher(self, interval: float):
+        """Poll the artifact files and reload once a change has settled."""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            pending = None
+            while True:
+                time.sleep(interval)
+                sig = fingerprint(self.paths)
+                if sig == self._fingerprint:
+                    pending = None
+                elif sig == pending:
+                    # unchanged for a full interval: the pipeline is done writing
+                    self._reload_quietly()
+                    pending = None
+                else:
+                    pending = sig
+
+        self._watcher = threading.Thread(target=watch, name="artifact-watch", daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {
+            "artifact_version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "reloading": self.reloading,
+            "last_error": self.last_error,
+        }
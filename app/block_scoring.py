@@ -0,0 +1,285 @@
+# app/block_scoring.py
+"""
+Streaming scoring stage: students are processed in row blocks.
+
+For each block the CBF ensemble, CF and rule matrices are computed, scaled,
+masked and fed to the meta model (only eligible pairs), and the block's
+per-student top-K is written to its own part file. Nothing S x I is ever
+held; peak memory follows ``block_size x I``.
+
+The column-wise MinMax scalers need every student, so when they are not
+supplied a first pass fits them block by block (``partial_fit`` gives the
+same ranges as a full ``fit``). The global meta-prediction range is only
+known at the end, so part files keep raw predictions and ``finalize()``
+normalizes while writing recommendations.csv and then clears the work
+directory.
+
+Work directory layout (the run resumes from whatever is already there)::
+
+    state.json              shape/config and input hash of the run; a mismatch restarts it
+    scalers.pkl             fitted (or partially fitted) MinMax scalers
+    part-<block>.npz        top-K rows + prediction range of one finished block
+
+Rescore from saved artifacts with ``python -m app.block_scoring [out_dir]``.
+"""
+import json
+import os
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import MinMaxScaler
+
+from app.pair_features import PairFeatureBuilder, score_eligible
+
+
+def _atomic_write(path, write):
+    tmp = path.with_name(f".{path.name}-{os.getpid()}")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class BlockScorer:
+    """Scores every student against the catalog one block of students at a time.
+
+    ``student_embs`` / ``internship_embs`` (SBERT), ``student_tfidf`` /
+    ``job_tfidf`` and ``cf_factors`` are optional; a missing side
+    contributes zeros, as in Cell 3 (and before the CF model is trained). ``candidates`` (S x N internship positions, -1 padded, e.g. from
+    the ANN index) restricts scoring to those pairs. ``artifacts_digest``
+    identifies what ``predict`` can't be hashed for (the meta model files).
+    """
+
+    def __init__(self, students_df, internships_df, rule_engine, cf_factors, predict, std_scaler,
+                 student_embs=None, internship_embs=None, student_tfidf=None, job_tfidf=None,
+                 sbert_weight=0.75, scalers=None, candidates=None, top_k=10, chunk_size=200_000,
+                 artifacts_digest=None):
+        self.students_df = students_df.reset_index(drop=True)
+        self.internships_df = internships_df.reset_index(drop=True)
+        self.rule_engine = rule_engine
+        self.cf_factors = cf_factors
+        self.predict = predict
+        self.std_scaler = std_scaler
+        self.student_embs, self.internship_embs = student_embs, internship_embs
+        self.student_tfidf, self.job_tfidf = student_tfidf, job_tfidf
+        self.sbert_weight = sbert_weight if student_embs is not None else 0.0
+        # (cbf_scaler, cf_scaler, rule_scaler); fitted in a first pass when None
+        self.scalers = scalers
+        self.candidates = candidates
+        self.top_k = top_k
+        self.chunk_size = chunk_size
+        self.artifacts_digest = artifacts_digest
+        self.student_ids = self.students_df['student_id'].astype(str).tolist()
+        self.intern_ids = self.internships_df['internship_id'].astype(str).tolist()
+
+    def components(self, start, stop):
+        """Raw ``(cbf, cf, rule, elig)`` of students ``start:stop``, each (block x I)."""
+        n, n_items = stop - start, len(self.intern_ids)
+        cbf_sbert = (cosine_similarity(self.student_embs[start:stop], self.internship_embs)
+                     if self.student_embs is not None else np.zeros((n, n_items)))
+        cbf_tfidf = (cosine_similarity(self.student_tfidf[start:stop], self.job_tfidf)
+                     if self.student_tfidf is not None else np.zeros((n, n_items)))
+        cbf = self.sbert_weight * cbf_sbert + (1.0 - self.sbert_weight) * cbf_tfidf
+        cf = (self.cf_factors.matrix(self.student_ids[start:stop], self.intern_ids)
+              if self.cf_factors is not None else np.zeros((n, n_items)))
+        rule, elig = self.rule_engine.score(self.students_df.iloc[start:stop])
+        if self.candidates is not None:
+            cand = np.asarray(self.candidates[start:stop])
+            in_cand = np.zeros_like(elig)
+            rows = np.repeat(np.arange(n), cand.shape[1])
+            valid = cand.ravel() >= 0
+            in_cand[rows[valid], cand.ravel()[valid]] = True
+            elig &= in_cand
+        return cbf, cf, rule, elig
+
+    def pair_components(self, s_idx, i_idx, block_size=1024, normalized=False):
+        """``(cbf, cf, rule, elig)`` of the pairs ``(s_idx[k], i_idx[k])``, one student block at a time.
+
+        Raw values by default; ``normalized`` applies the fitted scalers and
+        zeroes ineligible pairs, as ``score_block`` does.
+        """
+        s_idx = np.asarray(s_idx, dtype=np.int64)
+        i_idx = np.asarray(i_idx, dtype=np.int64)
+        out = [np.zeros(len(s_idx)) for _ in range(3)] + [np.zeros(len(s_idx), dtype=bool)]
+        for _, start, stop in self._blocks(block_size):
+            sel = np.flatnonzero((s_idx >= start) & (s_idx < stop))
+            if not len(sel):
+                continue
+            cbf, cf, rule, elig = self.components(start, stop)
+            if normalized:
+                cbf, cf, rule = (scaler.transform(m) for scaler, m in zip(self.scalers, (cbf, cf, rule)))
+            rows, cols = s_idx[sel] - start, i_idx[sel]
+            for values, block in zip(out, (cbf, cf, rule, elig)):
+                values[sel] = block[rows, cols]
+        if normalized:
+            for values in out[:3]:
+                values[~out[3]] = 0.0
+        return tuple(out)
+
+    def _blocks(self, block_size):
+        n = len(self.student_ids)
+        return [(b, start, min(start + block_size, n)) for b, start in enumerate(range(0, n, block_size))]
+
+    def input_digest(self):
+        """Content hash of the inputs the scores depend on, so edited data never resumes old parts."""
+        return joblib.hash([
+            self.students_df, self.internships_df, self.student_embs, self.internship_embs,
+            self.student_tfidf, self.job_tfidf, self.sbert_weight, self.scalers, self.candidates,
+            self.cf_factors, self.std_scaler, self.rule_engine, self.artifacts_digest,
+        ])
+
+    def _load_state(self, work_dir, block_size):
+        state = {"n_students": len(self.student_ids), "n_internships": len(self.intern_ids),
+                 "block_size": block_size, "top_k": self.top_k, "fixed_scalers": self.scalers is not None,
+                 "inputs": self.input_digest()}
+        path = work_dir / "state.json"
+        if path.exists() and json.loads(path.read_text()) == state:
+            return
+        # different run: drop whatever an older one left behind
+        for old in list(work_dir.glob("part-*.npz")) + [work_dir / "scalers.pkl"]:
+            old.unlink(missing_ok=True)
+        _atomic_write(path, lambda tmp: tmp.write_text(json.dumps(state)))
+
+    def fit_scalers(self, work_dir, block_size):
+        """Pass 1: column-wise MinMax scalers over all students, resumable per block."""
+        path = Path(work_dir) / "scalers.pkl"
+        if path.exists():
+            saved = joblib.load(path)
+        else:
+            saved = {"next_block": 0, "scalers": (MinMaxScaler(), MinMaxScaler(), MinMaxScaler())}
+        blocks = self._blocks(block_size)
+        for b, start, stop in blocks[saved["next_block"]:]:
+            cbf, cf, rule, _ = self.components(start, stop)
+            for scaler, values in zip(saved["scalers"], (cbf, cf, rule)):
+                scaler.partial_fit(values)
+            saved["next_block"] = b + 1
+            _atomic_write(path, lambda tmp: joblib.dump(saved, tmp))
+        return saved["scalers"]
+
+    def score_block(self, start, stop, on_block=None):
+        cbf, cf, rule, elig = self.components(start, stop)
+        cbf_scaler, cf_scaler, rule_scaler = self.scalers
+        cbf = cbf_scaler.transform(cbf); cbf[~elig] = 0.0
+        cf = cf_scaler.transform(cf); cf[~elig] = 0.0
+        rule = rule_scaler.transform(rule); rule[~elig] = 0.0
+        builder = PairFeatureBuilder(self.students_df.iloc[start:stop], self.internships_df, cbf, cf, rule)
+
+        def global_rows(s_idx, i_idx, preds):
+            on_block(s_idx + start, i_idx, preds)
+
+        topk, pred_min, pred_max = score_eligible(
+            builder, self.predict, elig, top_k=self.top_k, chunk_size=self.chunk_size,
+            std_scaler=self.std_scaler, on_chunk=global_rows if on_block is not None else None)
+        s_idx, i_idx, preds, rank = topk.result()
+        return s_idx + start, i_idx, preds, rank, pred_min, pred_max
+
+    def run(self, work_dir, block_size=1024, on_block=None):
+        """Score every block not finished yet; returns the number of blocks scored now.
+
+        ``on_block(s_idx, i_idx, preds)`` sees every scored chunk of eligible
+        pairs (global student positions); blocks finished by an earlier run
+        are not replayed.
+        """
+        work_dir = Path(work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        self._load_state(work_dir, block_size)
+        if self.scalers is None:
+            self.scalers = self.fit_scalers(work_dir, block_size)
+        scored = 0
+        for b, start, stop in self._blocks(block_size):
+            part = work_dir / f"part-{b:06d}.npz"
+            if part.exists():
+                continue
+            s_idx, i_idx, preds, rank, pred_min, pred_max = self.score_block(start, stop, on_block)
+
+            def write(tmp):
+                with open(tmp, 'wb') as f:
+                    np.savez(f, s_idx=s_idx, i_idx=i_idx, preds=preds, rank=rank,
+                             pred_range=np.array([pred_min, pred_max]))
+
+            _atomic_write(part, write)
+            scored += 1
+        return scored
+
+    def pred_range(self, work_dir):
+        lo, hi = np.inf, -np.inf
+        for part in sorted(Path(work_dir).glob("part-*.npz")):
+            with np.load(part) as data:
+                lo, hi = min(lo, data['pred_range'][0]), max(hi, data['pred_range'][1])
+        return float(lo), float(hi)
+
+    def finalize(self, work_dir, recs_csv):
+        """Stream the part files into recommendations.csv; returns ``(rows, pred_min, pred_max)``."""
+        work_dir, recs_csv = Path(work_dir), Path(recs_csv)
+        pred_min, pred_max = self.pred_range(work_dir)
+        student_ids = np.asarray(self.student_ids, dtype=object)
+        intern_ids = np.asarray(self.intern_ids, dtype=object)
+        titles = self.internships_df['title'].to_numpy(dtype=object)
+        domains = self.internships_df['domain'].to_numpy(dtype=object)
+        rows = 0
+        tmp = recs_csv.with_name(f".{recs_csv.name}-{os.getpid()}")
+        with open(tmp, 'w', newline='') as f:
+            for n, part in enumerate(sorted(work_dir.glob("part-*.npz"))):
+                with np.load(part) as data:
+                    s_idx, i_idx = data['s_idx'], data['i_idx']
+                    pd.DataFrame({
+                        'student_idx': s_idx, 'student_id': student_ids[s_idx],
+                        'intern_idx': i_idx, 'internship_id': intern_ids[i_idx],
+                        'title': titles[i_idx], 'domain': domains[i_idx],
+                        'score': (data['preds'] - pred_min) / (pred_max - pred_min + 1e-9),
+                        'rank': data['rank'],
+                    }).to_csv(f, index=False, header=(n == 0))
+                    rows += len(s_idx)
+        os.replace(tmp, recs_csv)
+        # published: the next run starts from scratch instead of resuming these parts
+        for done in list(work_dir.glob("part-*.npz")) + [work_dir / "scalers.pkl", work_dir / "state.json"]:
+            done.unlink(missing_ok=True)
+        return rows, pred_min, pred_max
+
+
+def main(out_dir, block_size=1024):
+    """Rescore every student from the saved artifacts (resumes an interrupted run)."""
+    from app.cold_start import embedder_pool, profile_text
+    from app.cf import CF_FACTORS_FILENAME, SVDFactors
+    from app.artifacts import content_version
+    from app.rules import FAIRNESS_BOOST, RuleEngine
+
+    out_dir = Path(out_dir)
+    students = pd.read_csv(out_dir / "students_synthetic.csv")
+    internships = pd.read_csv(out_dir / "internships_synthetic.csv")
+    config = json.loads((out_dir / "scoring_config.json").read_text())
+    texts = (students['profile_text'].fillna('').tolist() if 'profile_text' in students
+             else [profile_text(row) for row in students.to_dict('records')])
+    tfidf = joblib.load(out_dir / "tfidf_vectorizer.pkl")
+    meta = joblib.load(out_dir / "meta_model_xgb.pkl")
+    scorer = BlockScorer(
+        students, internships,
+        rule_engine=RuleEngine(internships, config.get('fairness_boost', FAIRNESS_BOOST)),
+        cf_factors=SVDFactors.load(out_dir / CF_FACTORS_FILENAME),
+        predict=meta.predict, std_scaler=joblib.load(out_dir / "meta_scaler.pkl"),
+        student_embs=embedder_pool(out_dir).encode(texts),
+        internship_embs=np.load(out_dir / "internship_embs.npy"),
+        student_tfidf=tfidf.transform(texts),
+        job_tfidf=tfidf.transform(internships['job_text'].fillna('').tolist()),
+        sbert_weight=float(config.get('cbf_sbert_weight', 0.75)),
+        scalers=tuple(joblib.load(out_dir / f"{name}_scaler.pkl") for name in ("cbf", "cf", "rule")),
+        top_k=int(config.get('top_k', 10)),
+        artifacts_digest=content_version([out_dir / name for name in (
+            "scoring_config.json", "tfidf_vectorizer.pkl", "meta_model_xgb.pkl", "meta_scaler.pkl",
+            "cbf_scaler.pkl", "cf_scaler.pkl", "rule_scaler.pkl", "internship_embs.npy", CF_FACTORS_FILENAME)]),
+    )
+    work_dir = out_dir / "scoring_work"
+    scored = scorer.run(work_dir, block_size=block_size)
+    rows, pred_min, pred_max = scorer.finalize(work_dir, out_dir / "recommendations.csv")
+    print(f"scored {scored} new blocks; wrote {rows} rows (meta pred range {pred_min:.4f}..{pred_max:.4f})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Blockwise (resumable) recommendation scoring")
+    parser.add_argument("out_dir", nargs="?", default="notebook/outputs_recommender_v2")
+    parser.add_argument("--block-size", type=int, default=1024)
+    args = parser.parse_args()
+    main(args.out_dir, args.block_size)
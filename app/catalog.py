@@ -0,0 +1,191 @@
+# app/catalog.py
+import bisect
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from app.response_cache import dumps
+
+DETAIL_FIELDS = ['required_skills', 'min_age', 'max_age', 'stipend', 'remote',
+                 'capacity', 'org_pref_govt', 'ministry', 'state',
+                 'csr_underprivileged_pct', 'description', 'job_text']
+INT_FIELDS = ['remote', 'min_age', 'max_age', 'capacity', 'org_pref_govt']
+FLOAT_FIELDS = ['stipend', 'csr_underprivileged_pct']
+
+
+def clean_record(rec):
+    """NaN -> None and int/float casts so a record is JSON ready."""
+    for key, value in rec.items():
+        if pd.isna(value):
+            rec[key] = None
+    for field in INT_FIELDS:
+        if rec.get(field) is not None:
+            rec[field] = int(rec[field])
+    for field in FLOAT_FIELDS:
+        if rec.get(field) is not None:
+            rec[field] = float(rec[field])
+    return rec
+
+
+def build_item_table(internship_ids, internships_df, fallback_meta=None):
+    """Per-internship (titles, domains, details) aligned with ``internship_ids``.
+
+    ``fallback_meta`` (title/domain indexed by internship_id) fills in
+    internships that are missing from the catalog.
+    """
+    vocab = pd.Index(internship_ids, dtype=object)
+    if not internships_df.empty:
+        items = internships_df.assign(internship_id=internships_df['internship_id'].astype(str))
+        items = items.drop_duplicates('internship_id').set_index('internship_id').reindex(vocab)
+    else:
+        items = pd.DataFrame(index=vocab, columns=['title', 'domain'])
+    if fallback_meta is not None and not fallback_meta.empty:
+        for col in ['title', 'domain']:
+            items[col] = items[col].astype(object).fillna(fallback_meta[col].reindex(vocab))
+
+    titles = [None if pd.isna(v) else v for v in items['title'].tolist()]
+    domains = [None if pd.isna(v) else v for v in items['domain'].tolist()]
+    details = None
+    if not internships_df.empty:
+        details = [clean_record(rec) for rec in items.reindex(columns=DETAIL_FIELDS).to_dict(orient='records')]
+    return titles, domains, details
+
+
+# ``fields=summary``: what the list views render
+SUMMARY_FIELDS = ['internship_id', 'title', 'domain', 'stipend']
+
+
+def parse_fields(spec, allowed, summary=SUMMARY_FIELDS):
+    """Fields named by a ``fields=`` value (names and the ``summary`` / ``full`` presets).
+
+    Returned in ``allowed`` order; None means every field (``full`` or no
+    parameter). Raises ValueError for unknown names.
+    """
+    if spec is None:
+        return None
+    wanted = set()
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        if name == "full":
+            return None
+        if name == "summary":
+            wanted.update(summary)
+        elif name in allowed:
+            wanted.add(name)
+        else:
+            raise ValueError(f"unknown field {name!r}")
+    if not wanted:
+        raise ValueError("fields is empty")
+    return [field for field in allowed if field in wanted]
+
+
+def project(rec, fields):
+    return rec if fields is None else {field: rec.get(field) for field in fields}
+
+
+def keyset_page(keys, after=None, limit=None):
+    """Slice of the sorted ``keys`` strictly after ``after``, and the next cursor (None at the end)."""
+    start = 0 if after is None else bisect.bisect_right(keys, after)
+    stop = len(keys) if limit is None else min(len(keys), start + max(0, limit))
+    page = keys[start:stop]
+    return page, (page[-1] if page and stop < len(keys) else None)
+
+
+class InternshipCatalog:
+    """Internship catalog loaded once per process from internships_synthetic.csv.
+
+    Keeps cleaned, typed records, a hash index on ``internship_id`` and the
+    serialized full-list payload. ``refresh()`` is a stat() call; the file is
+    only re-read when its mtime changes and only re-parsed when its content
+    hash changes too.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = []
+        self.index = {}
+        self.digest = None
+        self._mtime = None
+        self._list_body = None
+        self.fields = []
+        # projected list bodies by field tuple, dropped with the records
+        self._projected = {}
+        # (records, their index, sorted ids) for paging
+        self._sorted = ([], {}, [])
+        self._lock = threading.Lock()
+
+    @property
+    def exists(self):
+        return self._mtime is not None
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            if self._mtime is not None:
+                with self._lock:
+                    self._load(None, None)
+            return self
+        if mtime == self._mtime:
+            return self
+        with self._lock:
+            if mtime != self._mtime:
+                raw = self.path.read_bytes()
+                digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                if digest != self.digest:
+                    self._load(raw, digest)
+                self._mtime = mtime
+        return self
+
+    def _load(self, raw, digest):
+        if raw is None:
+            records, fields, mtime = [], [], None
+        else:
+            df = pd.read_csv(io.BytesIO(raw))
+            records = [clean_record(rec) for rec in df.to_dict(orient='records')]
+            fields, mtime = [str(col) for col in df.columns], self._mtime
+        index = {}
+        for pos, rec in enumerate(records):
+            index.setdefault(str(rec.get('internship_id')), pos)
+        # one record per id (the one ``get`` returns), so an id is an unambiguous cursor
+        ids = sorted(index)
+        # swap everything in one go so readers never see a half-built catalog
+        self.records, self.index, self.digest, self._list_body, self._mtime = records, index, digest, None, mtime
+        self._sorted = (records, index, ids)
+        self.fields, self._projected = fields, {}
+
+    def get(self, internship_id: str):
+        pos = self.index.get(internship_id)
+        return None if pos is None else self.records[pos]
+
+    def page(self, after=None, limit=None):
+        """Records sorted by internship_id after the ``after`` cursor: ``(records, next_after)``."""
+        records, index, ids = self._sorted
+        page, next_after = keyset_page(ids, after, limit)
+        return [records[index[iid]] for iid in page], next_after
+
+    def list_body(self, fields=None) -> bytes:
+        """Serialized ``{"count": n, "internships": [...]}`` payload, optionally with only ``fields``."""
+        if fields is not None:
+            return self._projected_body(tuple(fields))
+        body = self._list_body
+        if body is None:
+            records = self.records
+            body = dumps({"count": len(records), "internships": records})
+            if records is self.records:
+                self._list_body = body
+        return body
+
+    def _projected_body(self, fields):
+        projected = self._projected
+        body = projected.get(fields)
+        if body is None:
+            records = self.records
+            # only the requested columns are copied and encoded
+            body = dumps({"count": len(records), "internships": [project(rec, fields) for rec in records]})
+            if records is self.records and len(projected) < 32:
+                projected[fields] = body
+        return body
@@ -0,0 +1,98 @@
+# app/cf.py
+"""
+Collaborative-filtering scores from exported SVD factors.
+
+The notebook trains ``surprise.SVD``; its user/item factors and biases are
+saved to ``svd_factors.npz`` so CF scores become blocked matrix products
+(pipeline) or a single mat-vec (API) with no Surprise import or pickle.
+Scores follow ``SVD.predict(...).est`` exactly: global mean, plus the user
+and item bias when known, plus ``q_i . p_u`` when both are known, clipped
+to the rating scale. Unknown users/items map to an all-zero row.
+"""
+import numpy as np
+
+CF_FACTORS_FILENAME = "svd_factors.npz"
+
+
+class SVDFactors:
+    def __init__(self, pu, qi, bu, bi, global_mean, user_ids, item_ids, rating_scale=(1, 5), biased=True):
+        # one extra zero row at the end stands in for unknown ids
+        self.pu = np.vstack([np.asarray(pu, dtype=np.float64), np.zeros((1, np.shape(pu)[1]))])
+        self.qi = np.vstack([np.asarray(qi, dtype=np.float64), np.zeros((1, np.shape(qi)[1]))])
+        self.bu = np.append(np.asarray(bu, dtype=np.float64), 0.0)
+        self.bi = np.append(np.asarray(bi, dtype=np.float64), 0.0)
+        self.global_mean = float(global_mean)
+        self.user_ids = np.asarray(user_ids, dtype=str)
+        self.item_ids = np.asarray(item_ids, dtype=str)
+        self.rating_scale = tuple(float(x) for x in rating_scale)
+        self.biased = bool(biased)
+        self._users = {uid: k for k, uid in enumerate(self.user_ids.tolist())}
+        self._items = {iid: k for k, iid in enumerate(self.item_ids.tolist())}
+
+    @classmethod
+    def from_surprise(cls, svd):
+        """Export a fitted ``surprise.SVD`` (ids kept in Surprise's inner-id order)."""
+        ts = svd.trainset
+        return cls(
+            pu=svd.pu, qi=svd.qi, bu=svd.bu, bi=svd.bi, global_mean=ts.global_mean,
+            user_ids=[ts.to_raw_uid(u) for u in range(ts.n_users)],
+            item_ids=[ts.to_raw_iid(i) for i in range(ts.n_items)],
+            rating_scale=ts.rating_scale, biased=getattr(svd, 'biased', True),
+        )
+
+    def save(self, path):
+        np.savez(path, pu=self.pu[:-1], qi=self.qi[:-1], bu=self.bu[:-1], bi=self.bi[:-1],
+                 global_mean=np.float64(self.global_mean), user_ids=self.user_ids, item_ids=self.item_ids,
+                 rating_scale=np.asarray(self.rating_scale), biased=np.bool_(self.biased))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['pu'], data['qi'], data['bu'], data['bi'], float(data['global_mean']),
+                       data['user_ids'], data['item_ids'], tuple(data['rating_scale']), bool(data['biased']))
+
+    def __contains__(self, user_id):
+        return str(user_id) in self._users
+
+    def user_rows(self, user_ids):
+        unknown = len(self.user_ids)
+        return np.array([self._users.get(str(u), unknown) for u in user_ids], dtype=np.int64)
+
+    def item_rows(self, item_ids):
+        unknown = len(self.item_ids)
+        return np.array([self._items.get(str(i), unknown) for i in item_ids], dtype=np.int64)
+
+    def _estimate(self, u, i):
+        """Scores of user rows ``u`` against item rows ``i`` (both row arrays)."""
+        dots = self.pu[u] @ self.qi[i].T
+        if self.biased:
+            est = self.global_mean + self.bu[u][:, None] + self.bi[i][None, :] + dots
+        else:
+            known = (u < len(self.user_ids))[:, None] & (i < len(self.item_ids))[None, :]
+            est = np.where(known, dots, self.global_mean)
+        return np.clip(est, *self.rating_scale)
+
+    def matrix(self, user_ids, item_ids, block=4096):
+        """Dense ``len(user_ids) x len(item_ids)`` CF matrix, ``block`` users per product."""
+        u, i = self.user_rows(user_ids), self.item_rows(item_ids)
+        out = np.empty((len(u), len(i)), dtype=np.float64)
+        for start in range(0, len(u), block):
+            out[start:start + block] = self._estimate(u[start:start + block], i)
+        return out
+
+    def pair_scores(self, user_rows, item_rows):
+        """Scores of aligned (user row, item row) pairs, e.g. only the eligible ones."""
+        u = np.asarray(user_rows, dtype=np.int64)
+        i = np.asarray(item_rows, dtype=np.int64)
+        dots = np.einsum('ij,ij->i', self.pu[u], self.qi[i])
+        if self.biased:
+            est = self.global_mean + self.bu[u] + self.bi[i] + dots
+        else:
+            est = np.where((u < len(self.user_ids)) & (i < len(self.item_ids)), dots, self.global_mean)
+        return np.clip(est, *self.rating_scale)
+
+    def scores_for(self, user_id, item_ids=None, item_rows=None):
+        """One user's CF scores over ``item_ids`` (or precomputed ``item_rows``)."""
+        if item_rows is None:
+            item_rows = self.item_rows(item_ids)
+        return self._estimate(self.user_rows([user_id]), np.asarray(item_rows, dtype=np.int64))[0]
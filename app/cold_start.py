@@ -0,0 +1,370 @@
+# app/cold_start.py
+"""
+Online scoring for students that are not in recommendations.csv.
+
+Rebuilds the notebook's Cell 11 feature vector for one profile against the
+whole catalog in a single vectorized pass, scores it with the persisted
+meta model and returns the top-K eligible internships via argpartition.
+
+Artifacts read from outputs_recommender_v2 (written by the notebook):
+    internship_embs.npy        normalized SBERT embeddings (catalog order)
+    tfidf_vectorizer.pkl       fitted TfidfVectorizer
+    cbf_scaler.pkl / cf_scaler.pkl / rule_scaler.pkl
+    cf_cold_start.npy          SVD estimate for an unseen student, per internship
+    meta_model_xgb.pkl / meta_scaler.pkl
+    scoring_config.json        ensemble weights, fairness boosts, meta pred range
+    internship_ann.npz         optional IVF index; large catalogs only score its candidates
+    svd_factors.npz            optional SVD factors; students the CF model knows get their own CF row
+    embedding_cache/           optional SBERT cache; cached profile texts skip the model
+"""
+import copy
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.ann_index import ANN_FILENAME, IVFFlatIndex
+from app.cf import CF_FACTORS_FILENAME, SVDFactors
+from app.embedding_cache import CACHE_DIRNAME, EmbeddingCache
+from app.pair_features import FEATURE_COLS, STD_COLS, multi_hot, skill_vocab
+from app.rules import FAIRNESS_BOOST, RuleEngine
+
+REQUIRED_ARTIFACTS = ['internship_embs.npy', 'tfidf_vectorizer.pkl', 'cbf_scaler.pkl', 'cf_scaler.pkl',
+                      'rule_scaler.pkl', 'cf_cold_start.npy', 'meta_model_xgb.pkl', 'meta_scaler.pkl',
+                      'scoring_config.json']
+SBERT_MODEL_DIR = "sbert_all_mpnet_model"
+SBERT_MODEL_NAME = "all-mpnet-base-v2"
+# catalogs at least this big only score the ANN top-N instead of every internship
+ANN_MIN_CATALOG = int(os.getenv("ANN_MIN_CATALOG", "5000"))
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "500"))
+
+
+def profile_text(profile):
+    # same construction as the notebook's Cell 2
+    return f"{profile['skills']} {profile['domain']} project_impact:{profile['project_impact']}"
+
+
+class EmbedderPool:
+    """Process-wide pool of loaded SBERT models.
+
+    Models are loaded (and run once) in a background thread at startup so
+    the first cold-start request does not pay the model load; concurrent
+    requests each borrow their own instance. Texts found in ``cache`` (the
+    pipeline's read-only EmbeddingCache) are not encoded at all.
+    """
+
+    def __init__(self, model_path, size: int = 1, cache=None):
+        self.model_path = str(model_path)
+        self.size = max(1, int(size))
+        self.cache = cache
+        self._models = queue.Queue()
+        self._started = False
+        self._lock = threading.Lock()
+        self.error = None
+
+    def warm(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._load_all, name="sbert-warmup", daemon=True).start()
+
+    def _load_all(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+            for _ in range(self.size):
+                model = SentenceTransformer(self.model_path)
+                model.encode(["warmup"], convert_to_numpy=True)
+                self._models.put(model)
+        except Exception as e:
+            self.error = repr(e)
+
+    def encode(self, texts, timeout: float = 60.0):
+        cache = self.cache
+        if cache is None:
+            embs = self._encode(texts, timeout)
+        else:
+            embs = cache.get_or_encode(texts, lambda missing: self._encode(missing, timeout))
+        embs = np.asarray(embs, dtype=np.float32)
+        norms = np.linalg.norm(embs, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embs / norms
+
+    def _borrow(self, timeout):
+        # waits in short slices so a load that fails meanwhile is reported at once
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.error is not None:
+                raise RuntimeError(f"SBERT model unavailable: {self.error}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError(f"no SBERT model free after {timeout:g}s")
+            try:
+                return self._models.get(timeout=min(remaining, 0.25))
+            except queue.Empty:
+                continue
+
+    def _encode(self, texts, timeout):
+        self.warm()
+        model = self._borrow(timeout)
+        try:
+            embs = model.encode(list(texts), convert_to_numpy=True, show_progress_bar=False)
+        finally:
+            self._models.put(model)
+        return embs
+
+
+_pools = {}
+
+
+def embedder_pool(out_dir):
+    """Shared pool for the SBERT model saved next to the artifacts."""
+    local = Path(out_dir) / SBERT_MODEL_DIR
+    path = str(local) if local.exists() else SBERT_MODEL_NAME
+    pool = _pools.get(path)
+    if pool is None:
+        pool = _pools.setdefault(path, EmbedderPool(path, size=int(os.getenv("SBERT_POOL_SIZE", "1"))))
+    # reopened on every artifact load so rows the pipeline appended become visible
+    pool.cache = EmbeddingCache(Path(out_dir) / CACHE_DIRNAME, SBERT_MODEL_NAME, read_only=True)
+    return pool
+
+
+class ColdStartScorer:
+    """Scores arbitrary student profiles against the whole catalog."""
+
+    def __init__(self, internships_df, internship_embs, tfidf, cbf_scaler, cf_scaler, rule_scaler,
+                 cf_cold, meta, meta_scaler, config, embedder, ann=None, cf_factors=None):
+        if len(internship_embs) != len(internships_df):
+            raise ValueError("internship_embs.npy does not match the internship catalog")
+        self.internships_df = internships_df
+        self.internship_embs = np.ascontiguousarray(internship_embs, dtype=np.float32)
+        self.tfidf = tfidf
+        self.job_tfidf = tfidf.transform(internships_df['job_text'].fillna('').tolist())
+        self.cbf_scaler = cbf_scaler
+        self.cf_scaler = cf_scaler
+        self.rule_scaler = rule_scaler
+        self.meta = meta
+        self.meta_scaler = meta_scaler
+        self.config = config
+        self.embedder = embedder
+        self.ann = ann if ann is not None and len(internships_df) >= ANN_MIN_CATALOG else None
+        # positions added or re-embedded after the ANN index was built; always scored
+        self.ann_extra = (np.arange(len(self.ann), len(internships_df), dtype=np.int64)
+                          if self.ann is not None else np.zeros(0, dtype=np.int64))
+        self.sbert_weight = float(config.get('cbf_sbert_weight', 0.75))
+        self.rules = RuleEngine(internships_df, config.get('fairness_boost', FAIRNESS_BOOST))
+        self.pred_min = float(config['meta_pred_min'])
+        self.pred_max = float(config['meta_pred_max'])
+        self.cf_cold = np.asarray(cf_cold, dtype=np.float64)
+
+        # per-internship columns, computed once
+        self.mid_age = (self.rules.min_age + self.rules.max_age) / 2.0
+        self.stipend_norm = self.rules.stipend_norm
+        self.remote_match = (internships_df['remote'].to_numpy() == 1).astype(np.float64)
+        self.domains = internships_df['domain'].to_numpy(dtype=object)
+        self.cf_norm = cf_scaler.transform(np.asarray(cf_cold, dtype=np.float64)[None, :])[0]
+        self.cf_factors = cf_factors
+        if cf_factors is not None:
+            self.cf_item_rows = cf_factors.item_rows(internships_df['internship_id'].astype(str))
+        # MinMaxScaler.transform is x * scale_ + min_; keep the vectors so a
+        # subset of columns can be normalized
+        self.cbf_scale, self.cbf_min = cbf_scaler.scale_, cbf_scaler.min_
+        self.cf_scale, self.cf_min = cf_scaler.scale_, cf_scaler.min_
+        self.rule_scale, self.rule_min = rule_scaler.scale_, rule_scaler.min_
+
+        # multi-hot required skills: overlap is one mat-vec per profile
+        required = internships_df['required_skills'].tolist()
+        self.skill_vocab = skill_vocab(required)
+        self.req_skills = multi_hot(required, self.skill_vocab)
+        self.req_counts = np.asarray(self.req_skills.sum(axis=1), dtype=np.float64).ravel()
+
+    @classmethod
+    def load(cls, out_dir, internships_df):
+        """Load the persisted artifacts; None if any of them is missing."""
+        out_dir = Path(out_dir)
+        if internships_df is None or internships_df.empty:
+            return None
+        if not all((out_dir / name).exists() for name in REQUIRED_ARTIFACTS):
+            return None
+        import joblib
+        return cls(
+            internships_df=internships_df,
+            internship_embs=np.load(out_dir / 'internship_embs.npy'),
+            tfidf=joblib.load(out_dir / 'tfidf_vectorizer.pkl'),
+            cbf_scaler=joblib.load(out_dir / 'cbf_scaler.pkl'),
+            cf_scaler=joblib.load(out_dir / 'cf_scaler.pkl'),
+            rule_scaler=joblib.load(out_dir / 'rule_scaler.pkl'),
+            cf_cold=np.load(out_dir / 'cf_cold_start.npy'),
+            meta=joblib.load(out_dir / 'meta_model_xgb.pkl'),
+            meta_scaler=joblib.load(out_dir / 'meta_scaler.pkl'),
+            config=json.loads((out_dir / 'scoring_config.json').read_text()),
+            embedder=embedder_pool(out_dir),
+            ann=IVFFlatIndex.load(out_dir / ANN_FILENAME) if (out_dir / ANN_FILENAME).exists() else None,
+            cf_factors=(SVDFactors.load(out_dir / CF_FACTORS_FILENAME)
+                        if (out_dir / CF_FACTORS_FILENAME).exists() else None),
+        )
+
+    def rule_scores(self, profile, rows=slice(None)):
+        """Cell 4 rule score and eligibility of one profile vs the internships in ``rows``."""
+        rule, elig = self.rules.score({k: [v] for k, v in profile.items()}, rows)
+        return rule[0], elig[0]
+
+    def cf_scores(self, profile, rows=slice(None)):
+        """Normalized CF column: the student's own SVD row if known, else the cold-start estimate."""
+        sid = profile.get('student_id')
+        if self.cf_factors is None or sid is None or sid not in self.cf_factors:
+            return self.cf_norm[rows]
+        cf = self.cf_factors.scores_for(sid, item_rows=self.cf_item_rows[rows])
+        return cf * self.cf_scale[rows] + self.cf_min[rows]
+
+    def features(self, profile, student_emb, rows=slice(None)):
+        """Cell 11 feature matrix (one row per internship in ``rows``) plus the eligibility mask."""
+        text = profile_text(profile)
+        cbf_sbert = self.internship_embs[rows] @ student_emb
+        cbf_tfidf = (self.job_tfidf[rows] @ self.tfidf.transform([text]).T).toarray().ravel()
+        cbf = self.sbert_weight * cbf_sbert + (1.0 - self.sbert_weight) * cbf_tfidf
+        cbf_norm = cbf * self.cbf_scale[rows] + self.cbf_min[rows]
+        rule, elig = self.rule_scores(profile, rows)
+        rule_norm = rule * self.rule_scale[rows] + self.rule_min[rows]
+
+        skills = multi_hot([profile.get('skills')], self.skill_vocab).toarray()[0]
+        req_counts = self.req_counts[rows]
+        overlap = np.divide(self.req_skills[rows] @ skills, req_counts,
+                            out=np.zeros(len(req_counts)), where=req_counts > 0)
+
+        n = len(req_counts)
+        X = np.column_stack([
+            cbf_norm, self.cf_scores(profile, rows), rule_norm, overlap,
+            (self.domains[rows] == profile.get('domain')).astype(np.float64),
+            np.abs(float(profile['age']) - self.mid_age[rows]) / 20.0,
+            self.stipend_norm[rows], self.remote_match[rows],
+            np.full(n, 1.0 if profile.get('github') else 0.0),
+            np.full(n, float(profile.get('project_impact', 0.0))),
+            np.full(n, float(profile.get('rural', 0))),
+            np.full(n, float(profile.get('female', 0))),
+        ])
+        X[~elig] = 0.0
+        return X, elig
+
+    def predict(self, X):
+        """Meta-model scores of feature rows, normalized with the pipeline's prediction range."""
+        X = pd.DataFrame(X, columns=FEATURE_COLS)
+        X[STD_COLS] = self.meta_scaler.transform(X[STD_COLS])
+        preds = np.asarray(self.meta.predict(X), dtype=np.float64)
+        return (preds - self.pred_min) / (self.pred_max - self.pred_min + 1e-9)
+
+    def score(self, profile, top_k: int = 10, student_emb=None, allowed=None):
+        """Return ``(internship positions, scores)`` of the top-K eligible internships.
+
+        ``allowed`` (a boolean mask over catalog positions) restricts scoring
+        to those internships.
+        """
+        if student_emb is None:
+            student_emb = self.embedder.encode([profile_text(profile)])[0]
+        rows = np.arange(len(self.domains))
+        if self.ann is not None and allowed is None:
+            # big catalog: only the ANN neighbourhood of the profile is scored
+            cand, _ = self.ann.search(student_emb, k=ANN_CANDIDATES)
+            rows = np.union1d(cand[0][cand[0] >= 0], self.ann_extra)
+        if allowed is not None:
+            # a filter can exclude most of the ANN neighbourhood, so every allowed row is scored
+            rows = rows[allowed[rows]]
+            if len(rows) == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        X, elig = self.features(profile, student_emb, rows)
+        scores = self.predict(X)
+
+        candidates = np.flatnonzero(elig)
+        k = min(max(0, top_k), len(candidates))
+        scores = scores[candidates]
+        candidates = rows[candidates]
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        part = np.argpartition(-scores, k - 1)[:k]
+        part = part[np.argsort(-scores[part], kind='stable')]
+        return candidates[part], scores[part].astype(np.float32)
+
+    def with_internship(self, record, embedding):
+        """Copy of this scorer with ``record`` replacing (same id) or appended to the catalog.
+
+        Returns ``(scorer, position)``. An added internship has no fitted
+        MinMax range of its own, so its cbf/cf/rule columns borrow the median
+        range of the existing columns; the stipend range is recomputed over
+        the new catalog.
+        """
+        record = dict(record)
+        if not record.get('job_text'):
+            # same construction as the notebook's Cell 2
+            record['job_text'] = f"{record['required_skills']} {record['domain']} stipend:{record['stipend']}"
+        ids = self.internships_df['internship_id'].astype(str)
+        hits = np.flatnonzero(ids.to_numpy() == str(record['internship_id']))
+        df = self.internships_df.copy()
+        embs = self.internship_embs.copy()
+        scalers = [self.cbf_scaler, self.cf_scaler, self.rule_scaler]
+        cf_cold = self.cf_cold.copy()
+        if len(hits):
+            pos = int(hits[0])
+            for col, value in record.items():
+                if col in df.columns:
+                    df.at[df.index[pos], col] = value
+            embs[pos] = embedding
+        else:
+            pos = len(df)
+            df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
+            embs = np.vstack([embs, np.asarray(embedding, dtype=np.float32)[None, :]])
+            scalers = [_extend_minmax(scaler) for scaler in scalers]
+            if self.cf_factors is not None:
+                cold = self.cf_factors.scores_for("__cold_start__", [str(record['internship_id'])])[0]
+            else:
+                cold = float(np.median(cf_cold))
+            cf_cold = np.append(cf_cold, cold)
+        scorer = ColdStartScorer(df, embs, self.tfidf, *scalers, cf_cold, self.meta, self.meta_scaler,
+                                 self.config, self.embedder, ann=self.ann, cf_factors=self.cf_factors)
+        scorer.ann_extra = np.union1d(self.ann_extra, [pos]).astype(np.int64)
+        return scorer, pos
+
+    def save_catalog(self, out_dir):
+        """Write the catalog-aligned artifacts (embeddings, cold-start CF, MinMax scalers, ANN index).
+
+        Every file is staged first and then swapped in with ``os.replace``,
+        so a reader never sees a half-written one. Call it before rewriting
+        internships_synthetic.csv: the new catalog then always finds
+        artifacts of its length.
+        """
+        import joblib
+        out_dir = Path(out_dir)
+        writers = {
+            'internship_embs.npy': lambda f: np.save(f, self.internship_embs),
+            'cf_cold_start.npy': lambda f: np.save(f, self.cf_cold),
+        }
+        for name, scaler in (('cbf', self.cbf_scaler), ('cf', self.cf_scaler), ('rule', self.rule_scaler)):
+            writers[f'{name}_scaler.pkl'] = lambda f, scaler=scaler: joblib.dump(scaler, f)
+        if self.ann is not None and len(self.ann_extra):
+            writers[ANN_FILENAME] = self.ann.upserted(self.ann_extra, self.internship_embs[self.ann_extra]).save
+        staged = []
+        for name, write in writers.items():
+            tmp = out_dir / f".{name}-{os.getpid()}"
+            with open(tmp, 'wb') as f:
+                write(f)
+            staged.append((tmp, out_dir / name))
+        for tmp, path in staged:
+            os.replace(tmp, path)
+
+
+def _extend_minmax(scaler):
+    """MinMaxScaler with one extra column whose range is the median of the others."""
+    scaler = copy.deepcopy(scaler)
+    lo, hi = float(np.median(scaler.data_min_)), float(np.median(scaler.data_max_))
+    scaler.data_min_ = np.append(scaler.data_min_, lo)
+    scaler.data_max_ = np.append(scaler.data_max_, hi)
+    scaler.data_range_ = np.append(scaler.data_range_, hi - lo)
+    scaler.scale_ = np.append(scaler.scale_, float(np.median(scaler.scale_)) if hi == lo
+                              else (scaler.feature_range[1] - scaler.feature_range[0]) / (hi - lo))
+    scaler.min_ = np.append(scaler.min_, scaler.feature_range[0] - lo * scaler.scale_[-1])
+    scaler.n_features_in_ = len(scaler.scale_)
+    return scaler
@@ -0,0 +1,309 @@
+# app/columnar.py
+"""
+Binary columnar artifact bundle.
+
+Layout under ``<out_dir>/bundle/``::
+
+    CURRENT                    # name of the active version directory
+    <version>/manifest.json    # tables, row counts, column kinds
+    <version>/<table>.<col>.npy            # fixed-width numeric columns
+    <version>/<table>.<col>.codes.npy      # string columns: int32 codes (-1 = null)
+    <version>/<table>.<col>.offsets.npy    #   + int64 offsets into the dictionary
+    <version>/<table>.<col>.dict.bin       #   + utf-8 dictionary bytes
+    <version>/recs.*.npy                   # CSR recommendation arrays + sorted key index
+
+Everything is opened with ``mmap`` so uvicorn workers share the page cache
+instead of each parsing the CSVs into a private copy. Version directories
+are immutable; a new conversion writes a new directory and flips CURRENT,
+so snapshots still mapping an older version keep working.
+
+Convert existing CSV output with ``python -m app.columnar [out_dir]``.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.rec_store import RecommendationStore
+
+FORMAT_VERSION = 1
+BUNDLE_DIRNAME = "bundle"
+KEEP_VERSIONS = 2
+
+
+class StringColumn:
+    """Dictionary-encoded, memory-mapped string column."""
+
+    def __init__(self, codes, offsets, data):
+        self.codes = codes
+        self.offsets = offsets
+        self.data = data
+        self._dictionary = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _entry(self, code):
+        if code < 0:
+            return None
+        return bytes(self.data[self.offsets[code]:self.offsets[code + 1]]).decode('utf-8')
+
+    def __getitem__(self, i):
+        return self._entry(int(self.codes[i]))
+
+    def __iter__(self):
+        for code in self.codes:
+            yield self._entry(int(code))
+
+    def dictionary(self):
+        if self._dictionary is None:
+            offsets = self.offsets.tolist()
+            raw = bytes(self.data)
+            self._dictionary = [raw[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])]
+        return self._dictionary
+
+    def to_list(self):
+        d = self.dictionary()
+        return [None if c < 0 else d[c] for c in self.codes.tolist()]
+
+
+class SortedKeyIndex:
+    """student_id -> row lookup via binary search over mmapped fixed-width keys."""
+
+    def __init__(self, keys, rows):
+        self.keys = keys
+        self.rows = rows
+        self.width = keys.dtype.itemsize
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        kb = key.encode('utf-8') if isinstance(key, str) else key
+        if len(kb) > self.width or not len(self.keys):
+            return default
+        pos = int(np.searchsorted(self.keys, kb))
+        if pos < len(self.keys) and self.keys[pos] == kb:
+            return int(self.rows[pos])
+        return default
+
+
+def _encode_strings(values):
+    """values -> (codes, offsets, data) dictionary encoding; NaN/None -> -1."""
+    series = pd.Series(values, dtype=object)
+    mask = series.isna().to_numpy()
+    codes, uniques = pd.factorize(series.where(~mask, None).astype(object), use_na_sentinel=True)
+    encoded = [str(u).encode('utf-8') for u in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return codes.astype(np.int32), offsets, data
+
+
+class _Writer:
+    def __init__(self, path):
+        self.path = path
+        self.hash = hashlib.blake2b(digest_size=6)
+        self.tables = {}
+
+    def array(self, name, arr):
+        arr = np.ascontiguousarray(arr)
+        np.save(self.path / f"{name}.npy", arr, allow_pickle=False)
+        self.hash.update(name.encode())
+        self.hash.update(arr.tobytes())
+
+    def bytes(self, name, data):
+        (self.path / name).write_bytes(data.tobytes())
+        self.hash.update(name.encode())
+        self.hash.update(data.tobytes())
+
+    def strings(self, name, values):
+        codes, offsets, data = _encode_strings(values)
+        self.array(f"{name}.codes", codes)
+        self.array(f"{name}.offsets", offsets)
+        self.bytes(f"{name}.dict.bin", data)
+
+    def table(self, name, df):
+        columns = {}
+        for col in df.columns:
+            s = df[col]
+            if pd.api.types.is_bool_dtype(s) or pd.api.types.is_integer_dtype(s):
+                self.array(f"{name}.{col}", s.to_numpy(dtype=np.int64))
+                columns[col] = "int"
+            elif pd.api.types.is_float_dtype(s):
+                self.array(f"{name}.{col}", s.to_numpy(dtype=np.float64))
+                columns[col] = "float"
+            else:
+                self.strings(f"{name}.{col}", s.to_numpy(dtype=object))
+                columns[col] = "str"
+        self.tables[name] = {"rows": int(len(df)), "columns": columns}
+
+
+def write_bundle(out_dir, recs_df, students_df, internships_df):
+    """Write a new bundle version under ``<out_dir>/bundle`` and make it current.
+
+    Returns the version string.
+    """
+    root = Path(out_dir) / BUNDLE_DIRNAME
+    root.mkdir(parents=True, exist_ok=True)
+    staging = root / f".staging-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+
+    w = _Writer(staging)
+    w.table("students", students_df)
+    w.table("internships", internships_df)
+
+    iids = internships_df['internship_id'] if not internships_df.empty else None
+    store = RecommendationStore.from_frame(recs_df, iids)
+    w.array("recs.offsets", store.offsets)
+    w.array("recs.lengths", store.lengths)
+    w.array("recs.intern_idx", store.intern_idx)
+    w.array("recs.scores", store.scores)
+    w.strings("recs.student_id", store.student_ids)
+    w.strings("recs.internship_id", store.internship_ids)
+    # title/domain as recorded with the recs, for internships missing from the catalog
+    rec_meta = pd.DataFrame(columns=['title', 'domain'])
+    if recs_df is not None and not recs_df.empty:
+        rec_meta = (recs_df.assign(internship_id=recs_df['internship_id'].astype(str))
+                    .drop_duplicates('internship_id').set_index('internship_id'))
+    rec_meta = rec_meta.reindex(pd.Index(store.internship_ids))
+    w.strings("recs.item_title", rec_meta['title'].to_numpy(dtype=object))
+    w.strings("recs.item_domain", rec_meta['domain'].to_numpy(dtype=object))
+    # sorted fixed-width keys: O(log n) lookups without building a dict per worker
+    keys = np.array([str(s).encode('utf-8') for s in store.student_ids], dtype=bytes)
+    order = np.argsort(keys, kind='stable')
+    w.array("recs.keys", keys[order])
+    w.array("recs.key_rows", order.astype(np.int64))
+
+    version = w.hash.hexdigest()
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "tables": w.tables,
+        "recs": {"students": int(len(store)), "rows": int(len(store.intern_idx))},
+    }
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    final = root / version
+    if final.exists():
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, final)
+    tmp_current = root / f".CURRENT-{os.getpid()}"
+    tmp_current.write_text(version)
+    os.replace(tmp_current, root / "CURRENT")
+    _prune(root, version)
+    return version
+
+
+def _prune(root, keep):
+    versions = sorted(
+        (p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.')),
+        key=lambda p: p.stat().st_mtime, reverse=True,
+    )
+    for old in [p for p in versions if p.name != keep][KEEP_VERSIONS - 1:]:
+        # snapshots still mapping these files keep their pages until unmapped
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def current_version(out_dir):
+    try:
+        return (Path(out_dir) / BUNDLE_DIRNAME / "CURRENT").read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class Bundle:
+    """Read-only, memory-mapped view of one bundle version."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / "manifest.json").read_text())
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported bundle format {self.manifest.get('format')}")
+        self.version = self.manifest["version"]
+
+    @classmethod
+    def open_current(cls, out_dir):
+        version = current_version(out_dir)
+        if version is None:
+            return None
+        return cls(Path(out_dir) / BUNDLE_DIRNAME / version)
+
+    def array(self, name):
+        return np.load(self.path / f"{name}.npy", mmap_mode='r', allow_pickle=False)
+
+    def strings(self, name):
+        codes = self.array(f"{name}.codes")
+        offsets = self.array(f"{name}.offsets")
+        dict_path = self.path / f"{name}.dict.bin"
+        if dict_path.stat().st_size:
+            data = np.memmap(dict_path, dtype=np.uint8, mode='r')
+        else:
+            data = np.zeros(0, dtype=np.uint8)
+        return StringColumn(codes, offsets, data)
+
+    def column(self, table, col):
+        kind = self.manifest["tables"][table]["columns"][col]
+        if kind == "str":
+            return self.strings(f"{table}.{col}")
+        return self.array(f"{table}.{col}")
+
+    def frame(self, table):
+        """Materialize a table as a DataFrame."""
+        meta = self.manifest["tables"][table]
+        data = {}
+        for col, kind in meta["columns"].items():
+            c = self.column(table, col)
+            data[col] = c.to_list() if kind == "str" else np.asarray(c)
+        return pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]))
+
+    def store(self):
+        internship_ids = self.strings("recs.internship_id").to_list()
+        return RecommendationStore(
+            student_ids=self.strings("recs.student_id"),
+            offsets=self.array("recs.offsets"),
+            lengths=self.array("recs.lengths"),
+            intern_idx=self.array("recs.intern_idx"),
+            scores=self.array("recs.scores"),
+            internship_ids=np.asarray(internship_ids, dtype=object),
+            index=SortedKeyIndex(self.array("recs.keys"), self.array("recs.key_rows")),
+        )
+
+    def item_fallback(self):
+        """title/domain recorded with the recs, indexed by internship_id."""
+        ids = self.strings("recs.internship_id").to_list()
+        return pd.DataFrame({
+            'title': self.strings("recs.item_title").to_list(),
+            'domain': self.strings("recs.item_domain").to_list(),
+        }, index=pd.Index(ids, dtype=object))
+
+
+def convert_csvs(out_dir):
+    """CSV -> bundle converter for existing pipeline output."""
+    out_dir = Path(out_dir)
+
+    def read(name):
+        path = out_dir / name
+        return pd.read_csv(path) if path.exists() else pd.DataFrame()
+
+    return write_bundle(
+        out_dir,
+        read("recommendations.csv"),
+        read("students_synthetic.csv"),
+        read("internships_synthetic.csv"),
+    )
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "notebook/outputs_recommender_v2"
+    print(f"Wrote bundle version {convert_csvs(target)} under {Path(target) / BUNDLE_DIRNAME}")
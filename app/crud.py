@@ -1,56 +1,176 @@
 # app/crud.py
+import os
+import time
+
+from sqlalchemy import inspect, insert, text, tuple_
 from sqlalchemy.orm import Session
 from app import models
 import pandas as pd
 
+# rows read, converted and inserted per transaction by the CSV loaders
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "50000"))
+
+# column -> type for each table; missing or NaN values become NULL
+STUDENT_COLUMNS = {'student_id': str, 'domain': object, 'state': object, 'rural': int, 'female': int,
+                   'github': object}
+INTERNSHIP_COLUMNS = {'internship_id': str, 'title': object, 'domain': object, 'stipend': float, 'capacity': int}
+RECOMMENDATION_COLUMNS = {'student_id': str, 'internship_id': str, 'title': object, 'domain': object,
+                          'score': float, 'rank': int}
+# filled in where the column is missing altogether (as the old per-row loaders did)
+RECOMMENDATION_DEFAULTS = {'score': 0.0, 'rank': 0}
+
+# (student_id, internship_id) is unique; writes upsert on it
+RECOMMENDATION_KEYS = ['student_id', 'internship_id']
+# students per upsert batch (keeps the stale-row delete under SQLite's bound-parameter limit)
+UPSERT_BATCH_STUDENTS = 500
+
 def create_tables(engine):
     models.Base.metadata.create_all(bind=engine)
+    # create_all skips indexes of tables that already exist (databases from older versions)
+    with engine.begin() as conn:
+        existing = {ix['name'] for ix in inspect(conn).get_indexes('recommendations')}
+        if 'ux_recommendations_student_internship' not in existing:
+            # older databases may hold appended duplicates; keep the newest row of each pair
+            conn.execute(text("DELETE FROM recommendations WHERE id NOT IN "
+                              "(SELECT MAX(id) FROM recommendations GROUP BY student_id, internship_id)"))
+        for index in models.Recommendation.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
 
-def load_students_from_csv(db: Session, csv_path: str):
-    df = pd.read_csv(csv_path)
-    # basic upsert: clear table then bulk insert (simple approach)
-    db.query(models.Student).delete()
-    for _, r in df.iterrows():
-        s = models.Student(
-            student_id=str(r.get('student_id')),
-            domain=r.get('domain'),
-            state=r.get('state'),
-            rural=int(r.get('rural', 0)) if not pd.isna(r.get('rural', 0)) else None,
-            female=int(r.get('female', 0)) if not pd.isna(r.get('female', 0)) else None,
-            github=r.get('github', '')
-        )
-        db.add(s)
-    db.commit()
+def bump_generation(db: Session):
+    """Count a change to the recommendations table (SQLite ``user_version``).
 
-def load_internships_from_csv(db: Session, csv_path: str):
-    df = pd.read_csv(csv_path)
-    db.query(models.Internship).delete()
-    for _, r in df.iterrows():
-        it = models.Internship(
-            internship_id=str(r.get('internship_id')),
-            title=r.get('title'),
-            domain=r.get('domain'),
-            stipend=float(r.get('stipend')) if not pd.isna(r.get('stipend')) else None,
-            capacity=int(r.get('capacity')) if not pd.isna(r.get('capacity')) else None
-        )
-        db.add(it)
-    db.commit()
+    The SQLite serving backend folds it into the artifact version, so
+    workers notice that the table was reloaded or patched.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        version = db.execute(text("PRAGMA user_version")).scalar() or 0
+        db.execute(text(f"PRAGMA user_version = {int(version) + 1}"))
+        db.commit()
+
+def _records(df: pd.DataFrame, columns, defaults=None):
+    """Column-wise conversion of a chunk to executemany parameter dicts."""
+    out = {}
+    for col, kind in columns.items():
+        if col not in df:
+            value = (defaults or {}).get(col)
+            out[col] = pd.Series([value] * len(df), index=df.index, dtype=object)
+            continue
+        values = df[col]
+        if kind is str:
+            values = values.astype(str).where(values.notna(), None)
+        elif kind is int:
+            values = pd.to_numeric(values, errors='coerce').round().astype('Int64')
+        elif kind is float:
+            values = pd.to_numeric(values, errors='coerce')
+        # object dtype keeps plain Python values, which the DB driver binds directly
+        out[col] = values.astype(object).where(values.notna(), None)
+    return pd.DataFrame(out).to_dict('records')
+
+def _chunks(source, chunksize):
+    """DataFrame slices of a CSV path (read lazily) or of an in-memory frame."""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize)
+
+def _upsert(db: Session, table, keys):
+    """INSERT ... ON CONFLICT (keys) DO UPDATE for the dialects that have it."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"no upsert for {dialect}")
+    stmt = dialect_insert(table)
+    updates = {c.name: stmt.excluded[c.name] for c in table.columns if not c.primary_key and c.name not in keys}
+    return stmt.on_conflict_do_update(index_elements=keys, set_=updates)
 
-def save_recommendations_from_df(db: Session, recs_df: pd.DataFrame, reset=True):
-    if reset:
-        db.query(models.Recommendation).delete()
+def bulk_load(db: Session, model, source, columns, defaults=None, chunksize=None, replace=True, upsert_keys=None):
+    """Insert ``source`` (CSV path or DataFrame) into ``model``'s table, one transaction per chunk.
+
+    With ``replace`` the table is emptied in the first chunk's transaction;
+    with ``upsert_keys`` a row whose keys already exist updates it instead.
+    Memory stays bounded by ``chunksize`` rows. Returns
+    ``{"rows", "seconds", "rows_per_sec"}``.
+    """
+    started = time.perf_counter()
+    table = model.__table__
+    stmt = _upsert(db, table, upsert_keys) if upsert_keys else insert(table)
+    rows = 0
+    if replace:
+        db.execute(table.delete())
+    for chunk in _chunks(source, chunksize or CSV_CHUNK_SIZE):
+        records = _records(chunk, columns, defaults)
+        if records:
+            db.execute(stmt, records)
         db.commit()
-    for _, r in recs_df.iterrows():
-        rec = models.Recommendation(
-            student_id=str(r['student_id']),
-            internship_id=str(r['internship_id']),
-            title=r.get('title'),
-            domain=r.get('domain'),
-            score=float(r.get('score', 0.0)),
-            rank=int(r.get('rank', 0))
-        )
-        db.add(rec)
+        rows += len(records)
     db.commit()
+    seconds = time.perf_counter() - started
+    return {"rows": rows, "seconds": round(seconds, 3), "rows_per_sec": round(rows / seconds) if seconds > 0 else rows}
+
+def load_students_from_csv(db: Session, csv_path: str, chunksize: int = None):
+    # full refresh: the table is replaced by the CSV
+    return bulk_load(db, models.Student, csv_path, STUDENT_COLUMNS, chunksize=chunksize)
+
+def load_internships_from_csv(db: Session, csv_path: str, chunksize: int = None):
+    return bulk_load(db, models.Internship, csv_path, INTERNSHIP_COLUMNS, chunksize=chunksize)
+
+def load_recommendations_from_csv(db: Session, csv_path: str, reset=True, chunksize: int = None):
+    """Stream recommendations.csv into the table without loading it whole."""
+    stats = bulk_load(db, models.Recommendation, csv_path, RECOMMENDATION_COLUMNS, RECOMMENDATION_DEFAULTS,
+                      chunksize=chunksize, replace=reset, upsert_keys=RECOMMENDATION_KEYS)
+    bump_generation(db)
+    return stats
+
+def save_recommendations_from_df(db: Session, recs_df: pd.DataFrame, reset=True, chunksize: int = None):
+    """Full reload with ``reset``; otherwise the students in ``recs_df`` get exactly these rows."""
+    if not reset:
+        return upsert_recommendations(db, recs_df)
+    stats = bulk_load(db, models.Recommendation, recs_df, RECOMMENDATION_COLUMNS, RECOMMENDATION_DEFAULTS,
+                      chunksize=chunksize, replace=True, upsert_keys=RECOMMENDATION_KEYS)
+    bump_generation(db)
+    return stats
+
+def upsert_recommendations(db: Session, recs_df: pd.DataFrame, student_ids=None):
+    """Make the stored set of each student equal ``recs_df``'s rows for them.
+
+    One ON CONFLICT upsert plus one delete of rows no longer in the set per
+    batch of students, so storing the same list twice changes nothing and
+    the table holds K rows per student. ``student_ids`` may list students
+    whose set is now empty.
+    """
+    started = time.perf_counter()
+    table = models.Recommendation.__table__
+    stmt = _upsert(db, table, RECOMMENDATION_KEYS)
+    recs_df = recs_df.assign(student_id=recs_df['student_id'].astype(str),
+                             internship_id=recs_df['internship_id'].astype(str))
+    wanted = list(dict.fromkeys([str(s) for s in (student_ids or [])] + recs_df['student_id'].tolist()))
+    by_student = dict(tuple(recs_df.groupby('student_id', sort=False)))
+    rows = 0
+    for start in range(0, len(wanted), UPSERT_BATCH_STUDENTS):
+        batch = wanted[start:start + UPSERT_BATCH_STUDENTS]
+        frames = [by_student[sid] for sid in batch if sid in by_student]
+        part = pd.concat(frames) if frames else recs_df.iloc[0:0]
+        pairs = list(zip(part['student_id'], part['internship_id']))
+        stale = table.c.student_id.in_(batch)
+        if pairs:
+            stale &= tuple_(table.c.student_id, table.c.internship_id).notin_(pairs)
+        db.execute(table.delete().where(stale))
+        records = _records(part, RECOMMENDATION_COLUMNS, RECOMMENDATION_DEFAULTS)
+        if records:
+            db.execute(stmt, records)
+        rows += len(records)
+    db.commit()
+    bump_generation(db)
+    seconds = time.perf_counter() - started
+    return {"rows": rows, "students": len(wanted), "seconds": round(seconds, 3)}
 
 def get_recommendations(db: Session, student_id: str, top_k: int = 10):
     return db.query(models.Recommendation).filter(models.Recommendation.student_id==student_id).order_by(models.Recommendation.rank).limit(top_k).all()
+
+def replace_recommendations(db: Session, student_ids, recs_df: pd.DataFrame):
+    """Swap the stored rows of just these students for ``recs_df`` (one transaction)."""
+    return upsert_recommendations(db, recs_df, student_ids)
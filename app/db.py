@@ -1,5 +1,5 @@
 # app/db.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -7,7 +7,34 @@ import os
 DB_FILE = os.getenv("SQLITE_FILE", "recommendations.db")
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_FILE}"
 
+# connection tuning; WAL lets readers (other workers) run while a load writes
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def apply_pragmas(conn, read_only=False):
+    """Pragmas for a raw sqlite3 connection (writer or read-only reader)."""
+    cur = conn.cursor()
+    if not read_only:
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    else:
+        cur.execute("PRAGMA query_only=1")
+    cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+
 # For sqlite need connect_args
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    apply_pragmas(dbapi_connection)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -0,0 +1,122 @@
+# app/embedding_cache.py
+"""
+Persistent, content-addressed store of text embeddings.
+
+Rows are keyed by ``blake2b(model name + text)``, so a text that did not
+change is never encoded again, whichever run or process asks for it.
+
+Layout under ``<root>/<model>/``::
+
+    keys.bin      16-byte digests, one per row, append-only
+    vectors.f32   float32 rows (``dim`` wide), append-only, read via np.memmap
+    meta.json     model name and dim
+
+Vectors are appended before their keys, so a crash mid-append leaves at
+most some unreferenced trailing bytes, which are cut off on the next open.
+There must be only one writer at a time (the pipeline); the API opens the
+cache read-only.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIRNAME = "embedding_cache"
+KEY_BYTES = 16
+
+
+def text_key(model_name, text):
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    h.update(model_name.encode('utf-8'))
+    h.update(b'\0')
+    h.update(text.encode('utf-8'))
+    return h.digest()
+
+
+class EmbeddingCache:
+    def __init__(self, root, model_name, read_only=False):
+        self.model_name = model_name
+        self.read_only = read_only
+        self.dir = Path(root) / re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.hits = 0
+        self.misses = 0
+        self.dim = None
+        self._rows = {}
+        self._vectors = None
+        meta = self.dir / "meta.json"
+        if meta.exists():
+            self.dim = int(json.loads(meta.read_text())['dim'])
+            self._open()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _open(self):
+        keys = (self.dir / "keys.bin").read_bytes() if (self.dir / "keys.bin").exists() else b''
+        vec_path = self.dir / "vectors.f32"
+        n_vec = vec_path.stat().st_size // (4 * self.dim) if vec_path.exists() else 0
+        n = min(len(keys) // KEY_BYTES, n_vec)
+        if not self.read_only:
+            # drop a half-written tail left by an interrupted append
+            if vec_path.exists() and vec_path.stat().st_size != n * 4 * self.dim:
+                with open(vec_path, 'r+b') as f:
+                    f.truncate(n * 4 * self.dim)
+            if len(keys) != n * KEY_BYTES:
+                with open(self.dir / "keys.bin", 'r+b') as f:
+                    f.truncate(n * KEY_BYTES)
+        self._rows = {keys[k * KEY_BYTES:(k + 1) * KEY_BYTES]: k for k in range(n)}
+        self._vectors = np.memmap(vec_path, dtype=np.float32, mode='r', shape=(n, self.dim)) if n else None
+
+    def lookup(self, texts):
+        """``(vectors, found)``: cached rows for ``texts`` (zeros where ``found`` is False)."""
+        keys = [text_key(self.model_name, t) for t in texts]
+        rows = np.array([self._rows.get(k, -1) for k in keys], dtype=np.int64)
+        found = rows >= 0
+        out = np.zeros((len(texts), self.dim or 0), dtype=np.float32)
+        if found.any():
+            out[found] = self._vectors[rows[found]]
+        self.hits += int(found.sum())
+        self.misses += int((~found).sum())
+        return out, found
+
+    def get_or_encode(self, texts, encode):
+        """Embeddings of ``texts``; only texts not cached yet are passed to ``encode``.
+
+        ``encode(list_of_texts)`` must return an (n, dim) array. New rows are
+        appended to the cache before returning.
+        """
+        texts = list(texts)
+        if self.dim is None:
+            out, found = np.zeros((len(texts), 0), dtype=np.float32), np.zeros(len(texts), dtype=bool)
+            self.misses += len(texts)
+        else:
+            out, found = self.lookup(texts)
+        if found.all():
+            return out
+        missing = list(dict.fromkeys(t for t, f in zip(texts, found) if not f))
+        new = np.asarray(encode(missing), dtype=np.float32)
+        if self.dim is None:
+            self.dim = new.shape[1]
+            out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not self.read_only:
+            self._append(missing, new)
+        row_of = {t: k for k, t in enumerate(missing)}
+        for k in np.flatnonzero(~found):
+            out[k] = new[row_of[texts[k]]]
+        return out
+
+    def _append(self, texts, vectors):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        meta = self.dir / "meta.json"
+        if not meta.exists():
+            meta.write_text(json.dumps({"model": self.model_name, "dim": self.dim}))
+        with open(self.dir / "vectors.f32", 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.dir / "keys.bin", 'ab') as f:
+            f.write(b''.join(text_key(self.model_name, t) for t in texts))
+        self._open()
+
+    def stats(self):
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
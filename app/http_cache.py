@@ -0,0 +1,157 @@
+# app/http_cache.py
+"""
+Conditional GET and compression for the read endpoints.
+
+Responses only change when the artifacts do, so the ETag is a hash of the
+artifact version (or catalog digest) and the request parameters: a
+``If-None-Match`` match is answered with 304 before any lookup. Bodies at
+least ``COMPRESS_MIN_BYTES`` long are sent gzip (or brotli, when the
+``brotli`` package is installed and the client accepts it), and the
+compressed bytes are kept in a small LRU keyed by ETag, so repeat polls of
+hot payloads do not compress again.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import Response
+
+from app.metrics import stage
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# seconds clients may reuse a response without revalidating (0 = always revalidate)
+HTTP_MAX_AGE = int(os.getenv("HTTP_MAX_AGE", "0"))
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# compressed bodies kept, keyed by (ETag, encoding)
+COMPRESSED_CACHE_SIZE = int(os.getenv("COMPRESSED_CACHE_SIZE", "2048"))
+
+VARY = "Accept-Encoding"
+# endpoints that also pick JSON or NDJSON from the Accept header
+VARY_NEGOTIATED = "Accept, Accept-Encoding"
+
+
+def etag(*parts) -> str:
+    """Strong ETag for a representation built from ``parts`` (version first)."""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def _tagged(tag, encoding):
+    # each content coding is its own representation, so it gets its own strong tag
+    return tag if encoding is None else f'{tag[:-1]}-{encoding}"'
+
+
+def _match(if_none_match, tag, exists=None):
+    """The representation tag in ``If-None-Match`` that matches ``tag`` (any coding), or None.
+
+    ``*`` matches only when ``exists()`` says the resource is there (never
+    without an ``exists`` callable); it is called for ``*`` alone.
+    """
+    if not if_none_match:
+        return None
+    base = tag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            if exists is not None and exists():
+                return tag
+            continue
+        value = candidate.removeprefix("W/").strip('"')
+        if value == base or value.rsplit("-", 1)[0] == base:
+            return f'"{value}"'
+    return None
+
+
+def negotiate(accept_encoding) -> str:
+    """Preferred coding for an Accept-Encoding header: br, gzip or None (q=0 means refused)."""
+    accepted = set()
+    for item in (accept_encoding or "").lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output (and so the ETag's meaning) byte-stable
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressedBodies:
+    """Bounded LRU of compressed bodies keyed by ``(etag, encoding)``."""
+
+    def __init__(self, max_entries=COMPRESSED_CACHE_SIZE):
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._compress = stage("compress").time(compress)
+
+    def get(self, tag, encoding, body):
+        key = (tag, encoding)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = self._compress(body, encoding)
+        if self.max_entries:
+            with self._lock:
+                self._entries[key] = data
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return data
+
+
+compressed_bodies = CompressedBodies()
+
+
+def cache_headers(tag, private=False, extra=None, vary=VARY):
+    """ETag, Cache-Control and Vary for an (uncompressed unless tagged so) representation."""
+    scope = "private" if private else "public"
+    return {"ETag": tag, "Cache-Control": f"{scope}, max-age={HTTP_MAX_AGE}, must-revalidate",
+            "Vary": vary, **(extra or {})}
+
+
+def not_modified(request, tag, private=False, headers=None, vary=VARY, exists=None):
+    """304 response when the client already holds ``tag``, else None (``exists``: see ``_match``)."""
+    held = _match(request.headers.get("if-none-match"), tag, exists)
+    if held is None:
+        return None
+    # echo the representation the client holds (plain or compressed)
+    return Response(status_code=304, headers=cache_headers(held, private, headers, vary))
+
+
+def cached_response(request, body: bytes, tag, private=False, headers=None, media_type="application/json",
+                    vary=VARY):
+    """``body`` with validators, compressed when it is big enough and the client accepts it."""
+    encoding = negotiate(request.headers.get("accept-encoding")) if len(body) >= COMPRESS_MIN_BYTES else None
+    extra = dict(headers or {})
+    if encoding is not None:
+        body = compressed_bodies.get(tag, encoding, body)
+        extra["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type,
+                    headers=cache_headers(_tagged(tag, encoding), private, extra, vary))
@@ -0,0 +1,210 @@
+# app/incremental.py
+"""
+Incremental rescoring: refresh a few students, or one internship's column,
+without rerunning the notebook.
+
+Scores come from the snapshot's ColdStartScorer, i.e. the same Cell 11
+features and meta model the pipeline uses (students the SVD was trained on
+keep their own CF row). The API publishes the result as a patched snapshot
+(``POST /admin/rescore/...``) and rewrites only those students' SQLite rows;
+the CLI patches recommendations.csv and SQLite (and, for an internship,
+internships_synthetic.csv plus the embeddings, cold-start CF column, scalers
+and ANN index that line up with it) for a running API to pick up:
+
+    python -m app.incremental students S00001 S00042 [--profiles edits.json]
+    python -m app.incremental internship new_posting.json
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from app.cold_start import profile_text
+
+# rows scored per meta-model call when rescoring an internship column
+COLUMN_CHUNK = 20000
+
+
+def _scorer(snapshot):
+    if snapshot.scorer is None:
+        raise RuntimeError(snapshot.scorer_error or "cold-start scorer unavailable")
+    return snapshot.scorer
+
+
+def _catalog_ids(scorer):
+    return scorer.internships_df['internship_id'].astype(str).to_numpy(dtype=object)
+
+
+def rescore_students(snapshot, profiles, top_k=10, scorer=None):
+    """``{student_id: (internship_ids, scores)}`` for the given profiles (dicts with ``student_id``)."""
+    scorer = scorer or _scorer(snapshot)
+    if not profiles:
+        return {}
+    ids = _catalog_ids(scorer)
+    embs = scorer.embedder.encode([profile_text(p) for p in profiles])
+    updates = {}
+    for profile, emb in zip(profiles, embs):
+        pos, scores = scorer.score(profile, top_k, student_emb=emb)
+        updates[str(profile['student_id'])] = (ids[pos].tolist(), scores)
+    return updates
+
+
+def cohort_profiles(snapshot):
+    """Current profile of every known student (incremental edits included)."""
+    ids = list(dict.fromkeys(snapshot.student_ids() + list(snapshot.profile_overrides)))
+    return [p for p in (snapshot.student_profile(sid) for sid in ids) if p is not None]
+
+
+def rescore_internship(snapshot, record, top_k=10):
+    """Apply an added or edited internship; returns ``(scorer, updates)``.
+
+    Students whose list holds the internship are rescored in full (its
+    score may have dropped below their next best). Everyone else with a
+    stored list only gets the one new column, merged in if it beats their
+    current K-th entry; students without one keep being scored cold-start.
+    """
+    scorer = _scorer(snapshot)
+    iid = str(record['internship_id'])
+    text = record.get('job_text') or f"{record['required_skills']} {record['domain']} stipend:{record['stipend']}"
+    scorer, pos = scorer.with_internship({**record, 'job_text': text}, scorer.embedder.encode([text])[0])
+
+    profiles = cohort_profiles(snapshot)
+    current = {str(p['student_id']): snapshot.store.lookup(str(p['student_id'])) for p in profiles}
+    vocab = snapshot.store.internship_ids
+    holders = [p for p in profiles
+               if current[str(p['student_id'])] is not None
+               and iid in set(vocab[current[str(p['student_id'])][0]].tolist())]
+    updates = rescore_students(snapshot, holders, top_k, scorer=scorer)
+
+    held = set(updates)
+    others = [p for p in profiles
+              if str(p['student_id']) not in held and current[str(p['student_id'])] is not None]
+    for start in range(0, len(others), COLUMN_CHUNK):
+        chunk = others[start:start + COLUMN_CHUNK]
+        embs = scorer.embedder.encode([profile_text(p) for p in chunk])
+        rows, eligible = [], []
+        for profile, emb in zip(chunk, embs):
+            X, elig = scorer.features(profile, emb, rows=np.array([pos]))
+            rows.append(X[0])
+            eligible.append(bool(elig[0]))
+        scores = scorer.predict(np.vstack(rows))
+        for profile, score, ok in zip(chunk, scores, eligible):
+            if not ok:
+                continue
+            sid = str(profile['student_id'])
+            hit = current[sid]
+            old_ids = vocab[hit[0]].tolist()
+            old_scores = np.asarray(hit[1], dtype=np.float32)
+            depth = max(len(old_ids), top_k)
+            if len(old_ids) >= depth and score <= old_scores[-1]:
+                continue
+            at = int(np.searchsorted(-old_scores, -np.float32(score), side='right'))
+            new_ids = (old_ids[:at] + [iid] + old_ids[at:])[:depth]
+            new_scores = np.insert(old_scores, at, np.float32(score))[:depth]
+            updates[sid] = (new_ids, new_scores)
+    return scorer, updates
+
+
+def recs_frame(snapshot, updates):
+    """recommendations.csv style rows for ``updates``."""
+    scorer = snapshot.scorer
+    catalog_pos = ({iid: k for k, iid in enumerate(_catalog_ids(scorer).tolist())}
+                   if scorer is not None else {})
+    titles = dict(zip(snapshot.store.internship_ids.tolist(), snapshot.item_titles))
+    domains = dict(zip(snapshot.store.internship_ids.tolist(), snapshot.item_domains))
+    rows = []
+    for sid, (iids, scores) in updates.items():
+        for rank, (iid, score) in enumerate(zip(iids, np.asarray(scores).tolist()), start=1):
+            rows.append({
+                'student_idx': snapshot._student_rows.get(sid, -1), 'student_id': sid,
+                'intern_idx': catalog_pos.get(iid, -1), 'internship_id': iid,
+                'title': titles.get(iid), 'domain': domains.get(iid), 'score': score, 'rank': rank,
+            })
+    return pd.DataFrame(rows, columns=['student_idx', 'student_id', 'intern_idx', 'internship_id',
+                                       'title', 'domain', 'score', 'rank'])
+
+
+def patch_recommendations_csv(path, student_ids, recs_df):
+    """Replace the rows of ``student_ids`` in recommendations.csv (atomic rewrite)."""
+    path = str(path)
+    base = pd.read_csv(path) if os.path.exists(path) else recs_df.iloc[0:0]
+    base = base[~base['student_id'].astype(str).isin(set(map(str, student_ids)))]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pd.concat([base, recs_df], ignore_index=True).to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def patch_internships_csv(path, record_df):
+    """Replace (same internship_id) or append the rows of ``record_df`` in internships_synthetic.csv."""
+    path = str(path)
+    base = pd.read_csv(path) if os.path.exists(path) else record_df.iloc[0:0]
+    ids = set(record_df['internship_id'].astype(str))
+    base = base[~base['internship_id'].astype(str).isin(ids)]
+    columns = list(base.columns) + [c for c in record_df.columns if c not in base.columns]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pd.concat([base, record_df], ignore_index=True).reindex(columns=columns).to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    import argparse
+    from app import crud, recommender_service
+    from app.db import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Rescore students or one internship without a full pipeline run")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    st = sub.add_parser("students", help="rescore these students")
+    st.add_argument("student_ids", nargs="*")
+    st.add_argument("--profiles", help="JSON list of edited profiles (StudentProfile fields)")
+    it = sub.add_parser("internship", help="apply an added or edited internship")
+    it.add_argument("record", help="JSON file with the internship fields")
+    for p in (st, it):
+        p.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    snapshot = recommender_service.current()
+    if args.mode == "students":
+        profiles = json.loads(open(args.profiles).read()) if args.profiles else []
+        edited = {str(p['student_id']): p for p in profiles}
+        missing = []
+        for sid in args.student_ids:
+            if sid in edited:
+                continue
+            profile = snapshot.student_profile(sid)
+            if profile is None:
+                missing.append(sid)
+            else:
+                profiles.append(profile)
+        if missing:
+            print(f"unknown students skipped: {missing}", file=sys.stderr)
+        updates = rescore_students(snapshot, profiles, args.top_k)
+        patched = snapshot.patched(updates, profiles=edited)
+    else:
+        with open(args.record) as f:
+            record = json.load(f)
+        scorer, updates = rescore_internship(snapshot, record, args.top_k)
+        iid = str(record['internship_id'])
+        patched = snapshot.patched(updates, scorer=scorer, changed_internships=[iid])
+        # persist the record too, so the next full reload or block run keeps it;
+        # artifacts first, so a reload never pairs the new catalog with old rows
+        scorer.save_catalog(recommender_service.OUT_DIR)
+        catalog = scorer.internships_df
+        patch_internships_csv(recommender_service.INTERNS_CSV,
+                              catalog[catalog['internship_id'].astype(str) == iid])
+
+    # rows from the patched snapshot: a new internship's title/domain only exist there
+    recs_df = recs_frame(patched, updates)
+    patch_recommendations_csv(recommender_service.RECS_CSV, list(updates), recs_df)
+    crud.create_tables(engine)
+    db = SessionLocal()
+    try:
+        crud.replace_recommendations(db, list(updates), recs_df)
+    finally:
+        db.close()
+    print(f"rescored {len(updates)} students ({len(recs_df)} rows)")
+
+
+if __name__ == "__main__":
+    main()
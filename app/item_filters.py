@@ -0,0 +1,74 @@
+# app/item_filters.py
+"""
+Attribute filters over a snapshot's internship vocabulary.
+
+Built once per snapshot: one boolean mask per value of each categorical
+attribute (``remote``, ``state``, ``domain``, ``ministry``) and the stipend
+column for ``min_stipend``. A filter is the AND of the attributes asked for
+(values of one attribute are OR-ed), applied to a student's ranked list by
+indexing the mask with the item positions.
+"""
+import numpy as np
+
+CATEGORICAL = ('remote', 'state', 'domain', 'ministry')
+
+
+def _key(value):
+    return str(value).strip().lower()
+
+
+class ItemFilterIndex:
+    def __init__(self, n_items, columns, stipend):
+        self.n_items = n_items
+        # attribute -> normalized value -> mask over item positions
+        self.masks = {}
+        for attr, values in columns.items():
+            table = {}
+            for pos, value in enumerate(values):
+                if value is None:
+                    continue
+                mask = table.get(_key(value))
+                if mask is None:
+                    mask = table[_key(value)] = np.zeros(n_items, dtype=bool)
+                mask[pos] = True
+            self.masks[attr] = table
+        self.stipend = np.asarray(stipend, dtype=np.float64)
+        self._none = np.zeros(n_items, dtype=bool)
+
+    @classmethod
+    def from_items(cls, domains, details):
+        """From a snapshot's item table (``item_domains`` and cleaned ``item_details``)."""
+        n = len(domains)
+        details = details if details is not None else [{}] * n
+        columns = {'domain': domains}
+        for attr in ('remote', 'state', 'ministry'):
+            columns[attr] = [rec.get(attr) for rec in details]
+        stipend = [np.nan if rec.get('stipend') is None else rec['stipend'] for rec in details]
+        return cls(n, columns, stipend)
+
+    def mask(self, remote=None, state=None, domain=None, ministry=None, min_stipend=None):
+        """Items matching every given attribute, or None when no filter is set.
+
+        ``state`` / ``domain`` / ``ministry`` take one value or a list (any
+        of them matches); ``remote`` a bool; ``min_stipend`` a number.
+        """
+        wanted = {'state': state, 'domain': domain, 'ministry': ministry,
+                  'remote': None if remote is None else int(bool(remote))}
+        result = None
+        for attr, values in wanted.items():
+            if values is None:
+                continue
+            if isinstance(values, (str, int)):
+                values = [values]
+            table = self.masks.get(attr, {})
+            picked = self._none
+            for value in values:
+                hit = table.get(_key(value))
+                if hit is not None:
+                    picked = hit if picked is self._none else picked | hit
+            result = picked if result is None else result & picked
+        if min_stipend is not None:
+            with np.errstate(invalid='ignore'):
+                picked = self.stipend >= float(min_stipend)
+            result = picked if result is None else result & picked
+        return result
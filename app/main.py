@@ -1,12 +1,19 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from pathlib import Path
-import os, pandas as pd
+from typing import Optional
+import json, os, time, pandas as pd
 
 from app.db import SessionLocal, engine
-from app import crud, recommender_service, schemas
+from app import crud, incremental, recommender_service, schemas
+from app.serving import BoundedExecutor, Overloaded, SingleFlight
+from app import metrics
+from app.catalog import SUMMARY_FIELDS, InternshipCatalog, parse_fields, project
+from app.response_cache import dumps
+from app.http_cache import VARY_NEGOTIATED, cache_headers, cached_response, compressed_bodies, etag, not_modified
 
 # create tables
 crud.create_tables(engine)
@@ -22,6 +29,10 @@ app.add_middleware(
     allow_credentials=True
 )
 
+if metrics.METRICS_ENABLED:
+    # added last so it is outermost and the latency covers the whole request
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -37,9 +48,141 @@ _candidate_dirs = [
 ]
 OUT_DIR = next((path for path in _candidate_dirs if path.exists()), _candidate_dirs[0])
 
+# loaded once per process, re-read only when the CSV changes
+catalog = InternshipCatalog(OUT_DIR / "internships_synthetic.csv")
+
+# optional polling of outputs_recommender_v2 for new pipeline runs (seconds, 0 = off)
+ARTIFACT_WATCH_INTERVAL = float(os.getenv("ARTIFACT_WATCH_INTERVAL", "0"))
+recommender_service.manager.start_watcher(ARTIFACT_WATCH_INTERVAL)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# request bounds for /recommend/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+MAX_BATCH_TOP_K = int(os.getenv("MAX_BATCH_TOP_K", "100"))
+# page bound for /students and /internships, and NDJSON lines per streamed chunk
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+NDJSON_FLUSH_LINES = 256
+
+# blocking work of the async read endpoints (bounded, SERVE_WORKERS / SERVE_MAX_PENDING)
+executor = BoundedExecutor()
+flights = SingleFlight()
+
+# per-stage latency of /recommend and /recommend/cold_start (compress and executor_queue live with their code)
+STAGE_CACHE_LOOKUP = metrics.stage("cache_lookup")
+STAGE_RENDER = metrics.stage("render")
+STAGE_PROJECT = metrics.stage("project")
+STAGE_COLD_START = metrics.stage("cold_start")
+
+@app.exception_handler(Overloaded)
+def _overloaded(request: Request, exc: Overloaded):
+    # shed load early instead of queueing behind a burst
+    return JSONResponse(status_code=503, content={"detail": "server busy, retry shortly"},
+                        headers={"Retry-After": "1"})
+
+def _version_headers(snapshot):
+    return {"X-Artifact-Version": str(snapshot.version)}
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin token required")
+
 @app.get("/")
 def health():
-    return {"status":"ok", "message":"Recommender API running"}
+    snapshot = recommender_service.current()
+    return {"status":"ok", "message":"Recommender API running", **recommender_service.manager.status(),
+            "cold_start": snapshot.scorer is not None,
+            "serving": {**executor.status(), **flights.status()}}
+
+def _ratio(hits, misses):
+    return hits / (hits + misses) if hits + misses else None
+
+def _serving_gauges():
+    """Values read at scrape time: caches, executor, artifacts."""
+    snapshot = recommender_service.current()
+    manager = recommender_service.manager
+    cache = snapshot.response_cache
+    store = snapshot.store
+    rows = {(("table", "students"),): len(store), (("table", "internships"),): len(store.internship_ids),
+            (("table", "catalog"),): len(catalog.records)}
+    if hasattr(store, "intern_idx"):
+        rows[(("table", "recommendations"),)] = len(store.intern_idx)
+    return [
+        ("recommender_response_cache_entries", "Pre-rendered /recommend bodies held", {(): len(cache)}),
+        ("recommender_cache_hits_total", "Cache hits since the snapshot / process started",
+         {(("cache", "response"),): cache.hits, (("cache", "compressed"),): compressed_bodies.hits}, "counter"),
+        ("recommender_cache_misses_total", "Cache misses since the snapshot / process started",
+         {(("cache", "response"),): cache.misses, (("cache", "compressed"),): compressed_bodies.misses}, "counter"),
+        ("recommender_cache_hit_ratio", "hits / (hits + misses)",
+         {(("cache", "response"),): _ratio(cache.hits, cache.misses),
+          (("cache", "compressed"),): _ratio(compressed_bodies.hits, compressed_bodies.misses)}),
+        ("recommender_executor_pending", "Serving calls running or queued", {(): executor.pending}),
+        ("recommender_executor_rejected_total", "Serving calls refused with 503", {(): executor.rejected}, "counter"),
+        ("recommender_coalesced_requests_total", "Requests that shared another request's computation",
+         {(): flights.shared}, "counter"),
+        ("recommender_artifact_load_seconds", "Duration of the last artifact build", {(): manager.load_seconds}),
+        ("recommender_artifact_loaded_timestamp", "Unix time of the last artifact swap", {(): manager.loaded_at}),
+        ("recommender_artifact_loads_total", "Artifact builds swapped in / failed",
+         {(("result", "ok"),): manager.loads, (("result", "failed"),): manager.load_failures}, "counter"),
+        ("recommender_artifact_rows", "Rows in the served artifacts", rows),
+    ]
+
+metrics.registry.gauges.append(_serving_gauges)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of request, stage, cache and artifact metrics"""
+    return Response(content=metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/admin/reload", dependencies=[Depends(require_admin)])
+def reload_artifacts(wait: bool = False):
+    """Rebuild the artifact snapshot in the background and swap it in"""
+    manager = recommender_service.manager
+    if wait:
+        swapped = manager.load()
+        return {"status": "reloaded" if swapped else "unchanged", **manager.status()}
+    started = manager.reload_async()
+    return {"status": "reloading" if started else "already_reloading", **manager.status()}
+
+def _publish_rescore(snapshot, updates, db, **patch):
+    """Swap in the patched snapshot, then rewrite just those students' SQLite rows."""
+    patched = snapshot.patched(updates, **patch)
+    if not recommender_service.manager.publish(patched, replaces=snapshot):
+        raise HTTPException(status_code=409, detail="artifacts changed during the rescore; retry")
+    crud.replace_recommendations(db, list(updates), incremental.recs_frame(patched, updates))
+    return {"status": "ok", "students_rescored": len(updates), "artifact_version": patched.version}
+
+@app.post("/admin/rescore/students", dependencies=[Depends(require_admin)])
+def rescore_students(req: schemas.RescoreRequest, db: Session = Depends(get_db)):
+    """Recompute the recommendations of a few students and publish them without a pipeline run"""
+    snapshot = recommender_service.current()
+    if snapshot.scorer is None:
+        raise HTTPException(status_code=503, detail=snapshot.scorer_error)
+    edited = {p.student_id: (p.model_dump() if hasattr(p, "model_dump") else p.dict()) for p in req.profiles}
+    profiles = list(edited.values())
+    for sid in req.student_ids:
+        if sid in edited:
+            continue
+        profile = snapshot.student_profile(sid)
+        if profile is None:
+            raise HTTPException(status_code=404, detail=f"Student {sid} not found")
+        profiles.append(profile)
+    try:
+        updates = incremental.rescore_students(snapshot, profiles, top_k=req.top_k)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _publish_rescore(snapshot, updates, db, profiles=edited)
+
+@app.post("/admin/rescore/internship", dependencies=[Depends(require_admin)])
+def rescore_internship(record: schemas.InternshipRecord, top_k: int = 10, db: Session = Depends(get_db)):
+    """Apply an added or edited internship to every student's list without a pipeline run"""
+    snapshot = recommender_service.current()
+    if snapshot.scorer is None:
+        raise HTTPException(status_code=503, detail=snapshot.scorer_error)
+    data = record.model_dump() if hasattr(record, "model_dump") else record.dict()
+    try:
+        scorer, updates = incremental.rescore_internship(snapshot, data, top_k=top_k)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _publish_rescore(snapshot, updates, db, scorer=scorer, changed_internships=[record.internship_id])
 
 @app.post("/populate_db")
 def populate_db(db: Session = Depends(get_db)):
@@ -51,79 +194,180 @@ def populate_db(db: Session = Depends(get_db)):
     if not students_csv.exists() or not internships_csv.exists():
         raise HTTPException(status_code=400, detail="students or internships CSV missing in outputs_recommender_v2")
 
-    crud.load_students_from_csv(db, str(students_csv))
-    crud.load_internships_from_csv(db, str(internships_csv))
+    # streamed in chunks; each loader reports rows and rows/sec
+    loaded = {
+        "students": crud.load_students_from_csv(db, str(students_csv)),
+        "internships": crud.load_internships_from_csv(db, str(internships_csv)),
+    }
 
     # optionally populate recommendations table
     if recs_csv.exists():
-        df = pd.read_csv(str(recs_csv))
-        crud.save_recommendations_from_df(db, df, reset=True)
+        loaded["recommendations"] = crud.load_recommendations_from_csv(db, str(recs_csv), reset=True)
+        if recommender_service.RECOMMEND_BACKEND == "sqlite":
+            # the served store is this table now
+            recommender_service.manager.reload_async()
+
+    return {"status":"ok", "message":"DB populated from CSVs", "loaded": loaded}
+
+def _page_args(request: Request, after, limit, format):
+    """(paged, ndjson) for a list endpoint; no after/limit/format keeps the old full response."""
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    ndjson = format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    return (after is not None or limit is not None), ndjson
 
-    return {"status":"ok", "message":"DB populated from CSVs"}
+def _fields(spec, allowed, summary=SUMMARY_FIELDS):
+    try:
+        return parse_fields(spec, allowed, summary)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _values(spec):
+    """Comma-separated query value -> tuple of values (None when empty)."""
+    values = tuple(part.strip() for part in (spec or "").split(",") if part.strip())
+    return values or None
+
+def _ndjson(records, key=None):
+    """One JSON document per line, flushed in small groups."""
+    lines = []
+    for rec in records:
+        lines.append(dumps(rec if key is None else {key: rec}))
+        if len(lines) == NDJSON_FLUSH_LINES:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
 
 @app.get("/students")
-def list_students():
-    s = recommender_service.get_all_students()
-    return {"count": len(s), "students": s}
+def list_students(request: Request, after: Optional[str] = None,
+                  limit: Optional[int] = None, format: Optional[str] = None):
+    """All student ids; ``after``/``limit`` page through them in id order, ``format=ndjson`` streams"""
+    paged, ndjson = _page_args(request, after, limit, format)
+    snapshot = recommender_service.current()
+    headers = _version_headers(snapshot)
+    tag = etag(snapshot.version, "students", after, limit, ndjson)
+    # the list always exists, if empty
+    cached = not_modified(request, tag, headers=headers, vary=VARY_NEGOTIATED, exists=lambda: True)
+    if cached is not None:
+        return cached
+    if not paged and not ndjson:
+        s = snapshot.student_ids()
+        return cached_response(request, dumps({"count": len(s), "students": s}), tag, headers=headers,
+                               vary=VARY_NEGOTIATED)
+    page, next_after = snapshot.student_page(after, limit)
+    if ndjson:
+        if next_after is not None:
+            headers["X-Next-After"] = next_after
+        return StreamingResponse(_ndjson(page, key="student_id"), media_type="application/x-ndjson",
+                                 headers=cache_headers(tag, extra=headers, vary=VARY_NEGOTIATED))
+    body = dumps({"count": len(page), "students": page, "next_after": next_after})
+    return cached_response(request, body, tag, headers=headers, vary=VARY_NEGOTIATED)
 
 @app.get("/internships")
-def list_internships():
-    """Get all internships with full details"""
-    path = OUT_DIR / "internships_synthetic.csv"
-    if path.exists():
-        df = pd.read_csv(path)
-        # Convert to dict and handle NaN values
-        internships = df.to_dict(orient='records')
-        for internship in internships:
-            for key, value in internship.items():
-                if pd.isna(value):
-                    internship[key] = None
-            # Convert remote and org_pref_govt to int if not None
-            if internship.get('remote') is not None:
-                internship['remote'] = int(internship['remote'])
-            if internship.get('org_pref_govt') is not None:
-                internship['org_pref_govt'] = int(internship['org_pref_govt'])
-        return {"count": len(df), "internships": internships}
-    return {"count": 0, "internships": []}
+def list_internships(request: Request, after: Optional[str] = None, limit: Optional[int] = None,
+                     format: Optional[str] = None, fields: Optional[str] = None):
+    """Get all internships with full details (paged by internship_id with ``after``/``limit``)"""
+    paged, ndjson = _page_args(request, after, limit, format)
+    catalog.refresh()
+    projection = _fields(fields, catalog.fields)
+    tag = etag(catalog.digest, "internships", after, limit, ndjson, projection)
+    cached = not_modified(request, tag, vary=VARY_NEGOTIATED, exists=lambda: catalog.exists)
+    if cached is not None:
+        return cached
+    if not paged and not ndjson:
+        # the full list is the hot payload: its gzip/br bytes stay cached under this tag
+        return cached_response(request, catalog.list_body(projection), tag, vary=VARY_NEGOTIATED)
+    records, next_after = catalog.page(after, limit)
+    if projection is not None:
+        records = [project(rec, projection) for rec in records]
+    if ndjson:
+        headers = {} if next_after is None else {"X-Next-After": next_after}
+        return StreamingResponse(_ndjson(records), media_type="application/x-ndjson",
+                                 headers=cache_headers(tag, extra=headers, vary=VARY_NEGOTIATED))
+    body = dumps({"count": len(records), "internships": records, "next_after": next_after})
+    return cached_response(request, body, tag, vary=VARY_NEGOTIATED)
 
 @app.get("/internship/{internship_id}")
-def get_internship_details(internship_id: str):
+def get_internship_details(internship_id: str, request: Request, fields: Optional[str] = None):
     """Get detailed information about a specific internship"""
-    path = OUT_DIR / "internships_synthetic.csv"
-    if not path.exists():
+    catalog.refresh()
+    projection = _fields(fields, catalog.fields)
+    if not catalog.exists:
         raise HTTPException(status_code=404, detail="Internships data not found")
     
-    df = pd.read_csv(path)
-    internship = df[df['internship_id'] == internship_id]
-    
-    if internship.empty:
+    result = catalog.get(internship_id)
+    if result is None:
         raise HTTPException(status_code=404, detail=f"Internship {internship_id} not found")
-    
-    # Convert to dict and handle NaN values
-    result = internship.iloc[0].to_dict()
-    for key, value in result.items():
-        if pd.isna(value):
-            result[key] = None
-    
-    # Convert integer fields
-    int_fields = ['min_age', 'max_age', 'remote', 'capacity', 'org_pref_govt']
-    for field in int_fields:
-        if result.get(field) is not None:
-            result[field] = int(result[field])
-    
-    # Convert float fields
-    float_fields = ['stipend', 'csr_underprivileged_pct']
-    for field in float_fields:
-        if result.get(field) is not None:
-            result[field] = float(result[field])
-    
-    return result
+    tag = etag(catalog.digest, "internship", internship_id, projection)
+    # found above, so "If-None-Match: *" may match
+    return not_modified(request, tag, exists=lambda: True) or cached_response(request, dumps(project(result, projection)), tag)
 
 @app.get("/recommend/{student_id}", response_model=schemas.RecsResponse)
-def recommend(student_id: str, top_k: int = 10):
-    recs = recommender_service.recommend_for_student(student_id, top_k=top_k)
-    # convert to schema format
-    return {"student_id": student_id, "recommendations": recs}
+async def recommend(student_id: str, request: Request, top_k: int = 10, fields: Optional[str] = None,
+                    remote: Optional[bool] = None, state: Optional[str] = None, domain: Optional[str] = None,
+                    ministry: Optional[str] = None, min_stipend: Optional[float] = None):
+    """Top-K for a student; ``remote``/``state``/``domain``/``ministry``/``min_stipend`` filter the list
+    (comma-separated values match any of them)"""
+    # body is pre-rendered at load; skip re-validation against RecsResponse
+    projection = _fields(fields, recommender_service.REC_FIELDS, recommender_service.REC_SUMMARY_FIELDS)
+    filters = {name: value for name, value in (
+        ("remote", remote), ("state", _values(state)), ("domain", _values(domain)),
+        ("ministry", _values(ministry)), ("min_stipend", min_stipend)) if value is not None}
+    snapshot = recommender_service.current()
+    headers = _version_headers(snapshot)
+    # the body only changes with the snapshot: a repeat poll is answered before any lookup
+    key = (snapshot.version, student_id, top_k, tuple(projection or ()), tuple(sorted(filters.items())))
+    tag = etag("recommend", *key)
+    # "If-None-Match: *" only matches a student the snapshot can answer for
+    known = lambda: student_id in snapshot.store or snapshot.student_profile(student_id) is not None
+    cached = not_modified(request, tag, private=True, headers=headers, exists=known)
+    if cached is not None:
+        return cached
+    if projection is not None or filters:
+        # built from just the requested columns and matching items (not kept in the response cache)
+        fields_out = projection or recommender_service.REC_FIELDS
+        body = await flights.do(("recommend",) + key, lambda: executor.run(
+            STAGE_PROJECT.time(snapshot.projected_body), student_id, top_k, fields_out, filters))
+        return cached_response(request, body, tag, private=True, headers=headers)
+    started = time.perf_counter()
+    body = snapshot.response_cache.cached_body(student_id, top_k)
+    STAGE_CACHE_LOOKUP.observe(time.perf_counter() - started)
+    if body is None:
+        # miss: render (store lookup, maybe cold-start scoring) once per concurrent burst
+        cache = snapshot.response_cache
+        body = await flights.do(("recommend", snapshot.version, student_id, top_k),
+                                lambda: executor.run(STAGE_RENDER.time(cache.body), student_id, top_k))
+    return cached_response(request, body, tag, private=True, headers=headers)
+
+@app.post("/recommend/batch")
+async def recommend_batch(req: schemas.BatchRecsRequest):
+    """Recommendations for many students in one request (streamed JSON)"""
+    if len(req.student_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BATCH_SIZE} student_ids per batch")
+    if req.top_k > MAX_BATCH_TOP_K:
+        raise HTTPException(status_code=422, detail=f"top_k must be <= {MAX_BATCH_TOP_K}")
+    snapshot = recommender_service.current()
+    student_ids = list(dict.fromkeys(req.student_ids))
+    return StreamingResponse(
+        snapshot.recommend_batch_json(student_ids, top_k=req.top_k),
+        media_type="application/json",
+        headers=_version_headers(snapshot),
+    )
+
+@app.post("/recommend/cold_start", response_model=schemas.RecsResponse)
+async def recommend_cold_start(profile: schemas.StudentProfile, top_k: int = 10):
+    """Score a profile that has no precomputed recommendations"""
+    snapshot = recommender_service.current()
+    if snapshot.scorer is None:
+        raise HTTPException(status_code=503, detail=snapshot.scorer_error)
+    data = profile.model_dump() if hasattr(profile, "model_dump") else profile.dict()
+    key = ("cold_start", snapshot.version, top_k, json.dumps(data, sort_keys=True, default=str))
+    try:
+        recs = await flights.do(key, lambda: executor.run(STAGE_COLD_START.time(snapshot.score_profile),
+                                                          profile.student_id, data, top_k))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"student_id": profile.student_id, "recommendations": recs}
 
 @app.post("/recommend_and_store/{student_id}")
 def recommend_and_store(student_id: str, top_k: int = 10, db: Session = Depends(get_db)):
@@ -134,5 +378,6 @@ def recommend_and_store(student_id: str, top_k: int = 10, db: Session = Depends(
     import pandas as pd
     df = pd.DataFrame(recs)
     # ensure expected columns: student_id, internship_id, title, domain, score, rank
-    crud.save_recommendations_from_df(db, df, reset=False)
+    # upsert: storing again replaces this student's rows instead of appending
+    crud.upsert_recommendations(db, df)
     return {"student_id": student_id, "recommendations_saved": len(df)}
@@ -0,0 +1,157 @@
+# app/metrics.py
+"""
+In-process counters and latency histograms, rendered as Prometheus text.
+
+Cheap enough to stay on in production. Histograms have fixed buckets
+allocated up front, and an observation is a bisect plus two increments with
+no lock. Under heavy contention an increment can very occasionally be lost,
+which is fine for monitoring. Series are created on first use and reused
+afterwards; values that only exist elsewhere (cache sizes and hit counts,
+executor depth, artifact row counts) are read at scrape time through
+``gauges``.
+"""
+import os
+import time
+from bisect import bisect_left
+
+# seconds; /recommend hits sit in the first buckets, cold-start scoring in the last
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self, fn):
+        """``fn`` wrapped to observe its duration (for calls run on another thread)."""
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - started)
+        return timed
+
+
+class Registry:
+    def __init__(self):
+        # name -> (type, help, {label tuple: Counter | Histogram})
+        self._families = {}
+        # callables returning [(name, help, {label tuple: value})] at scrape time; a
+        # fourth item "counter" types a monotonic value (its name then ends in _total)
+        self.gauges = []
+
+    def _series(self, kind, name, help, labels, make):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families.setdefault(name, (kind, help, {}))
+        key = tuple(sorted(labels.items()))
+        series = family[2].get(key)
+        if series is None:
+            series = family[2].setdefault(key, make())
+        return series
+
+    def counter(self, name, help, **labels) -> Counter:
+        return self._series("counter", name, help, labels, Counter)
+
+    def histogram(self, name, help, **labels) -> Histogram:
+        return self._series("histogram", name, help, labels, Histogram)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help, series) in sorted(self._families.items()):
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, metric in list(series.items()):
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {metric.value}")
+                    continue
+                total = 0
+                for bound, count in zip(metric.bounds + (float("inf"),), list(metric.counts)):
+                    total += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {total}")
+                lines.append(f"{name}_sum{_labels(labels)} {metric.sum!r}")
+                lines.append(f"{name}_count{_labels(labels)} {total}")
+        for collect in self.gauges:
+            for name, help, values, *kind in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind[0] if kind else 'gauge'}"]
+                for labels, value in values.items():
+                    if value is not None:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def stage(name) -> Histogram:
+    """Latency histogram of one step of the serving path."""
+    return registry.histogram("recommender_stage_seconds", "Time spent in each serving stage", stage=name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            key = (scope["method"], route, status[0])
+            series = self._routes.get(key)
+            if series is None:
+                series = self._routes[key] = (
+                    registry.histogram("http_request_duration_seconds", "Request latency until the last body byte",
+                                       method=key[0], route=route),
+                    registry.counter("http_requests_total", "Requests served",
+                                     method=key[0], route=route, status=status[0]))
+            series[0].observe(time.perf_counter() - started)
+            series[1].inc()
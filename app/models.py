@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, Index
 from app.db import Base
 
 class Student(Base):
@@ -23,8 +23,14 @@ class Internship(Base):
 
 class Recommendation(Base):
     __tablename__ = "recommendations"
+    # covering index for "one student's list in rank order": no table lookups, no sort
+    __table_args__ = (
+        Index("ix_recommendations_student_rank", "student_id", "rank", "internship_id", "score"),
+        # one row per pair; stores of the same student upsert instead of appending
+        Index("ux_recommendations_student_internship", "student_id", "internship_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(String, index=True)
+    student_id = Column(String)
     internship_id = Column(String)
     title = Column(String)
     domain = Column(String)
@@ -0,0 +1,189 @@
+# app/pair_features.py
+"""
+Vectorized (student, internship) feature builder for the meta model.
+
+Replaces the notebook's Cell 11 double loop. Per-student and per-internship
+columns are computed once; a chunk of pairs is then a handful of gathers and
+broadcasted ops, with skill overlap taken from sparse multi-hot matrices.
+Only eligible pairs are scored, in fixed-size chunks, and a running top-K
+per student is kept, so peak memory follows ``chunk_size`` rather than S x I.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+FEATURE_COLS = ['cbf', 'cf', 'rule', 'skill_overlap', 'domain_match', 'age_gap', 'stipend_norm',
+                'remote_match', 'github_flag', 'project_impact', 'rural', 'female']
+STD_COLS = ['age_gap', 'project_impact', 'skill_overlap', 'stipend_norm']
+
+
+def parse_skills(text):
+    if not isinstance(text, str):
+        return set()
+    return set(x.strip().lower() for x in text.split(',') if x.strip())
+
+
+def skill_vocab(skill_texts):
+    return {s: k for k, s in enumerate(sorted(set().union(*(parse_skills(t) for t in skill_texts))))}
+
+
+def multi_hot(skill_texts, vocab):
+    """CSR 0/1 matrix, one row per skill string; skills outside ``vocab`` are dropped."""
+    indptr, indices = [0], []
+    for text in skill_texts:
+        indices.extend(sorted(vocab[s] for s in parse_skills(text) if s in vocab))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(vocab)))
+
+
+class PairFeatureBuilder:
+    """Builds ``FEATURE_COLS`` rows for arbitrary (student, internship) index pairs.
+
+    ``cbf`` / ``cf`` / ``rule`` are the normalized S x I matrices from Cell 7
+    (anything supporting ``m[s_idx, i_idx]`` works, e.g. a memmap).
+    """
+
+    def __init__(self, students_df, internships_df, cbf, cf, rule):
+        self.cbf, self.cf, self.rule = cbf, cf, rule
+        self.n_students, self.n_internships = len(students_df), len(internships_df)
+
+        vocab = skill_vocab(internships_df['required_skills'].tolist())
+        self.student_skills = multi_hot(students_df['skills'].tolist(), vocab)
+        self.req_skills = multi_hot(internships_df['required_skills'].tolist(), vocab)
+        self.req_counts = np.asarray(self.req_skills.sum(axis=1), dtype=np.float64).ravel()
+
+        domains = pd.factorize(pd.concat([students_df['domain'], internships_df['domain']], ignore_index=True))[0]
+        self.student_domain = domains[:self.n_students]
+        self.intern_domain = domains[self.n_students:]
+        self.age = students_df['age'].to_numpy(dtype=np.float64)
+        self.github = students_df['github'].fillna('').astype(bool).to_numpy(dtype=np.float64)
+        self.project_impact = students_df['project_impact'].to_numpy(dtype=np.float64)
+        self.rural = students_df['rural'].to_numpy(dtype=np.float64)
+        self.female = students_df['female'].to_numpy(dtype=np.float64)
+
+        self.mid_age = (internships_df['min_age'].to_numpy(dtype=np.float64)
+                        + internships_df['max_age'].to_numpy(dtype=np.float64)) / 2.0
+        stipend = internships_df['stipend'].to_numpy(dtype=np.float64)
+        self.stipend_norm = (stipend - stipend.min()) / (stipend.max() - stipend.min() + 1e-9)
+        self.remote = (internships_df['remote'].to_numpy() == 1).astype(np.float64)
+
+    def skill_overlap(self, s_idx, i_idx):
+        # row-wise dot of the two multi-hot gathers = |student skills & required skills|
+        common = np.asarray(self.student_skills[s_idx].multiply(self.req_skills[i_idx]).sum(axis=1)).ravel()
+        counts = self.req_counts[i_idx]
+        return np.divide(common, counts, out=np.zeros(len(counts)), where=counts > 0)
+
+    def features(self, s_idx, i_idx):
+        """``len(s_idx) x 12`` float64 matrix in ``FEATURE_COLS`` order."""
+        s_idx = np.asarray(s_idx, dtype=np.int64)
+        i_idx = np.asarray(i_idx, dtype=np.int64)
+        return np.column_stack([
+            np.asarray(self.cbf[s_idx, i_idx], dtype=np.float64),
+            np.asarray(self.cf[s_idx, i_idx], dtype=np.float64),
+            np.asarray(self.rule[s_idx, i_idx], dtype=np.float64),
+            self.skill_overlap(s_idx, i_idx),
+            (self.student_domain[s_idx] == self.intern_domain[i_idx]).astype(np.float64),
+            np.abs(self.age[s_idx] - self.mid_age[i_idx]) / 20.0,
+            self.stipend_norm[i_idx],
+            self.remote[i_idx],
+            self.github[s_idx],
+            self.project_impact[s_idx],
+            self.rural[s_idx],
+            self.female[s_idx],
+        ])
+
+    def frame(self, s_idx, i_idx, std_scaler=None):
+        """Feature rows as the DataFrame the meta model was trained on."""
+        X = pd.DataFrame(self.features(s_idx, i_idx), columns=FEATURE_COLS)
+        if std_scaler is not None:
+            X[STD_COLS] = std_scaler.transform(X[STD_COLS])
+        return X
+
+
+def eligible_chunks(elig_mask, chunk_size=200_000):
+    """Yield ``(s_idx, i_idx)`` of eligible pairs, student-major, at most ``chunk_size`` at a time."""
+    elig_mask = np.asarray(elig_mask, dtype=bool)
+    n_students, n_internships = elig_mask.shape
+    rows_per_block = max(1, chunk_size // max(1, n_internships))
+    s_buf, i_buf, n_buf = [], [], 0
+    for start in range(0, n_students, rows_per_block):
+        s, i = np.nonzero(elig_mask[start:start + rows_per_block])
+        s += start
+        while len(s):
+            take = chunk_size - n_buf
+            s_buf.append(s[:take]); i_buf.append(i[:take]); n_buf += len(s[:take])
+            s, i = s[take:], i[take:]
+            if n_buf == chunk_size:
+                yield np.concatenate(s_buf), np.concatenate(i_buf)
+                s_buf, i_buf, n_buf = [], [], 0
+    if n_buf:
+        yield np.concatenate(s_buf), np.concatenate(i_buf)
+
+
+class TopKAccumulator:
+    """Running per-student top-K of ``(internship, score)`` fed one chunk at a time.
+
+    Each chunk is reduced to its per-student top-K and merged with the kept
+    candidates, so memory stays at O(students x K). Ties are broken by the
+    lower internship index.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.s = np.zeros(0, dtype=np.int64)
+        self.i = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros(0, dtype=np.float64)
+
+    @staticmethod
+    def _reduce(s, i, scores, k):
+        order = np.lexsort((i, -scores, s))
+        s, i, scores = s[order], i[order], scores[order]
+        first = np.r_[0, np.flatnonzero(np.diff(s)) + 1]
+        rank = np.arange(len(s)) - np.repeat(first, np.diff(np.r_[first, len(s)]))
+        keep = rank < k
+        return s[keep], i[keep], scores[keep]
+
+    def push(self, s_idx, i_idx, scores):
+        if not len(s_idx) or self.k <= 0:
+            return
+        self.s, self.i, self.scores = self._reduce(
+            np.concatenate([self.s, np.asarray(s_idx, dtype=np.int64)]),
+            np.concatenate([self.i, np.asarray(i_idx, dtype=np.int64)]),
+            np.concatenate([self.scores, np.asarray(scores, dtype=np.float64)]), self.k)
+
+    def result(self):
+        """``(s_idx, i_idx, scores, rank)`` sorted by student then rank (1-based)."""
+        if not len(self.s):
+            return self.s, self.i, self.scores, np.zeros(0, dtype=np.int64)
+        first = np.r_[0, np.flatnonzero(np.diff(self.s)) + 1]
+        rank = np.arange(len(self.s)) - np.repeat(first, np.diff(np.r_[first, len(self.s)])) + 1
+        return self.s, self.i, self.scores, rank
+
+
+def score_eligible(builder, predict, elig_mask, top_k=10, chunk_size=200_000, std_scaler=None, on_chunk=None):
+    """Meta-model scores of every eligible pair, in chunks.
+
+    ``predict(X)`` maps a feature frame to raw predictions. Returns
+    ``(topk, pred_min, pred_max)`` where ``topk`` is a TopKAccumulator over
+    raw predictions and the min/max span every pair the dense Cell 11 used:
+    ineligible pairs have all-zero features, i.e. one constant prediction.
+    ``on_chunk(s_idx, i_idx, preds)`` sees every scored chunk (e.g. to fill
+    a dense matrix for the allocator).
+    """
+    elig_mask = np.asarray(elig_mask, dtype=bool)
+    topk = TopKAccumulator(top_k)
+    pred_min, pred_max = np.inf, -np.inf
+    if not elig_mask.all():
+        zero = pd.DataFrame(np.zeros((1, len(FEATURE_COLS))), columns=FEATURE_COLS)
+        if std_scaler is not None:
+            zero[STD_COLS] = std_scaler.transform(zero[STD_COLS])
+        pred_min = pred_max = float(np.asarray(predict(zero), dtype=np.float64)[0])
+    for s_idx, i_idx in eligible_chunks(elig_mask, chunk_size):
+        preds = np.asarray(predict(builder.frame(s_idx, i_idx, std_scaler)), dtype=np.float64)
+        pred_min = min(pred_min, float(preds.min()))
+        pred_max = max(pred_max, float(preds.max()))
+        topk.push(s_idx, i_idx, preds)
+        if on_chunk is not None:
+            on_chunk(s_idx, i_idx, preds)
+    return topk, pred_min, pred_max
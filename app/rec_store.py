@@ -0,0 +1,165 @@
+# app/rec_store.py
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+
+class RecommendationStore:
+    """CSR-style store of precomputed recommendations.
+
+    Every student's recommendations live in one contiguous slice of
+    ``intern_idx`` / ``scores`` (already sorted by rank), located through
+    ``index[student_id] -> row`` and ``offsets[row]`` / ``lengths[row]``.
+    Internships are kept as int32 positions into ``internship_ids`` so no
+    per-row strings are held. ``overlay[student_id] = (intern_idx, scores)``
+    holds incrementally rescored students and wins over the base arrays.
+    """
+
+    def __init__(self, student_ids, offsets, lengths, intern_idx, scores, internship_ids, index=None,
+                 overlay=None):
+        self.student_ids = student_ids
+        self.offsets = offsets
+        self.lengths = lengths
+        self.intern_idx = intern_idx
+        self.scores = scores
+        self.internship_ids = internship_ids
+        # any mapping with .get() works, e.g. the mmapped SortedKeyIndex of a bundle
+        self.index = index if index is not None else {sid: row for row, sid in enumerate(student_ids)}
+        self.overlay = overlay or {}
+
+    @classmethod
+    def from_frame(cls, recs_df: pd.DataFrame, internship_ids=None):
+        """Build the store from a recommendations.csv style frame.
+
+        ``internship_ids`` fixes the internship vocabulary (normally the
+        catalog order); ids only present in ``recs_df`` are appended to it.
+        """
+        if internship_ids is None:
+            internship_ids = []
+        vocab = pd.Index(pd.Series(internship_ids, dtype=object).astype(str))
+        if recs_df is None or recs_df.empty:
+            return cls(
+                np.empty(0, dtype=object), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32), vocab.to_numpy(dtype=object),
+            )
+
+        rec_iids = recs_df['internship_id'].astype(str)
+        extra = pd.Index(rec_iids.unique()).difference(vocab, sort=False)
+        if len(extra):
+            vocab = vocab.append(extra)
+        intern_idx = vocab.get_indexer(rec_iids).astype(np.int32)
+
+        codes, uniques = pd.factorize(recs_df['student_id'].astype(str))
+        order = np.lexsort((recs_df['rank'].to_numpy(), codes))
+        counts = np.bincount(codes, minlength=len(uniques))
+        offsets = np.zeros(len(uniques), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+
+        return cls(
+            student_ids=np.asarray(uniques, dtype=object),
+            offsets=offsets,
+            lengths=counts.astype(np.int32),
+            intern_idx=np.ascontiguousarray(intern_idx[order]),
+            scores=np.ascontiguousarray(recs_df['score'].to_numpy(dtype=np.float32)[order]),
+            internship_ids=vocab.to_numpy(dtype=object),
+        )
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def __contains__(self, student_id):
+        return student_id in self.overlay or student_id in self.index
+
+    @cached_property
+    def depth(self):
+        """Longest stored recommendation list (overlay included)."""
+        base = int(self.lengths.max()) if len(self.lengths) else 0
+        return max([base] + [len(idx) for idx, _ in self.overlay.values()])
+
+    @property
+    def nbytes(self):
+        return int(self.offsets.nbytes + self.lengths.nbytes + self.intern_idx.nbytes + self.scores.nbytes)
+
+    def lookup(self, student_id: str, top_k: int = None):
+        """Return ``(intern_idx, scores)`` views for a student, or None if unknown."""
+        patch = self.overlay.get(student_id)
+        if patch is not None:
+            n = len(patch[0]) if top_k is None else max(0, min(len(patch[0]), top_k))
+            return patch[0][:n], patch[1][:n]
+        row = self.index.get(student_id)
+        if row is None:
+            return None
+        start = int(self.offsets[row])
+        n = int(self.lengths[row])
+        if top_k is not None:
+            n = max(0, min(n, top_k))
+        return self.intern_idx[start:start + n], self.scores[start:start + n]
+
+    def gather(self, student_ids, top_k: int = None):
+        """Vectorized lookup for many students in one pass.
+
+        Returns ``(found, unknown, bounds, intern_idx, scores)``: the
+        recommendations of ``found[j]`` are
+        ``intern_idx[bounds[j]:bounds[j + 1]]`` (and the same slice of
+        ``scores``), in rank order.
+        """
+        if self.overlay:
+            return self._gather_slices(student_ids, top_k)
+        rows, found, unknown = [], [], []
+        for sid in student_ids:
+            row = self.index.get(sid)
+            if row is None:
+                unknown.append(sid)
+            else:
+                rows.append(row)
+                found.append(sid)
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = np.asarray(self.lengths[rows], dtype=np.int64)
+        if top_k is not None:
+            counts = np.clip(counts, 0, max(0, top_k))
+        bounds = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=bounds[1:])
+        # one gather for every requested slice
+        pos = np.repeat(np.asarray(self.offsets[rows], dtype=np.int64) - bounds[:-1], counts) + np.arange(bounds[-1])
+        return found, unknown, bounds, np.asarray(self.intern_idx[pos]), np.asarray(self.scores[pos])
+
+    def _gather_slices(self, student_ids, top_k=None):
+        # per-student path, used once an overlay exists
+        found, unknown, idx, scores = [], [], [], []
+        for sid in student_ids:
+            hit = self.lookup(sid, top_k)
+            if hit is None:
+                unknown.append(sid)
+            else:
+                found.append(sid)
+                idx.append(np.asarray(hit[0]))
+                scores.append(np.asarray(hit[1]))
+        bounds = np.zeros(len(found) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in idx], out=bounds[1:])
+        if not idx:
+            return found, unknown, bounds, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return found, unknown, bounds, np.concatenate(idx), np.concatenate(scores)
+
+    def patched(self, updates, new_internship_ids=()):
+        """New store with ``updates[student_id] = (internship_ids, scores)`` applied.
+
+        The base arrays are shared, not copied; internship ids missing from
+        the vocabulary (or listed in ``new_internship_ids``) are appended to it.
+        """
+        vocab = self.internship_ids
+        known = set(vocab.tolist())
+        wanted = list(new_internship_ids) + [iid for iids, _ in updates.values() for iid in iids]
+        extra = [iid for iid in dict.fromkeys(wanted) if iid not in known]
+        if extra:
+            vocab = np.append(vocab, np.asarray(extra, dtype=object))
+        position = {iid: k for k, iid in enumerate(vocab.tolist())}
+        overlay = dict(self.overlay)
+        for sid, (iids, scores) in updates.items():
+            overlay[sid] = (np.array([position[i] for i in iids], dtype=np.int32),
+                            np.asarray(scores, dtype=np.float32))
+        store = RecommendationStore(self.student_ids, self.offsets, self.lengths, self.intern_idx, self.scores,
+                                    vocab, index=self.index, overlay=overlay)
+        if 'depth' in self.__dict__:
+            store.depth = max([self.depth] + [len(iids) for iids, _ in updates.values()])
+        return store
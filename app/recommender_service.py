@@ -1,8 +1,20 @@
 # app/recommender_service.py
+import copy
 import os
+import numpy as np
 import pandas as pd
+from functools import cached_property
 from pathlib import Path
 
+from app import columnar
+from app.artifacts import ArtifactManager, content_version
+from app.catalog import DETAIL_FIELDS, build_item_table, keyset_page
+from app.cold_start import ColdStartScorer
+from app.item_filters import ItemFilterIndex
+from app.rec_store import RecommendationStore
+from app.sqlite_store import SQLiteRecommendationStore, generation
+from app.response_cache import ResponseCache, dumps, item_fragments
+
 ROOT = Path(__file__).resolve().parents[1]
 _candidate_dirs = [
     ROOT / "outputs_recommender_v2",
@@ -15,66 +27,421 @@ RECS_CSV = OUT_DIR / "recommendations.csv"
 STUDENTS_CSV = OUT_DIR / "students_synthetic.csv"
 INTERNS_CSV = OUT_DIR / "internships_synthetic.csv"
 
-# load on import (fast reads)
-if RECS_CSV.exists():
-    recs_df = pd.read_csv(RECS_CSV)
-else:
-    recs_df = pd.DataFrame(columns=['student_idx','student_id','intern_idx','internship_id','title','domain','score','rank'])
+BASE_FIELDS = ['student_id', 'internship_id', 'title', 'domain', 'score', 'rank']
+# ``fields=`` on /recommend: any RecItem field, or the summary / full presets
+REC_FIELDS = BASE_FIELDS + DETAIL_FIELDS
+REC_SUMMARY_FIELDS = ['internship_id', 'title', 'domain', 'score', 'rank', 'stipend']
 
-if STUDENTS_CSV.exists():
-    students_df = pd.read_csv(STUDENTS_CSV)
-else:
-    students_df = pd.DataFrame()
+# pre-rendered /recommend bodies, bounded for big catalogs
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+# how many of them to render while loading (defaults to the whole cache)
+RESPONSE_CACHE_WARM = int(os.getenv("RESPONSE_CACHE_WARM", str(RESPONSE_CACHE_SIZE)))
 
-if INTERNS_CSV.exists():
-    internships_df = pd.read_csv(INTERNS_CSV)
-else:
-    internships_df = pd.DataFrame()
+# least number of online recommendations cached for students missing from the
+# store (they are scored as deep as the stored lists when those are longer)
+COLD_START_TOP_K = int(os.getenv("COLD_START_TOP_K", "10"))
 
-def recommend_for_student(student_id: str, top_k: int = 10):
-    if student_id not in recs_df['student_id'].unique():
-        # fallback: return empty list
-        return []
-    sub = recs_df[recs_df['student_id'] == student_id].sort_values('rank').head(top_k)
-    
-    # Merge with internship details to get additional fields
-    if not internships_df.empty and not sub.empty:
-        # Merge recommendations with ALL internship details
-        merged = sub.merge(
-            internships_df[['internship_id', 'required_skills', 'min_age', 'max_age', 
-                          'stipend', 'remote', 'capacity', 'org_pref_govt', 'ministry', 
-                          'state', 'csr_underprivileged_pct', 'description', 'job_text']],
-            on='internship_id',
-            how='left'
+# "auto" serves the mmapped columnar bundle when it is at least as new as the
+# CSVs, "bundle" / "csv" force one input
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "auto")
+BUNDLE_CURRENT = OUT_DIR / columnar.BUNDLE_DIRNAME / "CURRENT"
+
+# "memory" keeps the recommendations in this process (CSV or bundle); "sqlite"
+# answers from the recommendations table of app.db, shared by all workers
+RECOMMEND_BACKEND = os.getenv("RECOMMEND_BACKEND", "memory")
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+
+
+class Snapshot:
+    """One consistent version of the serving artifacts.
+
+    Built completely before it is published by the ArtifactManager, and
+    never mutated afterwards; callers grab ``manager.current`` once and use
+    that snapshot for the whole request. Incremental rescores publish a
+    ``patched()`` copy instead of mutating it.
+    """
+
+    def __init__(self, version, store, items, internships_df, students):
+        self.version = version
+        # version of the artifacts on disk; ``version`` adds a suffix per patch
+        self.base_version = version
+        self.patch_count = 0
+        # profiles sent with incremental rescores, newer than students_df
+        self.profile_overrides = {}
+        self.store = store
+        self.internships_df = internships_df
+        self.item_titles, self.item_domains, self.item_details = items
+        # a DataFrame, or a callable that materializes one on first use
+        self._students = students
+        self.item_heads, self.item_tails = item_fragments(
+            self.store.internship_ids, self.item_titles, self.item_domains, self.item_details, DETAIL_FIELDS
         )
-        # Convert to dict list with all fields
-        result = merged[['student_id', 'internship_id', 'title', 'domain', 'score', 'rank',
-                        'required_skills', 'min_age', 'max_age', 'stipend', 'remote', 
-                        'capacity', 'org_pref_govt', 'ministry', 'state', 
-                        'csr_underprivileged_pct', 'description', 'job_text']].to_dict(orient='records')
-        
-        # Handle NaN values - convert to None for JSON serialization
-        for rec in result:
-            for key, value in rec.items():
-                if pd.isna(value):
-                    rec[key] = None
-            # Convert integer fields
-            int_fields = ['remote', 'min_age', 'max_age', 'capacity', 'org_pref_govt']
-            for field in int_fields:
-                if rec.get(field) is not None:
-                    rec[field] = int(rec[field])
-            # Convert float fields
-            float_fields = ['stipend', 'csr_underprivileged_pct']
-            for field in float_fields:
-                if rec.get(field) is not None:
-                    rec[field] = float(rec[field])
-        
+        self.scorer, self.scorer_error = _load_scorer(internships_df)
+        if self.scorer is not None:
+            # catalog position -> store vocabulary index, for rendering online scores
+            self.catalog_to_vocab = pd.Index(self.store.internship_ids).get_indexer(
+                internships_df['internship_id'].astype(str))
+            self.scorer.embedder.warm()
+        # per-field '"name":value' fragments of every item, built on first projection
+        self._field_fragments = {}
+        self.response_cache = ResponseCache(self._render_for_cache, max_entries=RESPONSE_CACHE_SIZE)
+        self.response_cache.warm(self.store.student_ids, limit=RESPONSE_CACHE_WARM)
+
+    @classmethod
+    def from_frames(cls, version, recs_df, students_df, internships_df):
+        store = RecommendationStore.from_frame(
+            recs_df, internships_df['internship_id'] if not internships_df.empty else None
+        )
+        fallback = None
+        if not recs_df.empty:
+            fallback = (recs_df.assign(internship_id=recs_df['internship_id'].astype(str))
+                        .drop_duplicates('internship_id').set_index('internship_id')[['title', 'domain']])
+        items = build_item_table(store.internship_ids, internships_df, fallback)
+        return cls(version, store, items, internships_df, students_df)
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        store = bundle.store()
+        internships_df = bundle.frame("internships")
+        items = build_item_table(store.internship_ids, internships_df, bundle.item_fallback())
+        return cls(bundle.version, store, items, internships_df, lambda: bundle.frame("students"))
+
+    @classmethod
+    def from_sqlite(cls, version, db_file, students_df, internships_df):
+        catalog = internships_df['internship_id'].astype(str).tolist() if not internships_df.empty else []
+        store = SQLiteRecommendationStore.open(db_file, catalog, SQLITE_POOL_SIZE)
+        fallback = store.item_fallback() if len(store.internship_ids) > len(catalog) else None
+        items = build_item_table(store.internship_ids, internships_df, fallback)
+        return cls(version, store, items, internships_df, students_df)
+
+    @cached_property
+    def students_df(self):
+        students = self._students
+        return students() if callable(students) else students
+
+    def render(self, student_id, intern_idx, scores):
+        """Turn a store slice into the list of recommendation dicts served by the API."""
+        result = []
+        for rank, (i, score) in enumerate(zip(intern_idx.tolist(), scores.tolist()), start=1):
+            rec = {
+                'student_id': student_id,
+                'internship_id': self.store.internship_ids[i],
+                'title': self.item_titles[i],
+                'domain': self.item_domains[i],
+                'score': score,
+                'rank': rank,
+            }
+            if self.item_details is not None:
+                rec.update(self.item_details[i])
+            result.append(rec)
         return result
-    else:
-        # Fallback to basic fields if merge fails
-        return sub[['student_id','internship_id','title','domain','score','rank']].to_dict(orient='records')
+
+    def recommend(self, student_id: str, top_k: int = 10):
+        hit = self.store.lookup(student_id, top_k)
+        if hit is None:
+            # not precomputed: score online if we know the profile, else empty list
+            recs = self._cold_start_known(student_id, top_k)
+            return recs if recs is not None else []
+        return self.render(student_id, *hit)
+
+    def _item_field(self, field):
+        frags = self._field_fragments.get(field)
+        if frags is None:
+            if field == 'internship_id':
+                values = self.store.internship_ids.tolist()
+            elif field == 'title':
+                values = self.item_titles
+            elif field == 'domain':
+                values = self.item_domains
+            elif self.item_details is None:
+                values = [None] * len(self.store.internship_ids)
+            else:
+                values = [rec.get(field) for rec in self.item_details]
+            key = dumps(field) + b":"
+            frags = [key + dumps(value) for value in values]
+            self._field_fragments[field] = frags
+        return frags
+
+    @cached_property
+    def item_filters(self):
+        return ItemFilterIndex.from_items(self.item_domains, self.item_details)
+
+    def filtered_lookup(self, student_id: str, top_k: int, filters):
+        """First ``top_k`` items passing ``filters`` (ItemFilterIndex.mask arguments).
+
+        Walks the stored ranked list first; when fewer than ``top_k`` pass,
+        the rest come from scoring the student's profile against just the
+        matching internships. None for an unknown student with no profile.
+        """
+        mask = self.item_filters.mask(**filters)
+        if mask is None:
+            return self.store.lookup(student_id, top_k)
+        hit = self.store.lookup(student_id)
+        idx, scores = hit if hit is not None else (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+        keep = mask[idx]
+        idx, scores = idx[keep][:top_k], scores[keep][:top_k]
+        need = top_k - len(idx)
+        profile = self.student_profile(student_id) if need > 0 and self.scorer is not None else None
+        if profile is not None:
+            vocab = self.catalog_to_vocab
+            allowed = (vocab >= 0) & mask[np.maximum(vocab, 0)]
+            if hit is not None:
+                # the stored list already had its chance
+                allowed[np.isin(vocab, hit[0])] = False
+            try:
+                deep_idx, deep_scores = self.scorer.score(profile, need, allowed=allowed)
+            except RuntimeError:
+                deep_idx = deep_scores = np.zeros(0)
+            idx = np.concatenate([idx, vocab[deep_idx]]).astype(np.int32)
+            scores = np.concatenate([scores, deep_scores]).astype(np.float32)
+        elif hit is None:
+            return None
+        return idx, scores
+
+    def projected_body(self, student_id: str, top_k: int = 10, fields=REC_SUMMARY_FIELDS, filters=None) -> bytes:
+        """/recommend body carrying only ``fields`` of each recommendation.
+
+        Assembled from per-field fragments, so the unrequested columns (the
+        long description / job_text) are never looked at or encoded.
+        ``filters`` restricts the list (see ``filtered_lookup``).
+        """
+        sid_json = dumps(student_id)
+        if filters:
+            hit = self.filtered_lookup(student_id, top_k, filters)
+        else:
+            hit = self.store.lookup(student_id, top_k)
+        if hit is None:
+            recs = [] if filters else (self._cold_start_known(student_id, top_k) or [])
+            items = [dumps({field: rec.get(field) for field in fields}) for rec in recs]
+        else:
+            columns = {field: self._item_field(field) for field in fields
+                       if field not in ('student_id', 'score', 'rank')}
+            items = []
+            for rank, (i, score) in enumerate(zip(hit[0].tolist(), hit[1].tolist()), start=1):
+                parts = []
+                for field in fields:
+                    if field == 'student_id':
+                        parts.append(b'"student_id":' + sid_json)
+                    elif field == 'score':
+                        parts.append(b'"score":' + dumps(score))
+                    elif field == 'rank':
+                        parts.append(b'"rank":' + str(rank).encode())
+                    else:
+                        parts.append(columns[field][i])
+                items.append(b"{" + b",".join(parts) + b"}")
+        return b'{"student_id":' + sid_json + b',"recommendations":[' + b",".join(items) + b"]}"
+
+    def score_profile(self, student_id, profile, top_k: int = 10):
+        """Online (cold-start) recommendations for an arbitrary profile."""
+        if self.scorer is None:
+            raise RuntimeError(self.scorer_error or "cold-start scorer unavailable")
+        idx, scores = self.scorer.score(profile, top_k)
+        return self.render(student_id, self.catalog_to_vocab[idx], scores)
+
+    @cached_property
+    def cache_depth(self):
+        """Recommendations cached per cold-start student, so any top_k a stored student gets is served too."""
+        return max(COLD_START_TOP_K, self.store.depth)
+
+    @cached_property
+    def _student_rows(self):
+        df = self.students_df
+        if df is None or df.empty:
+            return {}
+        return {sid: row for row, sid in enumerate(df['student_id'].astype(str).tolist())}
+
+    def student_profile(self, student_id):
+        if student_id in self.profile_overrides:
+            return dict(self.profile_overrides[student_id])
+        row = self._student_rows.get(student_id)
+        if row is None:
+            return None
+        return self.students_df.iloc[row].to_dict()
+
+    def _cold_start_known(self, student_id, top_k):
+        if self.scorer is None:
+            return None
+        profile = self.student_profile(student_id)
+        if profile is None:
+            return None
+        try:
+            return self.score_profile(student_id, profile, top_k)
+        except RuntimeError:
+            return None
+
+    def recommend_batch_json(self, student_ids, top_k: int = 10):
+        """Stream one JSON document with the recommendations of many students.
+
+        The store slices are gathered in a single vectorized pass and joined
+        with the pre-serialized internship fragments; unknown ids are listed
+        under ``unknown_ids`` instead of failing the batch.
+        """
+        found, unknown, bounds, intern_idx, scores = self.store.gather(student_ids, top_k)
+        heads = [self.item_heads[i] for i in intern_idx.tolist()]
+        tails = [self.item_tails[i] for i in intern_idx.tolist()]
+        scores = scores.tolist()
+        yield (b'{"top_k":' + dumps(top_k) + b',"count":' + dumps(len(found))
+               + b',"unknown_ids":' + dumps(unknown) + b',"results":[')
+        for j, sid in enumerate(found):
+            sid_json = dumps(sid)
+            recs = []
+            for rank, k in enumerate(range(bounds[j], bounds[j + 1]), start=1):
+                recs.append(b'{"student_id":' + sid_json + b',' + heads[k] + b',"score":' + dumps(scores[k])
+                            + b',"rank":' + str(rank).encode() + tails[k] + b'}')
+            prefix = b',' if j else b''
+            yield prefix + b'{"student_id":' + sid_json + b',"recommendations":[' + b','.join(recs) + b']}'
+        yield b']}'
+
+    def _render_for_cache(self, student_id):
+        hit = self.store.lookup(student_id)
+        if hit is None:
+            return self._cold_start_known(student_id, self.cache_depth)
+        recs = self.render(student_id, *hit)
+        if self.item_details is None:
+            # same shape schemas.RecItem would give after validation
+            recs = [{field: rec.get(field) for field in BASE_FIELDS + DETAIL_FIELDS} for rec in recs]
+        return recs
+
+    def patched(self, updates, scorer=None, changed_internships=(), profiles=None):
+        """Copy of this snapshot with incrementally rescored students applied.
+
+        ``updates[student_id] = (internship_ids, scores)`` replaces those
+        students' lists; ``scorer`` (with its catalog) and
+        ``changed_internships`` carry an added or edited internship.
+        """
+        snap = copy.copy(self)
+        snap.patch_count = self.patch_count + 1
+        snap.version = f"{self.base_version}+p{snap.patch_count}"
+        snap.store = self.store.patched(updates, changed_internships)
+        snap.__dict__.pop('cache_depth', None)
+        snap.profile_overrides = {**self.profile_overrides, **(profiles or {})}
+        if scorer is not None:
+            snap.scorer, snap.scorer_error = scorer, None
+            snap.internships_df = scorer.internships_df
+
+        vocab = snap.store.internship_ids
+        changed = set(changed_internships)
+        stale = [k for k, iid in enumerate(vocab.tolist()) if k >= len(self.store.internship_ids) or iid in changed]
+        if stale:
+            titles, domains, details = build_item_table([vocab[k] for k in stale], snap.internships_df)
+            heads, tails = item_fragments([vocab[k] for k in stale], titles, domains, details, DETAIL_FIELDS)
+            snap.item_titles, snap.item_domains = list(self.item_titles), list(self.item_domains)
+            snap.item_details = list(self.item_details) if self.item_details is not None else None
+            snap.item_heads, snap.item_tails = list(self.item_heads), list(self.item_tails)
+            for j, k in enumerate(stale):
+                for table, values in ((snap.item_titles, titles), (snap.item_domains, domains),
+                                      (snap.item_details, details), (snap.item_heads, heads),
+                                      (snap.item_tails, tails)):
+                    if table is None or values is None:
+                        continue
+                    if k < len(table):
+                        table[k] = values[j]
+                    else:
+                        table.append(values[j])
+        snap._field_fragments = {} if stale else self._field_fragments
+        if stale:
+            snap.__dict__.pop('item_filters', None)
+        if snap.scorer is not None:
+            snap.catalog_to_vocab = pd.Index(vocab).get_indexer(snap.internships_df['internship_id'].astype(str))
+        # edited internship details appear in any cached body, so start over then
+        keep = () if stale else set(self.response_cache.keys()) - set(updates)
+        snap.response_cache = self.response_cache.derive(snap._render_for_cache, keep)
+        return snap
+
+    def student_ids(self):
+        if self.students_df is not None and not self.students_df.empty:
+            return self.students_df['student_id'].astype(str).tolist()
+        return []
+
+    @cached_property
+    def _sorted_student_ids(self):
+        return sorted(set(self.student_ids()))
+
+    def student_page(self, after=None, limit=None):
+        """Student ids sorted, strictly after the ``after`` cursor, at most ``limit``.
+
+        Returns ``(ids, next_after)``; ``next_after`` is None on the last page.
+        The cursor is an id, so pages stay stable across reloads.
+        """
+        return keyset_page(self._sorted_student_ids, after, limit)
+
+
+def _load_scorer(internships_df):
+    """Cold-start scorer for this snapshot, or (None, reason)."""
+    try:
+        scorer = ColdStartScorer.load(OUT_DIR, internships_df)
+    except Exception as e:
+        return None, f"cold-start artifacts failed to load: {e!r}"
+    if scorer is None:
+        return None, "cold-start artifacts not found in outputs_recommender_v2"
+    return scorer, None
+
+
+def _read_csv(path, columns=None):
+    if path.exists():
+        return pd.read_csv(path)
+    return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
+
+
+def _use_bundle():
+    if ARTIFACT_FORMAT == "csv" or not BUNDLE_CURRENT.exists():
+        return False
+    if ARTIFACT_FORMAT == "bundle":
+        return True
+    csv_mtimes = [p.stat().st_mtime for p in (RECS_CSV, STUDENTS_CSV, INTERNS_CSV) if p.exists()]
+    return BUNDLE_CURRENT.stat().st_mtime >= max(csv_mtimes, default=0)
+
+
+def _sqlite_file():
+    from app.db import DB_FILE
+    return Path(DB_FILE)
+
+
+def artifact_version(paths):
+    if RECOMMEND_BACKEND == "sqlite":
+        # the table changes through crud, which bumps its generation
+        return f"{content_version([STUDENTS_CSV, INTERNS_CSV])}-g{generation(_sqlite_file())}"
+    if _use_bundle():
+        return columnar.current_version(OUT_DIR)
+    return content_version([RECS_CSV, STUDENTS_CSV, INTERNS_CSV])
+
+
+def load_snapshot(version=None):
+    if RECOMMEND_BACKEND == "sqlite":
+        return Snapshot.from_sqlite(version, _sqlite_file(), _read_csv(STUDENTS_CSV), _read_csv(INTERNS_CSV))
+    if _use_bundle():
+        return Snapshot.from_bundle(columnar.Bundle.open_current(OUT_DIR))
+    recs_df = _read_csv(RECS_CSV, ['student_idx','student_id','intern_idx','internship_id','title','domain','score','rank'])
+    return Snapshot.from_frames(version, recs_df, _read_csv(STUDENTS_CSV), _read_csv(INTERNS_CSV))
+
+
+def _watched_paths():
+    paths = [RECS_CSV, STUDENTS_CSV, INTERNS_CSV, BUNDLE_CURRENT]
+    if RECOMMEND_BACKEND == "sqlite":
+        from app import crud
+        from app.db import engine
+        crud.create_tables(engine)  # an empty table serves nothing until /populate_db
+        db_file = _sqlite_file()
+        paths += [db_file, db_file.with_name(db_file.name + "-wal")]
+    return paths
+
+
+# load on import; later versions are swapped in by reload / the file watcher
+manager = ArtifactManager(load_snapshot, _watched_paths(), version_of=artifact_version)
+manager.load()
+
+
+def current() -> Snapshot:
+    return manager.current
+
+
+def recommend_for_student(student_id: str, top_k: int = 10):
+    return manager.current.recommend(student_id, top_k)
+
+
+def recommend_json(student_id: str, top_k: int = 10) -> bytes:
+    """Ready-to-send RecsResponse JSON for a student."""
+    return manager.current.response_cache.body(student_id, top_k)
 
 def get_all_students():
-    if students_df is not None and not students_df.empty:
-        return students_df['student_id'].astype(str).tolist()
-    return []
+    return manager.current.student_ids()
@@ -0,0 +1,111 @@
+# app/response_cache.py
+import json
+import threading
+from collections import OrderedDict
+
+
+def dumps(obj) -> bytes:
+    # same encoding FastAPI's JSONResponse uses
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def item_fragments(internship_ids, titles, domains, details, detail_fields):
+    """Pre-serialized per-internship pieces of a recommendation record.
+
+    ``heads[i]`` is ``"internship_id":..,"title":..,"domain":..`` and
+    ``tails[i]`` the detail fields (``,"required_skills":..``), so a record
+    is assembled around the per-row score/rank without re-encoding.
+    """
+    heads, tails = [], []
+    for i, iid in enumerate(internship_ids):
+        head = dumps({'internship_id': iid, 'title': titles[i], 'domain': domains[i]})
+        heads.append(head[1:-1])
+        rec = details[i] if details is not None else {}
+        tail = dumps({field: rec.get(field) for field in detail_fields})
+        tails.append(b"," + tail[1:-1] if len(tail) > 2 else b"")
+    return heads, tails
+
+
+class ResponseCache:
+    """Bounded LRU of pre-rendered /recommend payloads.
+
+    Each entry holds one JSON fragment per recommendation (in rank order), so
+    any ``top_k`` up to the stored K is served by joining a prefix of the
+    fragments; no pandas work or model validation happens on a hit.
+    ``render(student_id)`` returns the list of record dicts, or None for an
+    unknown student (those are never cached).
+    """
+
+    def __init__(self, render, max_entries: int = 10000):
+        self.render = render
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def derive(self, render, keep=()):
+        """New cache for a patched snapshot that starts with the entries listed in ``keep``."""
+        cache = ResponseCache(render, self.max_entries)
+        with self._lock:
+            for sid, frags in self._entries.items():
+                if sid in keep:
+                    cache._entries[sid] = frags
+        return cache
+
+    def warm(self, student_ids, limit=None):
+        """Pre-render up to ``max_entries`` students (called when artifacts load)."""
+        limit = self.max_entries if limit is None else min(limit, self.max_entries)
+        hits, misses = self.hits, self.misses
+        for n, sid in enumerate(student_ids):
+            if n >= limit:
+                break
+            self._fragments(sid)
+        # the hit ratio describes traffic, not the warm-up
+        self.hits, self.misses = hits, misses
+
+    def body(self, student_id: str, top_k: int = 10) -> bytes:
+        return self._join(student_id, self._fragments(student_id) or (), top_k)
+
+    def cached_body(self, student_id: str, top_k: int = 10):
+        """``body`` for a cached student, None (without rendering) otherwise."""
+        with self._lock:
+            frags = self._entries.get(student_id)
+            if frags is None:
+                return None
+            self._entries.move_to_end(student_id)
+            self.hits += 1
+        return self._join(student_id, frags, top_k)
+
+    @staticmethod
+    def _join(student_id, frags, top_k):
+        if top_k < len(frags):
+            frags = frags[:max(0, top_k)]
+        return b'{"student_id":' + dumps(student_id) + b',"recommendations":[' + b",".join(frags) + b"]}"
+
+    def _fragments(self, student_id):
+        with self._lock:
+            frags = self._entries.get(student_id)
+            if frags is not None:
+                self._entries.move_to_end(student_id)
+                self.hits += 1
+                return frags
+            self.misses += 1
+        records = self.render(student_id)
+        if records is None:
+            return None
+        frags = tuple(dumps(rec) for rec in records)
+        if self.max_entries:
+            with self._lock:
+                self._entries[student_id] = frags
+                self._entries.move_to_end(student_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return frags
@@ -0,0 +1,75 @@
+# app/rules.py
+"""
+Vectorized rule score and eligibility (the notebook's Cell 4).
+
+Every term of ``compute_rule_score_and_eligibility`` is a per-student or
+per-internship column, so the S x I rule matrix is a few broadcasted
+expressions. Terms are added in the same order as the per-pair function,
+which keeps the result bit-identical to it. The eligibility mask is returned
+bit-packed (``np.packbits`` along the internship axis, 1 bit per pair).
+"""
+import numpy as np
+
+FAIRNESS_BOOST = {"rural": 0.10, "female": 0.08}
+
+
+def pack_mask(mask):
+    return np.packbits(np.asarray(mask, dtype=bool), axis=-1)
+
+
+def unpack_mask(bits, n_internships):
+    return np.unpackbits(bits, axis=-1, count=n_internships).astype(bool)
+
+
+def _column(students, name, default=0):
+    # students is a DataFrame or a dict of equal-length lists
+    values = students.get(name)
+    if values is None:
+        return np.full(len(students['age']), default)
+    return np.asarray(values)
+
+
+class RuleEngine:
+    """Rule scores of any set of students against a fixed internship catalog."""
+
+    def __init__(self, internships_df, fairness_boost=None):
+        self.fairness_boost = FAIRNESS_BOOST if fairness_boost is None else fairness_boost
+        self.min_age = internships_df['min_age'].to_numpy(dtype=np.float64)
+        self.max_age = internships_df['max_age'].to_numpy(dtype=np.float64)
+        stipend = internships_df['stipend'].to_numpy(dtype=np.float64)
+        self.stipend_norm = (stipend - stipend.min()) / (stipend.max() - stipend.min() + 1e-9)
+        self.org_pref_govt = internships_df['org_pref_govt'].to_numpy().astype(bool)
+
+    def __len__(self):
+        return len(self.min_age)
+
+    def score(self, students, rows=slice(None)):
+        """``(rule, elig)`` of shape (students, internships in ``rows``)."""
+        age = _column(students, 'age').astype(np.float64)[:, None]
+        proj_imp = np.clip(_column(students, 'project_impact', 0.0).astype(np.float64), 0.0, 1.0)[:, None]
+        freel = np.where(_column(students, 'freelancer').astype(bool), 0.5, 0.0)[:, None]
+        fresher = np.where(_column(students, 'is_fresher').astype(bool), 0.35, 0.0)[:, None]
+        govt = _column(students, 'govt_project').astype(bool)[:, None]
+        fairness = (0.0 + np.where(_column(students, 'rural') == 1, self.fairness_boost.get('rural', 0.0), 0.0)
+                    + np.where(_column(students, 'female') == 1, self.fairness_boost.get('female', 0.0), 0.0))
+
+        elig = (age >= self.min_age[rows]) & (age <= self.max_age[rows])
+        govt_bonus = govt & self.org_pref_govt[rows]
+        rule = (0.35 * elig + 0.25 * proj_imp + 0.15 * freel + 0.1 * fresher
+                + 0.1 * self.stipend_norm[rows] + 0.05 * govt_bonus)
+        return np.minimum(1.0, rule + fairness[:, None]), elig
+
+    def score_packed(self, students, block=4096):
+        """S x I rule matrix plus the bit-packed eligibility mask, ``block`` students at a time."""
+        n = len(students['age'])
+        rule_mat = np.empty((n, len(self)), dtype=np.float64)
+        elig_bits = np.empty((n, (len(self) + 7) // 8), dtype=np.uint8)
+        for start in range(0, n, block):
+            if hasattr(students, 'iloc'):
+                chunk = students.iloc[start:start + block]
+            else:
+                chunk = {k: v[start:start + block] for k, v in students.items()}
+            rule, elig = self.score(chunk)
+            rule_mat[start:start + block] = rule
+            elig_bits[start:start + block] = pack_mask(elig)
+        return rule_mat, elig_bits
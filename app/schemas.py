@@ -26,3 +26,44 @@ class RecItem(BaseModel):
 class RecsResponse(BaseModel):
     student_id: str
     recommendations: List[RecItem]
+
+class BatchRecsRequest(BaseModel):
+    student_ids: List[str]
+    top_k: int = 10
+
+class StudentProfile(BaseModel):
+    student_id: str = "new"
+    skills: str
+    domain: str
+    age: int
+    govt_project: int = 0
+    freelancer: int = 0
+    project_impact: float = 0.0
+    is_fresher: int = 0
+    github: Optional[str] = ""
+    state: Optional[str] = None
+    rural: int = 0
+    female: int = 0
+
+class RescoreRequest(BaseModel):
+    # known students to rescore as they are, plus edited or new profiles
+    student_ids: List[str] = []
+    profiles: List[StudentProfile] = []
+    top_k: int = 10
+
+class InternshipRecord(BaseModel):
+    internship_id: str
+    title: str
+    required_skills: str
+    domain: str
+    min_age: int = 18
+    max_age: int = 30
+    stipend: float = 0.0
+    remote: int = 0
+    capacity: int = 1
+    org_pref_govt: int = 0
+    ministry: Optional[str] = None
+    state: Optional[str] = None
+    csr_underprivileged_pct: Optional[float] = None
+    description: Optional[str] = None
+    job_text: Optional[str] = None
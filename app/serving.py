@@ -0,0 +1,98 @@
+# app/serving.py
+"""
+Async plumbing for the read endpoints.
+
+``/recommend`` answers cache hits directly on the event loop. Everything
+that can block (store lookups on the SQLite backend, rendering, cold-start
+scoring) goes through ``BoundedExecutor``, whose admission limit turns a
+burst into fast 503s instead of an ever longer queue. ``SingleFlight``
+makes concurrent requests for the same key share one computation.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.metrics import stage
+
+# worker threads for blocking serving work, and how many calls may be running
+# or queued for them before new ones are refused
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+SERVE_MAX_PENDING = int(os.getenv("SERVE_MAX_PENDING", "256"))
+
+
+class Overloaded(Exception):
+    """The executor already holds ``max_pending`` calls."""
+
+
+class BoundedExecutor:
+    """Thread pool with an admission limit on running + queued calls."""
+
+    def __init__(self, max_workers=SERVE_WORKERS, max_pending=SERVE_MAX_PENDING):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="serve")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self._queue_wait = stage("executor_queue")
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise Overloaded(f"{self.pending} serving calls pending")
+            self.pending += 1
+        submitted = time.perf_counter()
+
+        def call():
+            self._queue_wait.observe(time.perf_counter() - submitted)
+            return fn(*args)
+
+        # the slot is released when the call finishes, even if the client went away
+        future = self._pool.submit(call)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def status(self):
+        return {"workers": self.max_workers, "pending": self.pending,
+                "max_pending": self.max_pending, "rejected": self.rejected}
+
+
+class SingleFlight:
+    """Coalesce concurrent calls per key: the first caller runs, the rest await its result.
+
+    Only in-flight calls are shared (results are not kept), and one caller
+    disconnecting does not cancel the computation for the others. Used from
+    a single event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key, make_call):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
+
+    def status(self):
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
@@ -0,0 +1,209 @@
+# app/sqlite_store.py
+"""
+Recommendation store answered from the SQLite ``recommendations`` table.
+
+Drop-in for RecommendationStore when ``RECOMMEND_BACKEND=sqlite``: the rows
+stay on disk (filled by ``/populate_db`` or the crud loaders) and every
+worker queries the same file instead of holding its own copy. A lookup is
+one range scan of the ``(student_id, rank, internship_id, score)`` covering
+index, on a small per-worker pool of read-only connections (WAL mode, so
+readers never block on a load in progress).
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+from app.db import apply_pragmas
+
+LOOKUP_SQL = "SELECT internship_id, score FROM recommendations WHERE student_id = ? ORDER BY rank LIMIT ?"
+
+
+def generation(db_file):
+    """Change counter bumped by crud on every write to the recommendations table."""
+    conn = sqlite3.connect(f"file:{Path(db_file).resolve()}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class ConnectionPool:
+    """Up to ``size`` read-only connections, opened lazily and shared by threads."""
+
+    def __init__(self, db_file, size=4):
+        self.uri = f"file:{Path(db_file).resolve()}?mode=ro"
+        self.size = max(1, int(size))
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        apply_pragmas(conn, read_only=True)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._opened < self.size
+                if grow:
+                    self._opened += 1
+            if grow:
+                try:
+                    conn = self._open()
+                except Exception:
+                    # give the slot back, or a failed connect shrinks the pool for good
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                # pool exhausted: wait for a connection to come back
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLiteRecommendationStore:
+    """Same read interface as RecommendationStore, backed by SQLite.
+
+    ``internship_ids`` is the vocabulary the snapshot renders from: the
+    catalog plus any other id found in the table when the store was opened.
+    Rows for internships added to the table later are skipped until the next
+    reload (the crud writers bump the generation, which triggers one).
+    """
+
+    def __init__(self, pool, internship_ids, overlay=None):
+        self.pool = pool
+        self.internship_ids = np.asarray(internship_ids, dtype=object)
+        self._position = {iid: k for k, iid in enumerate(self.internship_ids.tolist())}
+        self.overlay = overlay or {}
+
+    @classmethod
+    def open(cls, db_file, catalog_ids=(), pool_size=4):
+        pool = ConnectionPool(db_file, pool_size)
+        known = set(map(str, catalog_ids))
+        with pool.connection() as conn:
+            extra = [row[0] for row in conn.execute("SELECT DISTINCT internship_id FROM recommendations")
+                     if row[0] not in known]
+        return cls(pool, list(map(str, catalog_ids)) + sorted(extra))
+
+    def item_fallback(self):
+        """title/domain stored with the recommendations, for ids missing from the catalog."""
+        import pandas as pd
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT internship_id, title, domain FROM recommendations "
+                                "GROUP BY internship_id").fetchall()
+        return pd.DataFrame(rows, columns=['internship_id', 'title', 'domain']).set_index('internship_id')
+
+    def __len__(self):
+        return self._count
+
+    @cached_property
+    def _count(self):
+        # counted once per store, i.e. per generation (a bump reopens the store)
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(DISTINCT student_id) FROM recommendations").fetchone()[0]
+
+    def __contains__(self, student_id):
+        if student_id in self.overlay:
+            return True
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM recommendations WHERE student_id = ? LIMIT 1",
+                                (student_id,)).fetchone() is not None
+
+    @property
+    def student_ids(self):
+        """Generator over the stored students in index order (used to warm the response cache)."""
+        return self._iter_student_ids()
+
+    def _iter_student_ids(self, page=1000):
+        # keyset pages, so no connection stays checked out between pages
+        last = ''
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute("SELECT DISTINCT student_id FROM recommendations WHERE student_id > ? "
+                                    "ORDER BY student_id LIMIT ?", (last, page)).fetchall()
+            for (sid,) in rows:
+                yield sid
+            if len(rows) < page:
+                return
+            last = rows[-1][0]
+
+    @cached_property
+    def depth(self):
+        """Longest stored recommendation list (overlay included)."""
+        with self.pool.connection() as conn:
+            base = conn.execute("SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM recommendations "
+                                "GROUP BY student_id)").fetchone()[0] or 0
+        return max([base] + [len(idx) for idx, _ in self.overlay.values()])
+
+    @property
+    def nbytes(self):
+        return 0
+
+    def lookup(self, student_id: str, top_k: int = None):
+        patch = self.overlay.get(student_id)
+        if patch is not None:
+            n = len(patch[0]) if top_k is None else max(0, min(len(patch[0]), top_k))
+            return patch[0][:n], patch[1][:n]
+        # LIMIT at least 1 so a known student with top_k=0 is not reported unknown
+        with self.pool.connection() as conn:
+            rows = conn.execute(LOOKUP_SQL, (student_id, -1 if top_k is None else max(1, top_k))).fetchall()
+        if not rows:
+            return None
+        if top_k is not None:
+            rows = rows[:max(0, top_k)]
+        pos = [self._position.get(iid, -1) for iid, _ in rows]
+        keep = [k for k, p in enumerate(pos) if p >= 0]
+        return (np.array([pos[k] for k in keep], dtype=np.int32),
+                np.array([rows[k][1] for k in keep], dtype=np.float32))
+
+    def gather(self, student_ids, top_k=None):
+        found, unknown, idx, scores = [], [], [], []
+        for sid in student_ids:
+            hit = self.lookup(sid, top_k)
+            if hit is None:
+                unknown.append(sid)
+            else:
+                found.append(sid)
+                idx.append(hit[0])
+                scores.append(hit[1])
+        bounds = np.zeros(len(found) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in idx], out=bounds[1:])
+        if not idx:
+            return found, unknown, bounds, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return found, unknown, bounds, np.concatenate(idx), np.concatenate(scores)
+
+    def patched(self, updates, new_internship_ids=()):
+        """New store sharing the pool, with ``updates`` served from memory until the next reload."""
+        vocab = self.internship_ids
+        wanted = list(new_internship_ids) + [iid for iids, _ in updates.values() for iid in iids]
+        extra = [iid for iid in dict.fromkeys(wanted) if iid not in self._position]
+        if extra:
+            vocab = np.append(vocab, np.asarray(extra, dtype=object))
+        store = SQLiteRecommendationStore(self.pool, vocab, dict(self.overlay))
+        for sid, (iids, scores) in updates.items():
+            store.overlay[sid] = (np.array([store._position[i] for i in iids], dtype=np.int32),
+                                  np.asarray(scores, dtype=np.float32))
+        if 'depth' in self.__dict__:
+            store.depth = max([self.depth] + [len(iids) for iids, _ in updates.values()])
+        if '_count' in self.__dict__:
+            store._count = self._count
+        return store
@@ -0,0 +1,66 @@
+"""
+Min-cost-flow allocation vs the Cell 12 CBC ILP
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from app.allocation import (allocate_flow, allocate_ilp, allocate_min_cost_flow, candidate_edges,
+                            repair_allocation, reserved_seats, synthetic_cohort)
+
+def test_flow_matches_ilp_with_binding_reservation():
+    """Over all eligible edges the flow reaches the ILP objective, seats and reservation included"""
+    for seed in range(3):
+        scores, capacity, elig, students, internships = synthetic_cohort(80, 20, seed=seed, govt_share=0.3)
+        govt = students['govt_project'].to_numpy() == 1
+        scores[govt] *= 0.2  # govt students would lose most seats without the reservation
+        reserve = reserved_seats(capacity, 0.25)
+
+        ilp = allocate_ilp(scores, capacity, elig, students, internships, 0.25)
+        flow = allocate_flow(scores, capacity, elig, students, internships, 0.25, top_n=None)
+
+        assert np.isclose(flow['score'].sum(), ilp['score'].sum(), atol=1e-4)
+        assert govt[flow['student_idx'].to_numpy(dtype=np.int64)].sum() >= reserve
+        assert flow['student_idx'].is_unique
+        assert (np.bincount(flow['intern_idx'], minlength=len(capacity)) <= capacity).all()
+        assert elig[flow['student_idx'], flow['intern_idx']].all()
+
+def test_repair_only_moves_the_affected_region():
+    """A repaired allocation stays feasible, moves few students, and with a full region matches a re-solve"""
+    scores, capacity, elig, students, internships = synthetic_cohort(400, 100, seed=4)
+    s, i, v = candidate_edges(scores, elig, 15)
+    govt = students['govt_project'].to_numpy() == 1
+    reserve = reserved_seats(capacity, 0.1)
+    a_s, a_i, _ = allocate_min_cost_flow(s, i, v, capacity, govt, reserve)
+    before = np.full(len(students), -1)
+    before[a_s] = a_i
+
+    new_capacity = capacity.copy()
+    new_capacity[3] += 2
+    new_capacity[7] = 0
+    withdrawn = [int(a_s[0])]
+    after = repair_allocation(before, s, i, v, new_capacity, govt, reserve,
+                              withdrawn=withdrawn, changed_internships=[3, 7])
+    assert after[withdrawn[0]] == -1 and (after[before == 7] != 7).all()
+    assert (np.bincount(after[after >= 0], minlength=len(capacity)) <= new_capacity).all()
+    assert govt[after >= 0].sum() >= reserve
+    assert 0 < (after != before).sum() < 40
+
+    keep = s != withdrawn[0]
+    full_s, full_i, _ = allocate_min_cost_flow(s[keep], i[keep], v[keep], new_capacity, govt, reserve)
+    wide = repair_allocation(before, s, i, v, new_capacity, govt, reserve, withdrawn=withdrawn,
+                             changed_internships=[3, 7], depth=len(capacity), slack=1.0)
+    score = dict(zip(zip(s.tolist(), i.tolist()), v.tolist()))
+    total = lambda assigned: sum(score[(k, assigned[k])] for k in np.flatnonzero(assigned >= 0).tolist())
+    full = np.full(len(students), -1)
+    full[full_s] = full_i
+    assert np.isclose(total(wide), total(full), atol=1e-4)
+    assert total(after) <= total(wide) + 1e-4
+
+if __name__ == "__main__":
+    test_flow_matches_ilp_with_binding_reservation()
+    test_repair_only_moves_the_affected_region()
+    print("allocation checks passed")
@@ -0,0 +1,61 @@
+"""
+IVF-flat recall against exact search on a seeded clustered fixture
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from app.ann_index import IVFFlatIndex, exact_search, normalize_rows
+
+def _recall(exact_ids, ids):
+    return np.mean([len(np.intersect1d(a, b[b >= 0])) / len(a) for a, b in zip(exact_ids, ids)])
+
+def test_ivf_recall_vs_exact(tmp_path):
+    """High recall at the default nprobe, never lower with more probes, exact when every list is probed"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(40, 32))
+    vectors = normalize_rows(centers[rng.integers(0, 40, 3000)] + 0.35 * rng.normal(size=(3000, 32)))
+    queries = normalize_rows(centers[rng.integers(0, 40, 200)] + 0.35 * rng.normal(size=(200, 32)))
+    index = IVFFlatIndex.build(vectors, seed=0)
+    exact_ids, exact_scores = exact_search(vectors, queries, k=10)
+
+    recalls = [_recall(exact_ids, index.search(queries, 10, nprobe=p)[0]) for p in (1, 2, 4, index.n_lists)]
+    assert recalls == sorted(recalls) and recalls[0] > 0.8
+    assert _recall(exact_ids, index.search(queries, 10)[0]) >= 0.99
+    ids, scores = index.search(queries, 10, nprobe=index.n_lists)
+    assert (ids == exact_ids).all() and np.allclose(scores, exact_scores, atol=1e-5)
+
+    index.save(tmp_path / "ann.npz")
+    loaded = IVFFlatIndex.load(tmp_path / "ann.npz")
+    assert loaded.nprobe == index.nprobe and (loaded.search(queries, 10)[0] == index.search(queries, 10)[0]).all()
+
+    # fewer vectors in the probed lists than k: padded with -1
+    tiny = IVFFlatIndex.build(vectors[:6], n_lists=3, nprobe=1)
+    ids, scores = tiny.search(queries[:1], k=10)
+    assert (ids[0, 6:] == -1).all() and np.isneginf(scores[0, 6:]).all()
+
+def test_upserted_matches_exact_when_fully_probed():
+    """Appended and re-embedded vectors are searchable; every id stays in exactly one list"""
+    rng = np.random.default_rng(1)
+    vectors = normalize_rows(rng.normal(size=(500, 16)))
+    index = IVFFlatIndex.build(vectors, seed=0)
+    moved = normalize_rows(rng.normal(size=(2, 16)))
+    vectors[[3, 7]] = moved
+    vectors = np.vstack([vectors, normalize_rows(rng.normal(size=(1, 16)))])
+    updated = index.upserted([3, 7, 500], vectors[[3, 7, 500]])
+
+    assert sorted(updated.list_ids.tolist()) == list(range(501)) and len(index) == 500
+    queries = vectors[[3, 7, 500]]
+    ids, _ = updated.search(queries, 10, nprobe=updated.n_lists)
+    assert (ids == exact_search(vectors, queries, k=10)[0]).all()
+    assert ids[:, 0].tolist() == [3, 7, 500]
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_ivf_recall_vs_exact(Path(d))
+    test_upserted_matches_exact_when_fully_probed()
+    print("ann index checks passed")
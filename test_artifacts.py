@@ -0,0 +1,81 @@
+"""
+Artifact snapshot swaps: reload on change, keep serving through a failed build, /admin/reload
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.artifacts import ArtifactManager
+
+def _manager(path):
+    builds = []
+    def build(version):
+        text = path.read_text()
+        if text == "broken":
+            raise ValueError("bad artifacts")
+        builds.append(version)
+        return SimpleNamespace(version=version, text=text)
+    return ArtifactManager(build, [path]), builds
+
+def test_swap_and_failed_load_keep_serving(tmp_path):
+    """Unchanged files do not rebuild; a failed build keeps the old snapshot and records the error"""
+    path = tmp_path / "recommendations.csv"
+    path.write_text("v1")
+    manager, builds = _manager(path)
+    assert manager.load() and manager.current.text == "v1" and manager.loads == 1
+    old = manager.current
+    assert not manager.load() and manager.current is old and len(builds) == 1
+
+    path.write_text("broken")
+    assert not manager.load()
+    assert manager.current is old and manager.load_failures == 1 and "bad artifacts" in manager.last_error
+
+    path.write_text("v2")
+    assert manager.reload_async()
+    manager._thread.join(5)
+    assert manager.current.text == "v2" and manager.version != old.version and manager.last_error is None
+    # a patched snapshot only goes in over the snapshot it was derived from
+    assert not manager.publish(SimpleNamespace(version="p"), replaces=old)
+    assert manager.publish(SimpleNamespace(version="p"), replaces=manager.current) and manager.version == "p"
+
+    # nothing to fall back on: the first load raises
+    path.write_text("broken")
+    with pytest.raises(ValueError):
+        _manager(path)[0].load()
+
+def test_admin_reload_endpoint(tmp_path, monkeypatch):
+    """wait=true reloads inline; without it the reload runs in the background; ADMIN_TOKEN guards both"""
+    from app import main, recommender_service
+    path = tmp_path / "recommendations.csv"
+    path.write_text("v1")
+    manager, _ = _manager(path)
+    manager.load()
+    monkeypatch.setattr(recommender_service, "manager", manager)
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+
+    assert client.post("/admin/reload?wait=true").status_code == 403
+    auth = {"X-Admin-Token": "secret"}
+    assert client.post("/admin/reload?wait=true", headers=auth).json()["status"] == "unchanged"
+    path.write_text("v2")
+    reloaded = client.post("/admin/reload?wait=true", headers=auth).json()
+    assert reloaded["status"] == "reloaded" and reloaded["artifact_version"] == manager.version
+
+    path.write_text("v3")
+    assert client.post("/admin/reload", headers=auth).json()["status"] in ("reloading", "already_reloading")
+    deadline = time.time() + 5
+    while manager.current.text != "v3" and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.current.text == "v3"
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_swap_and_failed_load_keep_serving(Path(d))
+    print("artifact checks passed")
@@ -0,0 +1,47 @@
+"""
+/recommend/batch: one streamed document for many students
+"""
+
+import sys
+import json
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.recommender_service import Snapshot
+
+def test_batch_dedups_lists_unknown_and_bounds(monkeypatch):
+    """Repeated ids answered once, unknown ids listed, results equal /recommend; size and top_k bounded"""
+    from app import main, recommender_service
+    rng = np.random.default_rng(4)
+    internships = pd.DataFrame({'internship_id': [f"I{k}" for k in range(6)], 'title': 't', 'domain': 'd'})
+    recs = pd.DataFrame({'student_id': np.repeat([f"S{k}" for k in range(4)], 5),
+                         'internship_id': [f"I{k}" for _ in range(4) for k in rng.choice(6, 5, replace=False)],
+                         'title': 't', 'domain': 'd', 'score': rng.random(20), 'rank': np.tile(range(1, 6), 4)})
+    snapshot = Snapshot.from_frames("v", recs, pd.DataFrame({'student_id': [f"S{k}" for k in range(4)]}), internships)
+    monkeypatch.setattr(recommender_service, "manager", SimpleNamespace(current=snapshot))
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 5)
+    monkeypatch.setattr(main, "MAX_BATCH_TOP_K", 4)
+    client = TestClient(main.app)
+
+    got = client.post("/recommend/batch", json={"student_ids": ["S2", "S0", "S2", "S9", "S0"], "top_k": 3})
+    assert got.status_code == 200 and got.headers["x-artifact-version"] == "v"
+    body = got.json()
+    assert body["top_k"] == 3 and body["count"] == 2 and body["unknown_ids"] == ["S9"]
+    assert [r["student_id"] for r in body["results"]] == ["S2", "S0"]
+    for result in body["results"]:
+        assert result == json.loads(snapshot.response_cache.body(result["student_id"], 3))
+
+    assert client.post("/recommend/batch", json={"student_ids": ["S0"] * 6, "top_k": 2}).status_code == 413
+    assert client.post("/recommend/batch", json={"student_ids": ["S0"], "top_k": 5}).status_code == 422
+    assert client.post("/recommend/batch", json={"top_k": 3}).status_code == 422
+    empty = client.post("/recommend/batch", json={"student_ids": [], "top_k": 2}).json()
+    assert empty["count"] == 0 and empty["results"] == [] and empty["unknown_ids"] == []
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))  # needs pytest's monkeypatch fixture
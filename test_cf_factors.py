@@ -0,0 +1,67 @@
+"""
+CF matrix from exported SVD factors vs Surprise's per-pair predict rule
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from app.cf import SVDFactors
+
+def surprise_est(svd, uid, iid):
+    # SVD.estimate + clipping from AlgoBase.predict, written out per pair
+    ts = svd.trainset
+    u = ts._raw2inner_id_users.get(uid)
+    i = ts._raw2inner_id_items.get(iid)
+    est = ts.global_mean
+    if u is not None:
+        est += svd.bu[u]
+    if i is not None:
+        est += svd.bi[i]
+    if u is not None and i is not None:
+        est += np.dot(svd.qi[i], svd.pu[u])
+    return min(ts.rating_scale[1], max(ts.rating_scale[0], est))
+
+def _fake_svd(rng, users, items, factors=6):
+    ts = SimpleNamespace(
+        global_mean=3.2, rating_scale=(1, 5), n_users=len(users), n_items=len(items),
+        _raw2inner_id_users={u: k for k, u in enumerate(users)},
+        _raw2inner_id_items={i: k for k, i in enumerate(items)},
+    )
+    ts.to_raw_uid = lambda k: users[k]
+    ts.to_raw_iid = lambda k: items[k]
+    return SimpleNamespace(
+        trainset=ts, biased=True,
+        pu=rng.normal(0, 0.8, (len(users), factors)), qi=rng.normal(0, 0.8, (len(items), factors)),
+        bu=rng.normal(0, 0.5, len(users)), bi=rng.normal(0, 0.5, len(items)),
+    )
+
+def test_matrix_matches_predict(tmp_path):
+    """Blocked matrix (after a save/load round trip) equals predict().est, unknown ids included"""
+    rng = np.random.default_rng(11)
+    svd = _fake_svd(rng, [f"S{k}" for k in range(25)], [f"I{k}" for k in range(9)])
+    path = tmp_path / "svd_factors.npz"
+    SVDFactors.from_surprise(svd).save(path)
+    factors = SVDFactors.load(path)
+
+    students = [f"S{k}" for k in range(27)] + ["__cold_start__"]
+    internships = [f"I{k}" for k in range(10)]
+    cf = factors.matrix(students, internships, block=4)
+    for s, sid in enumerate(students):
+        for i, iid in enumerate(internships):
+            assert np.isclose(cf[s, i], surprise_est(svd, sid, iid), rtol=0, atol=1e-12)
+
+    u = factors.user_rows(students)
+    i = factors.item_rows(internships)
+    s_idx, i_idx = np.nonzero(rng.random(cf.shape) < 0.4)
+    assert np.allclose(factors.pair_scores(u[s_idx], i[i_idx]), cf[s_idx, i_idx], rtol=0, atol=1e-12)
+    assert np.allclose(factors.scores_for("S3", internships), cf[3], rtol=0, atol=1e-12)
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_matrix_matches_predict(Path(d))
+    print("CF factor checks passed")
@@ -0,0 +1,129 @@
+"""
+Cold-start scoring and serving: eligibility, top-K vs brute force, embedder pool and cached depth
+"""
+
+import sys
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from app.cold_start import FEATURE_COLS, STD_COLS, ColdStartScorer, EmbedderPool, profile_text
+from app.recommender_service import COLD_START_TOP_K, Snapshot
+
+class _Embedder:
+    # deterministic text -> unit vector, in place of the SBERT pool
+    def encode(self, texts):
+        out = []
+        for text in texts:
+            v = np.random.default_rng(sum(map(ord, text))).normal(size=8)
+            out.append(v / np.linalg.norm(v))
+        return np.asarray(out, dtype=np.float32)
+
+class _Scorer:
+    # fixed catalog-wide scores in place of the cold-start model
+    def __init__(self, scores):
+        self.scores = np.asarray(scores, dtype=np.float32)
+
+    def score(self, profile, top_k=10, student_emb=None, allowed=None):
+        order = np.argsort(-self.scores, kind='stable')[:top_k]
+        return order, self.scores[order]
+
+def _setup(rng, S=12, I=30):
+    pool = ['python', 'sql', 'java', 'react', 'aws']
+    internships = pd.DataFrame({
+        'internship_id': [f'I{k}' for k in range(I)], 'title': 'Intern',
+        'required_skills': [', '.join(rng.choice(pool, 2, replace=False)) for _ in range(I)],
+        'domain': rng.choice(['A', 'B'], I), 'min_age': 18, 'max_age': rng.choice([24, 30], I),
+        'stipend': np.linspace(5000, 9000, I), 'remote': rng.integers(0, 2, I), 'org_pref_govt': rng.integers(0, 2, I),
+    })
+    internships['job_text'] = internships['required_skills'] + ' ' + internships['domain']
+    profiles = [{
+        'student_id': f'S{k}', 'skills': ', '.join(rng.choice(pool, 2, replace=False)), 'domain': rng.choice(['A', 'B']),
+        'age': int(rng.integers(19, 29)), 'project_impact': float(rng.random()), 'github': '', 'rural': int(rng.integers(0, 2)),
+        'female': 0, 'govt_project': 0, 'freelancer': 0, 'is_fresher': 1,
+    } for k in range(S)]
+    embedder = _Embedder()
+    weights = rng.random(12)
+    scorer = ColdStartScorer(
+        internships, embedder.encode(internships['job_text'].tolist()),
+        TfidfVectorizer().fit(internships['job_text']),
+        *(MinMaxScaler().fit(rng.normal(size=(40, I))) for _ in range(3)),
+        cf_cold=rng.random(I), meta=SimpleNamespace(predict=lambda X: X.to_numpy() @ weights),
+        meta_scaler=StandardScaler().fit(pd.DataFrame(rng.random((20, 4)), columns=STD_COLS)),
+        config={'meta_pred_min': 0.0, 'meta_pred_max': 3.0}, embedder=embedder,
+    )
+    return scorer, profiles
+
+def _brute_scores(scorer, X):
+    X = pd.DataFrame(X, columns=FEATURE_COLS)
+    X[STD_COLS] = scorer.meta_scaler.transform(X[STD_COLS])
+    return (scorer.meta.predict(X) - scorer.pred_min) / (scorer.pred_max - scorer.pred_min + 1e-9)
+
+def test_topk_is_eligible_and_matches_brute_force():
+    """Only age-eligible internships are returned, ranked exactly as scoring every row and sorting"""
+    scorer, profiles = _setup(np.random.default_rng(8))
+    max_age = scorer.internships_df['max_age'].to_numpy()
+    assert any(p['age'] > max_age.min() for p in profiles)  # some pairs are ineligible
+    for profile in profiles:
+        emb = scorer.embedder.encode([profile_text(profile)])[0]
+        X, elig = scorer.features(profile, emb)
+        assert (elig == (profile['age'] <= max_age)).all()
+        scores = _brute_scores(scorer, X)
+        brute = [i for i in np.argsort(-scores, kind='stable') if elig[i]]
+
+        pos, got = scorer.score(profile, top_k=5)
+        assert pos.tolist() == brute[:5] and np.allclose(got, scores[pos])
+        everything, _ = scorer.score(profile, top_k=100)
+        assert sorted(everything.tolist()) == sorted(brute) and elig[everything].all()
+
+        allowed = np.arange(len(elig)) % 2 == 0
+        pos, _ = scorer.score(profile, top_k=5, allowed=allowed)
+        assert pos.tolist() == [i for i in brute if allowed[i]][:5]
+
+def test_pool_fails_fast():
+    """A load that fails while a request waits is reported at once; a plain timeout is a RuntimeError too"""
+    pool = EmbedderPool("unused")
+    pool._started = True  # no background load
+    threading.Timer(0.1, setattr, (pool, "error", "OSError('no model')")).start()
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="no model"):
+        pool.encode(["text"], timeout=30)
+    assert time.perf_counter() - started < 5
+
+    idle = EmbedderPool("unused")
+    idle._started = True
+    with pytest.raises(RuntimeError, match="no SBERT model free"):
+        idle.encode(["text"], timeout=0.3)
+
+def test_cold_start_cached_as_deep_as_stored_lists():
+    """A cached cold-start student answers any top_k a stored student does"""
+    depth = COLD_START_TOP_K + 5
+    internships = pd.DataFrame({'internship_id': [f"I{k}" for k in range(depth + 3)], 'title': 't', 'domain': 'd'})
+    recs = pd.DataFrame({'student_id': 'S1', 'internship_id': internships['internship_id'][:depth],
+                         'title': 't', 'domain': 'd', 'score': np.linspace(1, 0, depth), 'rank': range(1, depth + 1)})
+    snapshot = Snapshot.from_frames("v", recs, pd.DataFrame({'student_id': ['S1', 'S2'], 'domain': 'd'}), internships)
+    snapshot.scorer = _Scorer(np.random.default_rng(0).random(len(internships)))
+    snapshot.catalog_to_vocab = pd.Index(snapshot.store.internship_ids).get_indexer(internships['internship_id'])
+
+    assert snapshot.cache_depth == depth
+    for sid in ('S1', 'S2', 'S2'):
+        assert len(json.loads(snapshot.response_cache.body(sid, depth))['recommendations']) == depth
+    assert snapshot.response_cache.hits == 2  # S1 warmed at load, S2 cached by its first call
+
+    deeper = snapshot.patched({'S1': (internships['internship_id'].tolist(), np.linspace(1, 0, len(internships)))})
+    assert deeper.cache_depth == len(internships)
+
+if __name__ == "__main__":
+    test_topk_is_eligible_and_matches_brute_force()
+    test_pool_fails_fast()
+    test_cold_start_cached_as_deep_as_stored_lists()
+    print("cold-start checks passed")
@@ -0,0 +1,73 @@
+"""
+Columnar bundle vs the CSVs it was converted from, and version flips
+"""
+
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from app.columnar import BUNDLE_DIRNAME, KEEP_VERSIONS, Bundle, convert_csvs, current_version
+from app.recommender_service import Snapshot
+
+def _write_csvs(out_dir, seed):
+    rng = np.random.default_rng(seed)
+    internships = pd.DataFrame({'internship_id': [f"I{k}" for k in range(8)], 'title': [f"T{k}" for k in range(8)],
+                                'domain': rng.choice(['Data', 'Web'], 8), 'stipend': rng.choice([5000.0, np.nan], 8),
+                                'location': ['Pune', None] * 4})
+    rows = []
+    for s in range(12):
+        # I99 is only known from the recommendations
+        for rank, iid in enumerate(rng.choice([f"I{k}" for k in range(8)] + ['I99'], 4, replace=False), start=1):
+            rows.append({'student_id': f"S{s:02d}", 'internship_id': iid, 'title': 'rec title', 'domain': 'rec domain',
+                         'score': round(1 - rank / 10, 3), 'rank': rank})
+    students = pd.DataFrame({'student_id': [f"S{s:02d}" for s in range(14)], 'skills': 'python, sql', 'age': 21})
+    internships.to_csv(out_dir / "internships_synthetic.csv", index=False)
+    pd.DataFrame(rows).to_csv(out_dir / "recommendations.csv", index=False)
+    students.to_csv(out_dir / "students_synthetic.csv", index=False)
+
+def test_bundle_serves_same_bodies_as_csvs(tmp_path):
+    """Every /recommend and batch body is byte-identical whichever input the snapshot was built from"""
+    _write_csvs(tmp_path, 0)
+    version = convert_csvs(tmp_path)
+    assert current_version(tmp_path) == version
+    read = lambda name: pd.read_csv(tmp_path / name)
+    from_csv = Snapshot.from_frames("v", read("recommendations.csv"), read("students_synthetic.csv"),
+                                    read("internships_synthetic.csv"))
+    from_bundle = Snapshot.from_bundle(Bundle.open_current(tmp_path))
+
+    assert from_bundle.student_ids() == from_csv.student_ids()
+    for sid in from_csv.student_ids() + ["S99"]:
+        assert from_bundle.response_cache.body(sid, 10) == from_csv.response_cache.body(sid, 10)
+    ids = ["S03", "S99", "S00", "S11"]
+    assert b"".join(from_bundle.recommend_batch_json(ids, 3)) == b"".join(from_csv.recommend_batch_json(ids, 3))
+    assert json.loads(from_bundle.response_cache.body("S00"))['recommendations']
+
+def test_new_version_flips_current_and_prunes(tmp_path):
+    """A conversion writes a new directory and flips CURRENT; old versions beyond KEEP_VERSIONS go"""
+    _write_csvs(tmp_path, 1)
+    first = convert_csvs(tmp_path)
+    opened = Bundle.open_current(tmp_path)
+    assert convert_csvs(tmp_path) == first  # same input, same version
+
+    _write_csvs(tmp_path, 2)
+    second = convert_csvs(tmp_path)
+    assert second != first and current_version(tmp_path) == second
+    # a snapshot still mapping the previous version keeps reading it
+    assert opened.version == first and len(opened.store()) == 12
+
+    _write_csvs(tmp_path, 3)
+    third = convert_csvs(tmp_path)
+    kept = [p.name for p in (tmp_path / BUNDLE_DIRNAME).iterdir() if p.is_dir() and not p.name.startswith('.')]
+    assert len(kept) == KEEP_VERSIONS and third in kept and current_version(tmp_path) == third
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_bundle_serves_same_bodies_as_csvs(Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_new_version_flips_current_and_prunes(Path(d))
+    print("columnar bundle checks passed")
@@ -0,0 +1,82 @@
+"""
+Chunked CSV loaders in app.crud against a throwaway SQLite database
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+
+def test_chunked_loaders_match_csv(tmp_path):
+    """Every row arrives once with NULLs for NaN, across chunk boundaries and repeated loads"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    crud.create_tables(engine)
+    db = sessionmaker(bind=engine)()
+
+    students = pd.DataFrame({'student_id': [f"S{k}" for k in range(7)], 'domain': ['A', None, 'B', 'A', 'C', 'B', 'A'],
+                             'state': 'Kerala', 'rural': [0, 1, None, 1, 0, 0, 1], 'female': 1,
+                             'github': ['g', '', None, 'g', 'g', None, 'g'], 'age': 21})
+    students.to_csv(tmp_path / "students.csv", index=False)
+    for _ in range(2):  # a second load replaces, not appends
+        stats = crud.load_students_from_csv(db, str(tmp_path / "students.csv"), chunksize=3)
+    assert stats['rows'] == 7 and db.query(models.Student).count() == 7
+    s2 = db.query(models.Student).filter_by(student_id='S2').one()
+    assert s2.rural is None and s2.github is None and s2.female == 1
+    assert db.query(models.Student).filter_by(student_id='S1').one().domain is None
+
+    recs = pd.DataFrame({'student_id': np.repeat(['S0', 'S1'], 5), 'internship_id': [f"I{k}" for k in range(10)],
+                         'title': 't', 'domain': 'd', 'score': np.linspace(1, 0.1, 10)})
+    crud.save_recommendations_from_df(db, recs, chunksize=4)
+    stored = db.query(models.Recommendation).order_by(models.Recommendation.id).all()
+    assert [r.internship_id for r in stored] == recs['internship_id'].tolist()
+    assert all(r.rank == 0 for r in stored)  # no rank column -> old default
+    assert np.allclose([r.score for r in stored], recs['score'])
+
+    recs['rank'] = np.tile(np.arange(1, 6), 2)
+    recs.to_csv(tmp_path / "recs.csv", index=False)
+    crud.load_recommendations_from_csv(db, str(tmp_path / "recs.csv"), chunksize=3)
+    top = crud.get_recommendations(db, 'S1', top_k=2)
+    assert [r.internship_id for r in top] == ['I5', 'I6']
+    db.close()
+
+def test_upsert_keeps_k_rows_per_student(tmp_path):
+    """Repeated stores replace a student's set in place; old duplicates are dropped on migration"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'upsert.db'}")
+    with engine.begin() as conn:  # table from before the unique key, with an appended duplicate
+        conn.execute(text("CREATE TABLE recommendations (id INTEGER PRIMARY KEY, student_id VARCHAR, "
+                          "internship_id VARCHAR, title VARCHAR, domain VARCHAR, score FLOAT, rank INTEGER)"))
+        conn.execute(text("INSERT INTO recommendations (student_id, internship_id, score, rank) VALUES "
+                          "('S0', 'I1', 0.1, 1), ('S0', 'I1', 0.9, 1)"))
+    crud.create_tables(engine)
+    db = sessionmaker(bind=engine)()
+    assert [r.score for r in db.query(models.Recommendation).all()] == [0.9]
+
+    recs = pd.DataFrame({'student_id': np.repeat(['S0', 'S1', 'S2'], 4), 'internship_id': [f"I{k}" for k in range(12)],
+                         'title': 't', 'domain': 'd', 'score': np.linspace(1, 0.1, 12), 'rank': np.tile(np.arange(1, 5), 3)})
+    for _ in range(3):
+        crud.upsert_recommendations(db, recs)
+    assert db.query(models.Recommendation).count() == 12
+
+    # S1's new set overlaps the old one: shared rows update, the rest go; S0 and S2 are untouched
+    new = pd.DataFrame({'student_id': 'S1', 'internship_id': ['I6', 'I20'], 'title': 't', 'domain': 'd',
+                        'score': [0.5, 0.4], 'rank': [1, 2]})
+    stats = crud.upsert_recommendations(db, new, student_ids=['S1'])
+    assert stats['rows'] == 2 and db.query(models.Recommendation).count() == 10
+    assert [(r.internship_id, r.score) for r in crud.get_recommendations(db, 'S1')] == [('I6', 0.5), ('I20', 0.4)]
+    crud.replace_recommendations(db, ['S2'], new.iloc[0:0])
+    assert not crud.get_recommendations(db, 'S2') and len(crud.get_recommendations(db, 'S0')) == 4
+    db.close()
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_chunked_loaders_match_csv(Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_upsert_keeps_k_rows_per_student(Path(d))
+    print("bulk loader checks passed")
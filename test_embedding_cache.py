@@ -0,0 +1,52 @@
+"""
+Checks for the on-disk embedding cache (no model needed)
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from app.embedding_cache import EmbeddingCache
+
+def fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), t.count('a'), 1.0] for t in texts])
+    return encode
+
+def test_only_new_texts_are_encoded(tmp_path):
+    """A second run re-encodes nothing it has seen, even from a fresh process"""
+    calls = []
+    first = EmbeddingCache(tmp_path, 'all-mpnet-base-v2')
+    embs = first.get_or_encode(['aa', 'b', 'aa'], fake_encode(calls))
+    assert calls == [['aa', 'b']] and embs.shape == (3, 3) and embs.dtype == np.float32
+
+    second = EmbeddingCache(tmp_path, 'all-mpnet-base-v2')
+    again = second.get_or_encode(['b', 'ccc', 'aa'], fake_encode(calls))
+    assert calls[-1] == ['ccc']
+    assert second.stats() == {'entries': 3, 'hits': 2, 'misses': 1}
+    assert np.array_equal(again[[0, 2]], embs[[1, 0]])
+
+    # another model name never shares rows
+    other = EmbeddingCache(tmp_path, 'other-model', read_only=True)
+    other.get_or_encode(['aa'], fake_encode(calls))
+    assert calls[-1] == ['aa'] and len(other) == 0
+
+def test_torn_append_is_dropped(tmp_path):
+    """Trailing bytes of an interrupted append are ignored and then truncated"""
+    cache = EmbeddingCache(tmp_path, 'm')
+    cache.get_or_encode(['x', 'yy'], fake_encode([]))
+    with open(cache.dir / 'vectors.f32', 'ab') as f:
+        f.write(b'\0' * 7)
+    assert len(EmbeddingCache(tmp_path, 'm', read_only=True)) == 2
+    EmbeddingCache(tmp_path, 'm')
+    assert (cache.dir / 'vectors.f32').stat().st_size == 2 * 3 * 4
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_only_new_texts_are_encoded, test_torn_append_is_dropped):
+        with tempfile.TemporaryDirectory() as d:
+            test(Path(d))
+    print("embedding cache checks passed")
@@ -0,0 +1,71 @@
+"""
+ETag revalidation and cached compression of response bodies
+"""
+
+import sys
+import gzip
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app import http_cache
+from app.http_cache import VARY_NEGOTIATED, cached_response, etag, negotiate, not_modified
+
+def test_conditional_get_and_compression():
+    """Same version -> 304 without rendering; big bodies are gzipped once per tag"""
+    renders = []
+    state = {"version": "v1"}
+    app = FastAPI()
+
+    @app.get("/item/{key}")
+    def item(key: str, request: Request):
+        tag = etag(state["version"], "item", key)
+        cached = not_modified(request, tag, private=True, exists=lambda: key != "gone")
+        if cached is not None:
+            return cached
+        renders.append(key)
+        return cached_response(request, b'{"key":"%s","pad":"%s"}' % (key.encode(), b"x" * 4000), tag, private=True)
+
+    @app.get("/list")
+    def listing(request: Request):
+        # JSON or NDJSON by Accept: caches must key on both headers
+        tag = etag(state["version"], "list")
+        return (not_modified(request, tag, vary=VARY_NEGOTIATED)
+                or cached_response(request, b"[]", tag, vary=VARY_NEGOTIATED))
+
+    client = TestClient(app)
+    first = client.get("/item/a", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip" and first.json()["key"] == "a"
+    assert int(first.headers["content-length"]) < 200 and first.headers["etag"].endswith('-gzip"')
+    assert first.headers["cache-control"].startswith("private") and first.headers["vary"] == "Accept-Encoding"
+
+    again = client.get("/item/a", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.headers["etag"] == first.headers["etag"] and renders == ["a"]
+
+    plain = client.get("/item/a", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and len(plain.content) > 4000
+    assert plain.headers["etag"] == etag("v1", "item", "a")
+    client.get("/item/a", headers={"Accept-Encoding": "gzip"})
+    assert http_cache.compressed_bodies.hits >= 1
+
+    # "*" matches only a resource that exists
+    assert client.get("/item/a", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/item/gone", headers={"If-None-Match": "*"}).status_code == 200
+
+    listed = client.get("/list")
+    assert listed.headers["vary"] == "Accept, Accept-Encoding"
+    held = client.get("/list", headers={"If-None-Match": listed.headers["etag"]})
+    assert held.status_code == 304 and held.headers["vary"] == "Accept, Accept-Encoding"
+
+    state["version"] = "v2"  # new artifacts: the old tag no longer matches
+    fresh = client.get("/item/a", headers={"If-None-Match": first.headers["etag"]})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != first.headers["etag"]
+
+    assert negotiate("gzip;q=0, deflate") is None and negotiate("br;q=1.0, gzip;q=0.5") in ("br", "gzip")
+    assert gzip.decompress(http_cache.compress(b"abc", "gzip")) == b"abc"
+
+if __name__ == "__main__":
+    test_conditional_get_and_compression()
+    print("http cache checks passed")
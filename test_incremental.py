@@ -0,0 +1,215 @@
+"""
+Incremental rescoring vs scoring everyone again with the updated catalog
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from app.cold_start import ColdStartScorer
+from app.incremental import main, patch_internships_csv, recs_frame, rescore_internship, rescore_students
+from app.pair_features import STD_COLS
+from app.rec_store import RecommendationStore
+from app.recommender_service import Snapshot
+
+class _Embedder:
+    # deterministic text -> unit vector, in place of the SBERT pool
+    def encode(self, texts):
+        out = []
+        for text in texts:
+            v = np.random.default_rng(sum(map(ord, text))).normal(size=8)
+            out.append(v / np.linalg.norm(v))
+        return np.asarray(out, dtype=np.float32)
+
+class _Meta:
+    # linear stand-in for the meta model; picklable, unlike a lambda
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, X):
+        return X.to_numpy() @ self.weights
+
+def _setup(rng, S=30, I=12):
+    pool = ['python', 'sql', 'java', 'react', 'aws']
+    internships = pd.DataFrame({
+        'internship_id': [f'I{k}' for k in range(I)], 'title': 'Intern',
+        'required_skills': [', '.join(rng.choice(pool, 2, replace=False)) for _ in range(I)],
+        'domain': rng.choice(['A', 'B'], I), 'min_age': 18, 'max_age': rng.choice([24, 30], I),
+        'stipend': np.linspace(5000, 9000, I), 'remote': rng.integers(0, 2, I), 'org_pref_govt': rng.integers(0, 2, I),
+    })
+    internships['job_text'] = internships['required_skills'] + ' ' + internships['domain']
+    profiles = [{
+        'student_id': f'S{k}', 'skills': ', '.join(rng.choice(pool, 2, replace=False)), 'domain': rng.choice(['A', 'B']),
+        'age': int(rng.integers(19, 29)), 'project_impact': float(rng.random()), 'github': '', 'rural': int(rng.integers(0, 2)),
+        'female': 0, 'govt_project': 0, 'freelancer': 0, 'is_fresher': 1,
+    } for k in range(S)]
+    embedder = _Embedder()
+    weights = rng.random(12)
+    scorer = ColdStartScorer(
+        internships, embedder.encode(internships['job_text'].tolist()),
+        TfidfVectorizer().fit(internships['job_text']),
+        *(MinMaxScaler().fit(rng.normal(size=(40, I))) for _ in range(3)),
+        cf_cold=rng.random(I), meta=_Meta(weights),
+        meta_scaler=StandardScaler().fit(pd.DataFrame(rng.random((20, 4)), columns=STD_COLS)),
+        config={'meta_pred_min': 0.0, 'meta_pred_max': 3.0}, embedder=embedder,
+    )
+    return scorer, profiles
+
+def _snapshot(scorer, profiles, top_k):
+    rows = []
+    for p in profiles:
+        pos, scores = scorer.score(p, top_k)
+        for rank, (i, s) in enumerate(zip(pos, scores), start=1):
+            rows.append({'student_id': p['student_id'], 'internship_id': scorer.internships_df['internship_id'][i],
+                         'score': s, 'rank': rank})
+    by_id = {p['student_id']: p for p in profiles}
+    return SimpleNamespace(
+        scorer=scorer, scorer_error=None, profile_overrides={},
+        store=RecommendationStore.from_frame(pd.DataFrame(rows), scorer.internships_df['internship_id'].tolist()),
+        student_ids=lambda: list(by_id), student_profile=by_id.get,
+    )
+
+def _full(scorer, profiles, top_k):
+    ids = scorer.internships_df['internship_id'].to_numpy()
+    return {p['student_id']: ids[scorer.score(p, top_k)[0]].tolist() for p in profiles}
+
+def test_internship_patch_matches_full_rescore():
+    """Adding or editing one internship gives the lists a full rescore would"""
+    top_k = 4
+    scorer, profiles = _setup(np.random.default_rng(3))
+    snapshot = _snapshot(scorer, profiles, top_k)
+
+    added = {'internship_id': 'I99', 'title': 'New', 'required_skills': 'python, sql', 'domain': 'A',
+             'min_age': 18, 'max_age': 30, 'stipend': 7000, 'remote': 1, 'org_pref_govt': 0}
+    edited = {**scorer.internships_df.iloc[2].to_dict(), 'max_age': 20, 'job_text': None}
+    for record in (added, edited):
+        new_scorer, updates = rescore_internship(snapshot, record, top_k)
+        expected = _full(new_scorer, profiles, top_k)
+        store = snapshot.store.patched(updates, [record['internship_id']])
+        for sid, want in expected.items():
+            assert store.internship_ids[store.lookup(sid)[0]].tolist() == want, sid
+
+    updates = rescore_students(snapshot, profiles[:3], top_k)
+    assert {sid: ids for sid, (ids, _) in updates.items()} == {
+        sid: ids for sid, ids in _full(scorer, profiles[:3], top_k).items()}
+
+def test_added_internship_rows_and_csv(tmp_path):
+    """Rows for a new internship come from the patched snapshot, and the record is persisted"""
+    top_k = 3
+    scorer, profiles = _setup(np.random.default_rng(4))
+    base = _snapshot(scorer, profiles, top_k)
+    recs = pd.DataFrame([{'student_id': sid, 'internship_id': base.store.internship_ids[i], 'title': 'Intern',
+                          'domain': 'A', 'score': float(sc), 'rank': r + 1}
+                         for sid in base.student_ids()
+                         for r, (i, sc) in enumerate(zip(*base.store.lookup(sid)))])
+    snapshot = Snapshot.from_frames("v", recs, pd.DataFrame(profiles), scorer.internships_df)
+    snapshot.scorer = scorer
+    snapshot.catalog_to_vocab = pd.Index(snapshot.store.internship_ids).get_indexer(scorer.internships_df['internship_id'])
+
+    added = {'internship_id': 'I99', 'title': 'New', 'required_skills': 'python, sql', 'domain': 'A',
+             'min_age': 18, 'max_age': 30, 'stipend': 9500, 'remote': 1, 'org_pref_govt': 0}
+    new_scorer, updates = rescore_internship(snapshot, added, top_k)
+    patched = snapshot.patched(updates, scorer=new_scorer, changed_internships=['I99'])
+    rows = recs_frame(patched, updates)
+    new_rows = rows[rows['internship_id'] == 'I99']
+    assert len(new_rows) and (new_rows['title'] == 'New').all() and (new_rows['intern_idx'] == len(scorer.internships_df)).all()
+
+    csv = tmp_path / "internships.csv"
+    scorer.internships_df.to_csv(csv, index=False)
+    catalog = new_scorer.internships_df
+    patch_internships_csv(csv, catalog[catalog['internship_id'] == 'I99'])
+    patch_internships_csv(csv, catalog[catalog['internship_id'] == 'I99'])  # idempotent
+    saved = pd.read_csv(csv)
+    assert len(saved) == len(scorer.internships_df) + 1 and saved['internship_id'].iloc[-1] == 'I99'
+    assert list(saved.columns) == list(scorer.internships_df.columns)
+
+def test_student_without_list_keeps_cold_start():
+    """A student with no stored list is not given a one-item list by an added internship"""
+    top_k = 3
+    scorer, profiles = _setup(np.random.default_rng(5))
+    stored = _snapshot(scorer, profiles[1:], top_k).store
+    newcomer = profiles[0]
+    snapshot = SimpleNamespace(scorer=scorer, scorer_error=None, profile_overrides={}, store=stored,
+                               student_ids=lambda: [p['student_id'] for p in profiles],
+                               student_profile={p['student_id']: p for p in profiles}.get)
+    assert stored.lookup(newcomer['student_id']) is None
+
+    added = {'internship_id': 'I99', 'title': 'New', 'required_skills': newcomer['skills'], 'domain': newcomer['domain'],
+             'min_age': 18, 'max_age': 30, 'stipend': 9500, 'remote': 1, 'org_pref_govt': 0}
+    new_scorer, updates = rescore_internship(snapshot, added, top_k)
+    assert newcomer['student_id'] not in updates
+    assert len(new_scorer.score(newcomer, top_k)[0]) == top_k  # still answered in full online
+    assert all(len(ids) == top_k for ids, _ in updates.values())
+
+def test_cli_internship_keeps_artifacts_loadable(tmp_path, monkeypatch):
+    """The CLI writes artifacts matching the new catalog, so a reload still has a scorer"""
+    import json
+    import joblib
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import cold_start, db, recommender_service
+
+    top_k = 3
+    scorer, profiles = _setup(np.random.default_rng(6))
+    base = _snapshot(scorer, profiles, top_k)
+    recs = pd.DataFrame([{'student_id': sid, 'internship_id': base.store.internship_ids[i], 'title': 'Intern',
+                          'domain': 'A', 'score': float(sc), 'rank': r + 1}
+                         for sid in base.student_ids()
+                         for r, (i, sc) in enumerate(zip(*base.store.lookup(sid)))])
+    recs.to_csv(tmp_path / "recommendations.csv", index=False)
+    pd.DataFrame(profiles).to_csv(tmp_path / "students_synthetic.csv", index=False)
+    scorer.internships_df.to_csv(tmp_path / "internships_synthetic.csv", index=False)
+    np.save(tmp_path / "internship_embs.npy", scorer.internship_embs)
+    np.save(tmp_path / "cf_cold_start.npy", scorer.cf_cold)
+    for name, obj in (('tfidf_vectorizer', scorer.tfidf), ('cbf_scaler', scorer.cbf_scaler),
+                      ('cf_scaler', scorer.cf_scaler), ('rule_scaler', scorer.rule_scaler),
+                      ('meta_model_xgb', scorer.meta), ('meta_scaler', scorer.meta_scaler)):
+        joblib.dump(obj, tmp_path / f"{name}.pkl")
+    (tmp_path / "scoring_config.json").write_text(json.dumps(scorer.config))
+
+    embedder = SimpleNamespace(encode=_Embedder().encode, warm=lambda: None)
+    monkeypatch.setattr(cold_start, "embedder_pool", lambda out_dir: embedder)
+    monkeypatch.setattr(recommender_service, "ARTIFACT_FORMAT", "csv")
+    for name in ("OUT_DIR", "RECS_CSV", "STUDENTS_CSV", "INTERNS_CSV"):
+        path = tmp_path if name == "OUT_DIR" else tmp_path / getattr(recommender_service, name).name
+        monkeypatch.setattr(recommender_service, name, path)
+    engine = create_engine(f"sqlite:///{tmp_path / 'recs.db'}")
+    monkeypatch.setattr(db, "engine", engine)
+    monkeypatch.setattr(db, "SessionLocal", sessionmaker(bind=engine))
+    snapshot = recommender_service.load_snapshot("v1")
+    assert snapshot.scorer is not None
+    monkeypatch.setattr(recommender_service, "manager", SimpleNamespace(current=snapshot))
+
+    record = tmp_path / "posting.json"
+    record.write_text(json.dumps({'internship_id': 'I99', 'title': 'New', 'required_skills': 'python, sql',
+                                  'domain': 'A', 'min_age': 18, 'max_age': 30, 'stipend': 9500,
+                                  'remote': 1, 'org_pref_govt': 0}))
+    main(["internship", str(record), "--top-k", str(top_k)])
+    assert not list(tmp_path.glob(".*"))  # no staged files left behind
+
+    reloaded = recommender_service.load_snapshot("v2")
+    assert reloaded.scorer is not None, reloaded.scorer_error
+    catalog = reloaded.scorer.internships_df
+    assert len(catalog) == len(scorer.internships_df) + 1 and catalog['internship_id'].iloc[-1] == 'I99'
+    expected, _ = rescore_internship(snapshot, json.loads(record.read_text()), top_k)
+    for p in profiles:
+        got, want = reloaded.scorer.score(p, top_k), expected.score(p, top_k)
+        assert (got[0] == want[0]).all() and np.allclose(got[1], want[1]), p['student_id']
+    saved = pd.read_csv(tmp_path / "recommendations.csv")
+    assert saved.groupby('student_id').size().eq(top_k).all()
+
+if __name__ == "__main__":
+    test_internship_patch_matches_full_rescore()
+    test_student_without_list_keeps_cold_start()
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_added_internship_rows_and_csv(Path(d))
+    print("incremental rescoring checks passed")
+    import pytest
+    sys.exit(pytest.main([__file__, "-q", "-k", "cli"]))  # needs pytest's monkeypatch fixture
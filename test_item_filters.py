@@ -0,0 +1,65 @@
+"""
+Attribute-filtered top-K: stored list first, deeper candidates after
+"""
+
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from app.item_filters import ItemFilterIndex
+from app.recommender_service import Snapshot
+
+class _Scorer:
+    # fixed catalog-wide scores in place of the cold-start model
+    def __init__(self, scores):
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.calls = []
+
+    def score(self, profile, top_k=10, student_emb=None, allowed=None):
+        self.calls.append(top_k)
+        rows = np.flatnonzero(allowed)
+        order = rows[np.argsort(-self.scores[rows], kind='stable')][:top_k]
+        return order, self.scores[order]
+
+def test_filtered_topk_walks_stored_list_then_deeper():
+    """Matches keep stored order; missing slots are filled from the filtered catalog, never repeating"""
+    internships = pd.DataFrame({'internship_id': [f"I{k}" for k in range(8)], 'title': 't',
+                                'domain': ['Data', 'Web', 'Data', 'Web', 'Data', 'Web', 'Data', 'Web'],
+                                'remote': [1, 0, 1, 1, 0, 1, 1, 0], 'state': ['Goa', 'Kerala'] * 4,
+                                'stipend': [5000, 10000, None, 20000, 8000, 15000, 12000, 3000]})
+    recs = pd.DataFrame({'student_id': 'S1', 'internship_id': ['I3', 'I0', 'I5', 'I1'],
+                         'title': 't', 'domain': 'd', 'score': [0.9, 0.8, 0.7, 0.6], 'rank': [1, 2, 3, 4]})
+    snapshot = Snapshot.from_frames("v", recs, pd.DataFrame({'student_id': ['S1', 'S2'], 'domain': 'Data'}),
+                                    internships)
+
+    index = snapshot.item_filters
+    ids = snapshot.store.internship_ids
+    assert ids[index.mask(remote=True, state=['kerala'])].tolist() == ['I3', 'I5']
+    assert ids[index.mask(min_stipend=10000, domain=('Data', 'web'))].tolist() == ['I1', 'I3', 'I5', 'I6']
+    assert index.mask() is None and not index.mask(ministry='none').any()
+
+    fields = ['internship_id', 'score', 'rank']
+    body = lambda sid, k, **f: json.loads(snapshot.projected_body(sid, k, fields, f))['recommendations']
+    # no scorer: only what the stored list holds
+    assert [r['internship_id'] for r in body('S1', 3, remote=True)] == ['I3', 'I0', 'I5']
+    assert [r['internship_id'] for r in body('S1', 5, min_stipend=10000)] == ['I3', 'I5', 'I1']
+    assert body('S9', 3, remote=True) == []
+
+    snapshot.scorer = _Scorer([0.1, 0.2, 0.3, 0.99, 0.4, 0.5, 0.45, 0.05])
+    snapshot.catalog_to_vocab = pd.Index(ids).get_indexer(internships['internship_id'])
+    got = body('S1', 4, min_stipend=10000)
+    # I3, I5, I1 from the stored list; I6 is the best remaining match, I3 (0.99) is not repeated
+    assert [r['internship_id'] for r in got] == ['I3', 'I5', 'I1', 'I6']
+    assert [r['rank'] for r in got] == [1, 2, 3, 4] and np.isclose(got[3]['score'], 0.45)
+    assert snapshot.scorer.calls == [1]
+    # known profile without stored recommendations: all from the filtered catalog
+    assert [r['internship_id'] for r in body('S2', 2, remote=False)] == ['I4', 'I1']
+    assert isinstance(ItemFilterIndex.from_items(['d'], None).mask(remote=True), np.ndarray)
+
+if __name__ == "__main__":
+    test_filtered_topk_walks_stored_list_then_deeper()
+    print("item filter checks passed")
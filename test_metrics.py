@@ -0,0 +1,56 @@
+"""
+Prometheus text output of the in-process metrics registry
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+from app.metrics import MetricsMiddleware, Registry, registry
+
+def test_histograms_and_route_counters_render():
+    """Cumulative buckets per series, and one request series per route template and status"""
+    reg = Registry()
+    hist = reg.histogram("demo_seconds", "demo", stage="a")
+    for value in [0.0002, 0.003, 0.003, 7.0]:
+        hist.observe(value)
+    assert reg.histogram("demo_seconds", "demo", stage="a") is hist
+    reg.counter("demo_total", "demo").inc(3)
+    reg.gauges.append(lambda: [("demo_ratio", "demo", {(("cache", 'x"y'),): 0.5, (): None}),
+                               ("demo_hits_total", "demo", {(): 4}, "counter")])
+    text = reg.render()
+    assert 'demo_seconds_bucket{stage="a",le="0.00025"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="0.005"} 3' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 4' in text and 'demo_seconds_count{stage="a"} 4' in text
+    assert "demo_total 3" in text and 'demo_ratio{cache="x\\"y"} 0.5' in text
+    assert "# TYPE demo_ratio gauge" in text and text.count("demo_ratio") == 3
+    assert "# TYPE demo_hits_total counter" in text and "demo_hits_total 4" in text
+
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=["*"])
+    app.add_middleware(MetricsMiddleware)  # last added runs outermost
+
+    @app.get("/item/{key}")
+    def item(key: str):
+        if key == "missing":
+            raise HTTPException(status_code=404)
+        return {"key": key}
+
+    client = TestClient(app)
+    for key in ["a", "b", "missing"]:
+        client.get(f"/item/{key}")
+    text = registry.render()
+    assert 'http_requests_total{method="GET",route="/item/{key}",status="200"} 2' in text
+    assert 'http_requests_total{method="GET",route="/item/{key}",status="404"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/item/{key}"} 3' in text
+    # a preflight answered by CORS itself is still counted
+    client.options("/item/a", headers={"Origin": "http://x", "Access-Control-Request-Method": "GET"})
+    assert 'http_requests_total{method="OPTIONS",route="unmatched",status="200"} 1' in registry.render()
+
+if __name__ == "__main__":
+    test_histograms_and_route_counters_render()
+    print("metrics checks passed")
@@ -0,0 +1,67 @@
+"""
+Cursor pages of the internship catalog and of sorted id lists, and catalog reloads
+"""
+
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+
+from app.catalog import InternshipCatalog, keyset_page
+
+def test_cursor_pages_cover_catalog_once(tmp_path):
+    """Walking next_after visits every id once, in order, and survives a reload in between"""
+    ids = [f"I{k:03d}" for k in range(23)]
+    df = pd.DataFrame({'internship_id': ids[::-1] + ['I005'], 'title': 't', 'domain': 'd', 'capacity': 2})
+    df.to_csv(tmp_path / "internships.csv", index=False)
+    catalog = InternshipCatalog(tmp_path / "internships.csv").refresh()
+
+    seen, after = [], None
+    while True:
+        records, after = catalog.page(after, limit=5)
+        seen += [rec['internship_id'] for rec in records]
+        if after is None:
+            break
+        if len(seen) == 10:  # rows appended mid-walk only show up past the cursor
+            pd.concat([df, pd.DataFrame({'internship_id': ['I000b', 'I999'], 'title': 'n'})]).to_csv(
+                tmp_path / "internships.csv", index=False)
+            catalog._mtime = None
+            catalog.refresh()
+    assert seen == ids + ['I999']
+    assert catalog.page('I999', 5) == ([], None) and catalog.page(None, 0) == ([], None)
+
+    assert keyset_page(['a', 'b', 'c'], None, 2) == (['a', 'b'], 'b')
+    assert keyset_page(['a', 'b', 'c'], 'b', 2) == (['c'], None)
+    assert keyset_page(['a', 'b', 'c'], 'a0') == (['b', 'c'], None)
+
+def test_catalog_reparses_only_changed_content(tmp_path):
+    """Same mtime or same bytes keep the parsed records; new bytes give new records and digest"""
+    path = tmp_path / "internships.csv"
+    pd.DataFrame({'internship_id': ['I2', 'I1'], 'title': 't'}).to_csv(path, index=False)
+    catalog = InternshipCatalog(path).refresh()
+    records, digest = catalog.records, catalog.digest
+    assert catalog.page(None, 1) == ([catalog.get('I1')], 'I1')
+
+    assert catalog.refresh().records is records
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert catalog.refresh().records is records and catalog.digest == digest
+
+    pd.DataFrame({'internship_id': ['I2', 'I1', 'I0'], 'title': 'n'}).to_csv(path, index=False)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    catalog.refresh()
+    assert catalog.records is not records and catalog.digest != digest
+    assert [rec['internship_id'] for rec in catalog.page('I0', 5)[0]] == ['I1', 'I2']
+
+    path.unlink()
+    assert not catalog.refresh().exists and catalog.page() == ([], None)
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_cursor_pages_cover_catalog_once(Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_catalog_reparses_only_changed_content(Path(d))
+    print("pagination checks passed")
@@ -0,0 +1,87 @@
+"""
+Checks the vectorized pair feature builder against the notebook's per-pair loop
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from app.pair_features import PairFeatureBuilder, score_eligible
+
+def skill_overlap_ratio(s_skills, i_skills):
+    # copied from the notebook's Cell 8
+    sset = set([x.strip().lower() for x in s_skills.split(',') if x.strip()])
+    iset = set([x.strip().lower() for x in i_skills.split(',') if x.strip()])
+    return len(sset & iset) / len(iset) if len(iset)>0 else 0.0
+
+def _frames(rng, S=30, I=12):
+    pool = ['python', 'sql', 'java', 'react', 'aws', 'excel']
+    students = pd.DataFrame({
+        'skills': [', '.join(rng.choice(pool, rng.integers(1, 4), replace=False)) for _ in range(S)],
+        'domain': rng.choice(['A', 'B'], S), 'age': rng.integers(18, 32, S),
+        'github': rng.choice(['', 'https://github.com/x'], S), 'project_impact': rng.random(S),
+        'rural': rng.integers(0, 2, S), 'female': rng.integers(0, 2, S),
+    })
+    internships = pd.DataFrame({
+        'required_skills': [', '.join(rng.choice(pool, rng.integers(1, 4), replace=False)) for _ in range(I)],
+        'domain': rng.choice(['A', 'B'], I), 'min_age': 18, 'max_age': rng.choice([22, 25, 30], I),
+        'stipend': rng.choice([5000, 8000, 20000], I), 'remote': rng.integers(0, 2, I),
+    })
+    return students, internships
+
+def test_features_match_loop():
+    """Every feature column should equal the Cell 11 per-pair value"""
+    rng = np.random.default_rng(0)
+    students, internships = _frames(rng)
+    cbf, cf, rule = rng.random((3, len(students), len(internships)))
+    builder = PairFeatureBuilder(students, internships, cbf, cf, rule)
+
+    s_idx, i_idx = np.nonzero(np.ones((len(students), len(internships)), dtype=bool))
+    X = builder.features(s_idx, i_idx)
+    stipend = internships['stipend']
+    for row, (s, i) in enumerate(zip(s_idx, i_idx)):
+        srow, irow = students.loc[s], internships.loc[i]
+        expected = [
+            cbf[s, i], cf[s, i], rule[s, i],
+            skill_overlap_ratio(srow['skills'], irow['required_skills']),
+            1.0 if srow['domain'] == irow['domain'] else 0.0,
+            float(abs(srow['age'] - (irow['min_age'] + irow['max_age']) / 2.0)) / 20.0,
+            (irow['stipend'] - stipend.min()) / (stipend.max() - stipend.min() + 1e-9),
+            1.0 if irow['remote'] == 1 else 0.0,
+            1.0 if srow['github'] else 0.0,
+            srow['project_impact'], srow['rural'], srow['female'],
+        ]
+        assert np.allclose(X[row], expected)
+
+def test_chunked_topk_matches_dense():
+    """Small chunks should give the same top-K and pred range as one dense predict"""
+    rng = np.random.default_rng(1)
+    students, internships = _frames(rng)
+    S, I = len(students), len(internships)
+    builder = PairFeatureBuilder(students, internships, *rng.random((3, S, I)))
+    elig = rng.random((S, I)) < 0.5
+    weights = rng.random(12)
+    predict = lambda X: X.to_numpy() @ weights
+
+    topk, pred_min, pred_max = score_eligible(builder, predict, elig, top_k=4, chunk_size=7)
+
+    all_s, all_i = np.nonzero(np.ones((S, I), dtype=bool))
+    dense = builder.features(all_s, all_i).reshape(S, I, 12)
+    dense[~elig] = 0.0
+    preds = dense @ weights
+    assert np.isclose(pred_min, preds.min()) and np.isclose(pred_max, preds.max())
+
+    s_idx, i_idx, scores, rank = topk.result()
+    for s in range(S):
+        masked = np.where(elig[s], preds[s], -np.inf)
+        expected = [i for i in np.argsort(-masked, kind='stable')[:4] if elig[s, i]]
+        assert list(i_idx[s_idx == s]) == expected
+        assert list(rank[s_idx == s]) == list(range(1, len(expected) + 1))
+
+if __name__ == "__main__":
+    test_features_match_loop()
+    test_chunked_topk_matches_dense()
+    print("pair feature checks passed")
@@ -0,0 +1,45 @@
+"""
+fields= projections match the same keys of the full /recommend records
+"""
+
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+
+from app.catalog import parse_fields
+from app.recommender_service import REC_FIELDS, REC_SUMMARY_FIELDS, Snapshot
+
+def test_projected_body_matches_full_records():
+    """Summary and ad-hoc projections are the full records restricted to those keys, in field order"""
+    internships = pd.DataFrame({'internship_id': ['I1', 'I2', 'I3'], 'title': ['a', 'b', 'c'], 'domain': 'd',
+                                'stipend': [100.0, None, 300.0], 'remote': [1, 0, 1],
+                                'description': 'long text ' * 50, 'job_text': 'more text ' * 50})
+    recs = pd.DataFrame({'student_id': ['S1', 'S1', 'S1', 'S2'], 'internship_id': ['I3', 'I1', 'I9', 'I2'],
+                         'title': ['c', 'a', 'orphan', 'b'], 'domain': 'd', 'score': [0.9, 0.5, 0.25, 0.7],
+                         'rank': [1, 2, 3, 1]})
+    snapshot = Snapshot.from_frames("v", recs, pd.DataFrame({'student_id': ['S1', 'S2']}), internships)
+
+    full = json.loads(snapshot.response_cache.body('S1', 10))['recommendations']
+    for spec in ['summary', 'rank,title,student_id', 'summary,description']:
+        fields = parse_fields(spec, REC_FIELDS, REC_SUMMARY_FIELDS)
+        body = json.loads(snapshot.projected_body('S1', 2, fields))
+        assert body['recommendations'] == [{f: rec[f] for f in fields} for rec in full[:2]]
+        assert list(body['recommendations'][0]) == [f for f in REC_FIELDS if f in fields]
+    orphan = json.loads(snapshot.projected_body('S1', 3, ['internship_id', 'title', 'stipend']))
+    assert orphan['recommendations'][2] == {'internship_id': 'I9', 'title': 'orphan', 'stipend': None}
+    assert json.loads(snapshot.projected_body('S404', 5, ['title'])) == {'student_id': 'S404', 'recommendations': []}
+
+    assert parse_fields(None, REC_FIELDS) is None and parse_fields('full', REC_FIELDS) is None
+    for bad in ['nope', ' , ']:
+        try:
+            parse_fields(bad, REC_FIELDS)
+            raise AssertionError(f"{bad!r} accepted")
+        except ValueError:
+            pass
+
+if __name__ == "__main__":
+    test_projected_body_matches_full_records()
+    print("projection checks passed")
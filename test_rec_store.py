@@ -0,0 +1,60 @@
+"""
+Checks for the CSR recommendation store (no API needed)
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from app.rec_store import RecommendationStore
+
+def test_store_slices_match_frame():
+    """Store slices should equal a sort_values('rank') scan of the frame"""
+    recs = pd.DataFrame({
+        'student_id': ['S2', 'S1', 'S2', 'S1', 'S1'],
+        'internship_id': ['I3', 'I1', 'I9', 'I2', 'I3'],
+        'title': ['t'] * 5,
+        'domain': ['d'] * 5,
+        'score': [0.5, 0.9, 0.7, 0.8, 0.1],
+        'rank': [2, 1, 1, 2, 3],
+    })
+    store = RecommendationStore.from_frame(recs, ['I1', 'I2', 'I3'])
+
+    # I9 is not in the catalog, so it is appended to the vocabulary
+    assert list(store.internship_ids) == ['I1', 'I2', 'I3', 'I9']
+    assert len(store) == 2 and 'S1' in store and 'S3' not in store
+
+    for sid in ['S1', 'S2']:
+        expected = recs[recs['student_id'] == sid].sort_values('rank')
+        idx, scores = store.lookup(sid)
+        assert [store.internship_ids[i] for i in idx] == expected['internship_id'].tolist()
+        assert scores.tolist() == _as_float32(expected['score'].tolist())
+
+    idx, scores = store.lookup('S1', top_k=2)
+    assert len(idx) == 2 and store.lookup('S3') is None
+    print("✅ store slices match the frame")
+
+def test_patched_store_overlays_students():
+    """A patched store serves the new lists and leaves the original untouched"""
+    recs = pd.DataFrame({'student_id': ['S1', 'S1', 'S2'], 'internship_id': ['I1', 'I2', 'I2'],
+                         'score': [0.9, 0.8, 0.7], 'rank': [1, 2, 1]})
+    store = RecommendationStore.from_frame(recs, ['I1', 'I2'])
+    patched = store.patched({'S2': (['I7', 'I1'], [0.95, 0.4]), 'S3': (['I2'], [0.3])})
+
+    assert list(patched.internship_ids) == ['I1', 'I2', 'I7'] and 'S3' in patched and 'S3' not in store
+    assert [patched.internship_ids[i] for i in patched.lookup('S2')[0]] == ['I7', 'I1']
+    assert [store.internship_ids[i] for i in store.lookup('S2')[0]] == ['I2']
+    found, unknown, bounds, idx, scores = patched.gather(['S1', 'S2', 'S9'], top_k=1)
+    assert found == ['S1', 'S2'] and unknown == ['S9']
+    assert [patched.internship_ids[i] for i in idx] == ['I1', 'I7'] and bounds.tolist() == [0, 1, 2]
+
+def _as_float32(values):
+    # scores are stored as float32
+    return np.asarray(values, dtype=np.float32).tolist()
+
+if __name__ == "__main__":
+    test_store_slices_match_frame()
+    test_patched_store_overlays_students()
@@ -0,0 +1,45 @@
+"""
+Pre-rendered /recommend bodies: prefix slicing and LRU eviction
+"""
+
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.response_cache import ResponseCache
+
+def test_prefix_slices_and_lru_eviction():
+    """Any top_k is a prefix of one rendering; the least recently used student is dropped first"""
+    renders = []
+    def render(sid):
+        renders.append(sid)
+        if sid == "unknown":
+            return None
+        return [{'internship_id': f"{sid}-I{k}", 'rank': k + 1} for k in range(5)]
+
+    cache = ResponseCache(render, max_entries=2)
+    full = json.loads(cache.body("A", 10))
+    assert full['student_id'] == "A" and len(full['recommendations']) == 5
+    for top_k in (0, 1, 3, 5):
+        recs = json.loads(cache.body("A", top_k))['recommendations']
+        assert recs == full['recommendations'][:top_k]
+    assert renders == ["A"] and cache.hits == 4 and cache.misses == 1
+
+    cache.body("B")
+    cache.body("A")  # A is now the most recently used
+    cache.body("C")  # evicts B
+    assert cache.keys() == ["A", "C"] and len(cache) == 2
+    assert cache.cached_body("B") is None and json.loads(cache.cached_body("A", 2))['recommendations'][1]['rank'] == 2
+    cache.body("B")
+    assert renders == ["A", "B", "C", "B"] and cache.keys() == ["A", "B"]
+
+    # unknown students render an empty list and are never cached
+    assert json.loads(cache.body("unknown"))['recommendations'] == []
+    assert "unknown" not in cache.keys()
+    uncached = ResponseCache(render, max_entries=0)
+    assert uncached.body("A") == cache.body("A") and len(uncached) == 0
+
+if __name__ == "__main__":
+    test_prefix_slices_and_lru_eviction()
+    print("response cache checks passed")
@@ -0,0 +1,76 @@
+"""
+Parity of the vectorized rule engine with the notebook's per-pair Cell 4 function
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+
+from app.rules import FAIRNESS_BOOST, RuleEngine, unpack_mask
+
+def compute_rule_score_and_eligibility(srow, irow, internships):
+    # Cell 4 as it was, with the notebook globals passed in
+    eligible = (srow['age'] >= irow['min_age']) and (srow['age'] <= irow['max_age'])
+    age_ok = 1.0 if eligible else 0.0
+    govt_bonus = 1.0 if (srow['govt_project'] and irow['org_pref_govt']) else 0.0
+    proj_imp = float(np.clip(srow['project_impact'], 0.0, 1.0))
+    freel_bonus = 0.5 if srow['freelancer'] else 0.0
+    fresher_bonus = 0.35 if srow['is_fresher'] else 0.0
+    stipend_min = internships['stipend'].min(); stipend_max = internships['stipend'].max()
+    stipend_score = (irow['stipend'] - stipend_min) / (stipend_max - stipend_min + 1e-9)
+    rule = 0.35*age_ok + 0.25*proj_imp + 0.15*freel_bonus + 0.1*fresher_bonus + 0.1*stipend_score + 0.05*govt_bonus
+    fairness_adj = 0.0
+    if srow.get('rural',0)==1:
+        fairness_adj += FAIRNESS_BOOST.get('rural', 0.0)
+    if srow.get('female',0)==1:
+        fairness_adj += FAIRNESS_BOOST.get('female', 0.0)
+    rule = min(1.0, rule + fairness_adj)
+    return float(rule), bool(eligible)
+
+def _frames(rng, S=60, I=23):
+    students = pd.DataFrame({
+        'age': rng.integers(18, 36, S), 'govt_project': rng.integers(0, 2, S),
+        'freelancer': rng.integers(0, 2, S), 'is_fresher': rng.integers(0, 2, S),
+        'project_impact': rng.uniform(-0.2, 1.2, S), 'rural': rng.integers(0, 2, S),
+        'female': rng.integers(0, 2, S),
+    })
+    internships = pd.DataFrame({
+        'min_age': rng.choice([18, 21], I), 'max_age': rng.choice([22, 25, 28, 30, 35], I),
+        'stipend': rng.choice([5000, 8000, 10000, 15000, 20000], I),
+        'org_pref_govt': rng.integers(0, 2, I),
+    })
+    return students, internships
+
+def test_rule_matrix_matches_per_pair_function():
+    """rule_mat and the packed elig mask should equal the double loop exactly"""
+    rng = np.random.default_rng(7)
+    students, internships = _frames(rng)
+    expected_rule = np.zeros((len(students), len(internships)))
+    expected_elig = np.ones_like(expected_rule, dtype=bool)
+    for si, srow in students.iterrows():
+        for ji, irow in internships.iterrows():
+            expected_rule[si, ji], expected_elig[si, ji] = compute_rule_score_and_eligibility(srow, irow, internships)
+
+    # a small block also exercises the chunked path
+    rule_mat, elig_bits = RuleEngine(internships).score_packed(students, block=16)
+    assert elig_bits.shape == (len(students), (len(internships) + 7) // 8)
+    assert np.array_equal(rule_mat, expected_rule)
+    assert np.array_equal(unpack_mask(elig_bits, len(internships)), expected_elig)
+
+def test_single_profile_matches_frame_row():
+    """A profile dict scores the same as its row in a student frame"""
+    rng = np.random.default_rng(3)
+    students, internships = _frames(rng)
+    engine = RuleEngine(internships)
+    rule_mat, elig = engine.score(students)
+    profile = students.iloc[5].to_dict()
+    rule, elig_row = engine.score({k: [v] for k, v in profile.items()})
+    assert np.array_equal(rule[0], rule_mat[5]) and np.array_equal(elig_row[0], elig[5])
+
+if __name__ == "__main__":
+    test_rule_matrix_matches_per_pair_function()
+    test_single_profile_matches_frame_row()
+    print("rule engine parity checks passed")
@@ -0,0 +1,53 @@
+"""
+Single-flight coalescing and load shedding of the async serving path
+"""
+
+import sys
+import asyncio
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.serving import BoundedExecutor, Overloaded, SingleFlight
+
+def test_concurrent_identical_calls_share_one_computation():
+    """20 concurrent requests for one key run the function once; a full executor answers Overloaded"""
+    calls = []
+    release = threading.Event()
+
+    def slow(key):
+        calls.append(key)
+        release.wait(5)
+        return f"body-{key}"
+
+    async def scenario():
+        executor, flights = BoundedExecutor(max_workers=2, max_pending=3), SingleFlight()
+        fetch = lambda key: flights.do(key, lambda: executor.run(slow, key))
+        tasks = [asyncio.ensure_future(fetch("S1")) for _ in range(20)] + [asyncio.ensure_future(fetch("S2"))]
+        await asyncio.sleep(0.05)
+        assert executor.pending == 2 and flights.status()["in_flight"] == 2
+        # a distinct key still fits; the one after it is shed instead of queued
+        third = asyncio.ensure_future(fetch("S3"))
+        await asyncio.sleep(0.05)
+        try:
+            await fetch("S4")
+            raise AssertionError("expected Overloaded")
+        except Overloaded:
+            pass
+        release.set()
+        results = await asyncio.gather(*tasks, third)
+        assert results[:20] == ["body-S1"] * 20 and results[20:] == ["body-S2", "body-S3"]
+        assert flights.status() == {"in_flight": 0, "leaders": 4, "shared": 19}
+        assert executor.pending == 0 and executor.rejected == 1
+        # nothing is cached: a later call computes again
+        assert await fetch("S1") == "body-S1"
+
+    started = time.perf_counter()
+    asyncio.run(scenario())
+    assert sorted(calls) == ["S1", "S1", "S2", "S3"]
+    assert time.perf_counter() - started < 5
+
+if __name__ == "__main__":
+    test_concurrent_identical_calls_share_one_computation()
+    print("serving checks passed")
@@ -0,0 +1,75 @@
+"""
+SQLite serving store vs the in-memory CSR store
+"""
+
+import sys
+import sqlite3
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.rec_store import RecommendationStore
+from app.sqlite_store import LOOKUP_SQL, ConnectionPool, SQLiteRecommendationStore, generation
+
+def test_sqlite_store_matches_memory_store(tmp_path):
+    """Same slices as RecommendationStore, read through the covering index"""
+    db_file = tmp_path / "serve.db"
+    engine = create_engine(f"sqlite:///{db_file}")
+    crud.create_tables(engine)
+    db = sessionmaker(bind=engine)()
+
+    rng = np.random.default_rng(2)
+    recs = pd.DataFrame({
+        'student_id': np.repeat([f"S{k}" for k in range(30)], 5),
+        # distinct internships per student: (student_id, internship_id) is unique
+        'internship_id': [f"I{k}" for _ in range(30) for k in rng.choice(12, 5, replace=False)],
+        'title': 't', 'domain': 'd', 'score': rng.random(150), 'rank': np.tile([3, 1, 5, 2, 4], 30),
+    })
+    crud.save_recommendations_from_df(db, recs.sample(frac=1, random_state=0), chunksize=40)
+    assert generation(db_file) == 1
+    db.close()
+
+    catalog = [f"I{k}" for k in range(10)]  # I10 / I11 only appear in the table
+    memory = RecommendationStore.from_frame(recs, catalog)
+    store = SQLiteRecommendationStore.open(db_file, catalog, pool_size=2)
+    assert sorted(store.internship_ids) == sorted(memory.internship_ids)
+    assert len(store) == 30 and 'S3' in store and 'S99' not in store
+    assert list(store.student_ids) == sorted(memory.student_ids)
+
+    for sid in ['S0', 'S7', 'S29']:
+        for top_k in [None, 2, 0]:
+            got, want = store.lookup(sid, top_k), memory.lookup(sid, top_k)
+            assert store.internship_ids[got[0]].tolist() == memory.internship_ids[want[0]].tolist()
+            assert np.allclose(got[1], want[1])
+    assert store.lookup('S99') is None
+    found, unknown, bounds, idx, _ = store.gather(['S1', 'S99', 'S2'], top_k=3)
+    assert found == ['S1', 'S2'] and unknown == ['S99'] and bounds.tolist() == [0, 3, 6]
+
+    with sqlite3.connect(db_file) as conn:
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + LOOKUP_SQL, ("S1", 10)))
+    assert "COVERING INDEX ix_recommendations_student_rank" in plan and "TEMP B-TREE" not in plan
+
+def test_failed_connect_returns_pool_slot(tmp_path):
+    """A connection that fails to open does not use up one of the pool's slots"""
+    pool = ConnectionPool(tmp_path / "later.db", size=1)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection():
+            pass
+    assert pool._opened == 0
+    sqlite3.connect(tmp_path / "later.db").close()
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_sqlite_store_matches_memory_store(Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_failed_connect_returns_pool_slot(Path(d))
+    print("sqlite store checks passed")